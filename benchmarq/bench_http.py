@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# benchmarq/bench_http.py - Connection reuse of the openai-http provider
+"""
+Runs a series of completions against benchmarq/fake_openai_server.py, once
+with the pooled client lib_ai uses and once with a fresh connection per
+call, and reports connection setup, time-to-first-token and generation time.
+
+Usage: python3 benchmarq/bench_http.py [--calls 20] [--parallel 4] [--latency 0.05]
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "worqer"))
+sys.path.insert(0, str(BENCH_DIR))
+import lib_http
+from fake_openai_server import start_server
+
+def run_series(base_url: str, calls: int, parallel: int, pooled: bool) -> dict:
+    shared = lib_http.OpenAIHttpClient(base_url, api_key="bench")
+    def one(i):
+        client = shared if pooled else lib_http.OpenAIHttpClient(base_url, api_key="bench")
+        text, timing = client.complete("fake-model", f"briq {i}")
+        if not pooled: client.pool.close()
+        return timing
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        timings = list(pool.map(one, range(calls)))
+    wall = time.perf_counter() - t0
+    shared.pool.close()
+    ms = lambda key: statistics.mean(t[key] for t in timings) * 1000
+    return {'wall': wall, 'connect': ms('connect_s'), 'ttfb': ms('ttfb_s'), 'generation': ms('generation_s'),
+            'new': sum(1 for t in timings if t['connection'] == 'new')}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark openai-http connection pooling")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--output-bytes", type=int, default=16384)
+    args = parser.parse_args()
+
+    print(f"{'client':<8} {'server conns':>12} {'new conns':>9} {'wall s':>8} {'connect ms':>10} {'ttfb ms':>8} {'gen ms':>8}")
+    for pooled in (True, False):
+        server = start_server(latency=args.latency, output_bytes=args.output_bytes)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        r = run_series(base_url, args.calls, args.parallel, pooled)
+        server.shutdown()
+        name = 'pooled' if pooled else 'fresh'
+        print(f"{name:<8} {server.connections:>12} {r['new']:>9} {r['wall']:>8.3f} {r['connect']:>10.2f} {r['ttfb']:>8.1f} {r['generation']:>8.1f}")
+
+if __name__ == '__main__':
+    main()
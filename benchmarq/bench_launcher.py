@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# benchmarq/bench_launcher.py - Agent startup latency: subprocess vs fork server
+"""
+Launches each worQer script without arguments, so it pays the full import
+and config cost and then exits on its usage check, and measures
+spawn-to-exit latency through a plain subprocess and through the
+pre-imported fork server.
+
+Usage: python3 benchmarq/bench_launcher.py [--runs 20]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "qrane"))
+from forkserver import ForkServerLauncher
+
+WORQERS = ["instruqtor.py", "construqtor.py", "inspeqtor.py"]
+
+def launch_subprocess(cmd, env, cwd):
+    return subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def time_runs(spawn, runs: int, env: dict, cwd: str) -> list[float]:
+    samples = []
+    for i in range(runs):
+        script = PROJECT_ROOT / "worqer" / WORQERS[i % len(WORQERS)]
+        t0 = time.perf_counter()
+        proc = spawn(["python3", str(script)], env, cwd)
+        proc.stdout.read(); proc.stderr.read()
+        proc.wait()
+        samples.append(time.perf_counter() - t0)
+        proc.stdout.close(); proc.stderr.close()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent launch latency")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    worqspace = tempfile.mkdtemp(prefix="qonq_bench_")
+    shutil.copy(PROJECT_ROOT / "worqspace" / "config.yaml", worqspace)
+    env = dict(os.environ, CYCLE_NUM="1")
+    try:
+        baseline = time_runs(launch_subprocess, args.runs, env, worqspace)
+        t0 = time.perf_counter()
+        launcher = ForkServerLauncher(worqspace, PROJECT_ROOT / "worqer", env=env)
+        boot = time.perf_counter() - t0
+        try: forked = time_runs(launcher.spawn, args.runs, env, worqspace)
+        finally: launcher.close()
+    finally:
+        shutil.rmtree(worqspace, ignore_errors=True)
+
+    print(f"{'launcher':<12} {'runs':>5} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for name, samples in (("subprocess", baseline), ("forkserver", forked)):
+        ms = [s * 1000 for s in samples]
+        print(f"{name:<12} {len(ms):>5} {statistics.mean(ms):>9.1f} {statistics.median(ms):>9.1f} {max(ms):>9.1f}")
+    print(f"fork server boot (once per run): {boot * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
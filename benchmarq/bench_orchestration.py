@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# benchmarq/bench_orchestration.py - End-to-end Qrane benchmark on fake provider CLIs
+"""
+Runs `qrane.py --auto` (run_orchestration, every agent, cheqpoint and reQap
+promotion) over synthetic tasqs of increasing size, with fake `sgpt` and
+`gemini` executables on PATH (benchmarq/fake_provider.py, qonqrete mode).
+No API keys or network are needed.
+
+Per size it reads the run's struqture/metrics.jsonl ledger and reports:
+  briqs/s          briqs built / construQtor wall time
+  overhead/cyQle   cycle wall time with no provider call in flight
+                   (agent startup, prompt building, parsing, manifest, Qrane)
+  peak RSS         largest resident set of Qrane or any agent it started
+and finally the curses TUI's render throughput under a pseudo-terminal.
+
+Usage: python3 benchmarq/bench_orchestration.py [--sizes 4 16 64] [--cycles 2]
+           [--latency 0.05] [--output-bytes 4096] [--parallel 1] [--pipelined] [--carry-over]
+           [--briq-delay 0] [--tui-lines 50000]
+"""
+import argparse
+import json
+import os
+import pty
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(PROJECT_ROOT / "qrane"))
+from fake_provider import install_fake_clis
+import metrics
+
+CONFIG_TEMPLATE = """agents:
+  instruqtor: {{provider: openai, model: fake}}
+  construqtor: {{provider: gemini, model: fake}}
+  inspeqtor: {{provider: openai, model: fake}}
+options:
+  auto_cycle_limit: {cycles}
+  briq_sensitivity: 5
+  max_parallel_briqs: {parallel}
+  cache: false
+  metrics: true
+  pipelined: {pipelined}
+  briq_carry_over: {carry_over}
+"""
+
+def make_worqspace(root: Path, briqs: int, args) -> Path:
+    ws = root / f"qage_bench_{briqs}"
+    for d in ("tasq.d", "briq.d", "exeq.d", "reqap.d", "qodeyard", "struqture"): (ws / d).mkdir(parents=True)
+    (ws / "config.yaml").write_text(CONFIG_TEMPLATE.format(cycles=args.cycles, parallel=args.parallel, pipelined=str(args.pipelined).lower(),
+                                                             carry_over=str(args.carry_over).lower()))
+    shutil.copy(PROJECT_ROOT / "worqspace" / "pipeline_config.yaml", ws)
+    spec = "\n".join(f"## Component {i}\nImplement module_{i:03d} with logging and tests." for i in range(briqs))
+    (ws / "tasq.d" / "cyqle1_tasq.md").write_text(f"# Synthetic tasq ({briqs} components)\n\n{spec}\n")
+    return ws
+
+def run_qrane(ws: Path, env: dict) -> tuple[float, int, int]:
+    """Runs one auto session; returns (wall seconds, exit status, peak RSS KB of Qrane and its agents)."""
+    null = os.open(os.devnull, os.O_RDWR)
+    t0 = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.dup2(null, 0); os.dup2(null, 1); os.dup2(null, 2)
+        os.chdir(PROJECT_ROOT)
+        os.execve(sys.executable, [sys.executable, str(PROJECT_ROOT / "qrane" / "qrane.py"), "--auto"], env)
+    os.close(null)
+    _, status, usage = os.wait4(pid, 0)
+    return time.perf_counter() - t0, os.waitstatus_to_exitcode(status), usage.ru_maxrss
+
+def busy_time(intervals: list) -> float:
+    """Length of the union of (start, end) intervals (parallel calls overlap)."""
+    total, reach = 0.0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            total += end - start; reach = end
+        elif end > reach:
+            total += end - reach; reach = end
+    return total
+
+def summarize(ws: Path) -> dict:
+    records = metrics.MetricsLedger(metrics.ledger_path(ws)).load()
+    cycles = {}
+    for r in records:
+        c = cycles.setdefault(r['cycle'], {'wall': 0.0, 'calls': [], 'construct': 0.0, 'briqs': 0})
+        if r['event'] == 'cycle': c['wall'] = r['wall_s']
+        elif r['event'] == 'provider_call': c['calls'].append((r['ts'] - r['wall_s'], r['ts']))
+        elif r['event'] == 'briq': c['briqs'] += 1
+        elif r['event'] == 'agent' and r['agent'] == 'construqtor': c['construct'] = r['wall_s']
+    done = [c for c in cycles.values() if c['wall']]
+    briqs = sum(c['briqs'] for c in done)
+    construct = sum(c['construct'] for c in done)
+    return {
+        'cycles': len(done),
+        'briqs': briqs,
+        'briqs_per_s': briqs / construct if construct else 0.0,
+        'overhead_ms': 1000 * sum(c['wall'] - busy_time(c['calls']) for c in done) / len(done) if done else 0.0,
+    }
+
+def bench_tui(lines: int) -> float:
+    """Lines/s the TUI absorbs under a pty (both panels, ANSI-coloured agent output)."""
+    result = tempfile.NamedTemporaryFile(prefix="qonq_tui_", suffix=".json", delete=False).name
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.environ['TERM'] = os.environ.get('TERM') or 'xterm'
+        code = 1
+        try:
+            import tui
+            with tui.QonqreteTUI() as ui:
+                t0 = time.perf_counter()
+                for i in range(lines):
+                    ui.log_agent(f"[construQtor] \x1b[32mline {i}\x1b[0m " + "x" * 80)
+                    if i % 10 == 0: ui.log_main(f"〘aQQ〙『construQtor』 -- Processing Briq: {i} --")
+                ui.render()
+                elapsed = time.perf_counter() - t0
+            with open(result, 'w') as f: json.dump({'elapsed': elapsed}, f)
+            code = 0
+        finally: os._exit(code)
+    while True: # Drain the terminal so curses never blocks on a full pty
+        try:
+            if not os.read(fd, 65536): break
+        except OSError: break
+    os.waitpid(pid, 0)
+    try:
+        with open(result) as f: elapsed = json.load(f)['elapsed']
+    except (OSError, ValueError, KeyError): return 0.0
+    finally: os.unlink(result)
+    return (lines + lines // 10) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Qrane end to end on fake provider CLIs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64], help="Briqs per instruQtor plan")
+    parser.add_argument("--cycles", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake provider time to first byte (s)")
+    parser.add_argument("--output-bytes", type=int, default=4096)
+    parser.add_argument("--parallel", type=int, default=1, help="options.max_parallel_briqs")
+    parser.add_argument("--pipelined", action="store_true", help="options.pipelined (construQtor follows the plan stream)")
+    parser.add_argument("--carry-over", action="store_true", help="options.briq_carry_over (the fake plan repeats every cyQle)")
+    parser.add_argument("--briq-delay", type=float, default=0.0, help="Fake planning time per briq of the plan (s)")
+    parser.add_argument("--tui-lines", type=int, default=50000, help="0 skips the TUI benchmark")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="qonq_bench_"))
+    env = install_fake_clis(str(root / "bin"))
+    env.update(FAKE_LATENCY=str(args.latency), FAKE_OUTPUT_BYTES=str(args.output_bytes), FAKE_BRIQ_DELAY=str(args.briq_delay))
+    env.pop('QONQ_NO_CACHE', None); env.pop('QONQ_METRICS_FILE', None)
+
+    print(f"{'briqs/plan':>10} {'cyQles':>6} {'briqs':>6} {'wall s':>8} {'briqs/s':>8} {'overhead/cyQle ms':>18} {'peak RSS MB':>12}")
+    try:
+        for size in args.sizes:
+            ws = make_worqspace(root, size, args)
+            run_env = dict(env, QONQ_WORKSPACE=str(ws), FAKE_BRIQS=str(size))
+            wall, status, rss_kb = run_qrane(ws, run_env)
+            s = summarize(ws)
+            flag = "" if status == 0 and s['cycles'] == args.cycles else f"  (exit {status}, {s['cycles']} cyQles)"
+            print(f"{size:>10} {s['cycles']:>6} {s['briqs']:>6} {wall:>8.2f} {s['briqs_per_s']:>8.2f} "
+                  f"{s['overhead_ms']:>18.1f} {rss_kb / 1024:>12.1f}{flag}")
+        if args.tui_lines:
+            print(f"TUI render throughput: {bench_tui(args.tui_lines):,.0f} lines/s ({args.tui_lines} agent lines)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
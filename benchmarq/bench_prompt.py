@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# benchmarq/bench_prompt.py - Peak memory of prompt assembly: joined string vs. streamed segments
+"""
+Writes a synthetic codebase of --files files totalling --mb MB, then sends
+it as context to a provider process that discards stdin (cat > /dev/null):
+once as the string lib_ai used to build (`full +=` per file, then one
+encode), once as a streamed lib_prompt.Prompt. Reports wall time and peak
+Python heap (tracemalloc) of each.
+
+Usage: python3 benchmarq/bench_prompt.py [--mb 64] [--files 256]
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "worqer"))
+import lib_prompt
+
+SINK = ["sh", "-c", "cat > /dev/null"]
+
+def legacy_prompt(base: str, files: list) -> str:
+    full = base + "\n\n--- EXISTING CODEBASE CONTEXT ---\n"
+    for fpath in files:
+        with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
+            full += f"\nFile: {fpath}\n```\n{f.read()}\n```\n"
+    return full
+
+def send(chunks) -> None:
+    proc = subprocess.Popen(SINK, stdin=subprocess.PIPE)
+    for chunk in chunks: proc.stdin.write(chunk)
+    proc.stdin.close()
+    proc.wait()
+
+def measure(fn) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return wall, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt assembly memory")
+    parser.add_argument("--mb", type=int, default=64, help="Total context size (MB)")
+    parser.add_argument("--files", type=int, default=256)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="qonq_prompt_"))
+    try:
+        line = "def handler(request):  # " + "x" * 54 + "\n"
+        per_file = args.mb * 1024 * 1024 // args.files
+        files = []
+        for i in range(args.files):
+            path = root / f"module_{i:04d}.py"
+            path.write_text(line * (per_file // len(line)), encoding='utf-8')
+            files.append(str(path))
+
+        def legacy(): send([legacy_prompt("Build it", files).encode('utf-8', errors='replace')])
+        def streamed():
+            prompt = lib_prompt.Prompt("Build it\n\n--- EXISTING CODEBASE CONTEXT ---\n")
+            for fpath in files: prompt.file(fpath, header=f"\nFile: {fpath}\n```\n", footer="\n```\n", errors='ignore')
+            send(lib_prompt.chunks(prompt))
+
+        print(f"{'mode':>9} {'wall s':>8} {'peak MB':>9}")
+        for name, fn in (("joined", legacy), ("streamed", streamed)):
+            wall, peak = measure(fn)
+            print(f"{name:>9} {wall:>8.2f} {peak / 1e6:>9.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
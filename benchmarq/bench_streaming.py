@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# benchmarq/bench_streaming.py - Throughput of lib_ai's streaming reader
+"""
+Drives benchmarq/fake_provider.py through lib_ai._run_streaming_process and
+reports wall time, throughput and peak Python heap for several response
+sizes. The pre-chunking reader (one read(1) + stderr flush per character) is
+reproduced below as a baseline.
+
+Usage: python3 benchmarq/bench_streaming.py [--sizes 1,4,16] [--legacy-max 4]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "worqer"))
+import lib_ai
+
+FAKE_PROVIDER = [sys.executable, str(BENCH_DIR / "fake_provider.py")]
+
+def legacy_streaming_process(cmd, input_text=None) -> str:
+    """The per-character reader lib_ai used before chunked streaming."""
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, bufsize=1, universal_newlines=True)
+    def writer():
+        try: proc.stdin.write(input_text); proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError): pass
+        finally: proc.stdin.close()
+    t = threading.Thread(target=writer); t.start()
+    captured = []
+    while True:
+        char = proc.stdout.read(1)
+        if not char and proc.poll() is not None: break
+        if char:
+            captured.append(char)
+            sys.stderr.write(char)
+            sys.stderr.flush()
+    proc.stderr.read(); proc.wait(); t.join(timeout=2)
+    return "".join(captured).strip()
+
+def measure(reader, size_bytes: int) -> dict:
+    env_backup = os.environ.get('FAKE_OUTPUT_BYTES')
+    os.environ['FAKE_OUTPUT_BYTES'] = str(size_bytes)
+    real_stderr = sys.stderr
+    sys.stderr = open(os.devnull, 'w') # The mirror is part of the cost, the terminal is not
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        out = reader(FAKE_PROVIDER, input_text="benchmarq")
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        sys.stderr.close(); sys.stderr = real_stderr
+        if env_backup is None: os.environ.pop('FAKE_OUTPUT_BYTES', None)
+        else: os.environ['FAKE_OUTPUT_BYTES'] = env_backup
+    return {'seconds': elapsed, 'bytes': len(out), 'peak': peak}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lib_ai streaming reader")
+    parser.add_argument("--sizes", default="1,4,16", help="Response sizes in MB (comma separated)")
+    parser.add_argument("--legacy-max", type=float, default=4, help="Largest size (MB) to run the legacy reader on")
+    args = parser.parse_args()
+
+    print(f"{'reader':<8} {'size':>8} {'seconds':>9} {'MB/s':>9} {'peak heap':>11} {'heap/resp':>10}")
+    for mb in [float(x) for x in args.sizes.split(',') if x]:
+        size = int(mb * 1024 * 1024)
+        readers = [('chunked', lib_ai._run_streaming_process)]
+        if mb <= args.legacy_max: readers.append(('legacy', legacy_streaming_process))
+        for name, reader in readers:
+            r = measure(reader, size)
+            rate = (r['bytes'] / 1048576) / r['seconds'] if r['seconds'] else 0
+            ratio = r['peak'] / r['bytes'] if r['bytes'] else 0
+            print(f"{name:<8} {mb:>6.1f}MB {r['seconds']:>9.3f} {rate:>9.1f} {r['peak']/1048576:>9.1f}MB {ratio:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# benchmarq/bench_workers.py - Briq queue throughput vs. number of briqworqer processes
+"""
+Hosts a briq queue (no local slots) in this process, starts N briqworqer.py
+processes against it on a Unix socket and pushes a fixed number of briqs
+through the fake provider, for each N in --workers. With --faults, one
+worQer is killed and one is frozen (SIGSTOP) mid-run: their briqs must be
+re-queued (dropped connection / expired lease) and every briq still built.
+With --stall S, every call streams its first text and then goes silent for S
+seconds (longer than --lease): heartbeats must keep the leases alive, so no
+lease may expire.
+
+Usage: python3 benchmarq/bench_workers.py [--briqs 32] [--workers 1 2 4 8] [--latency 0.5] [--faults] [--stall S]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(PROJECT_ROOT / "worqer"))
+from fake_provider import install_fake_clis
+import lib_ai
+import lib_briqqueue
+
+CONFIG = {'agents': {'construqtor': {'provider': 'gemini', 'model': 'fake'}}, 'options': {'cache': False}}
+
+def start_workers(n: int, address: str, env: dict, root: Path) -> list:
+    return [subprocess.Popen([sys.executable, str(PROJECT_ROOT / "worqer" / "briqworqer.py"), address, "--worqspace", str(root / f"w{i}")],
+                             env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for i in range(n)]
+
+def run(n: int, args, env: dict, root: Path) -> tuple:
+    """(wall seconds, briqs built, {worker: briqs}, leases expired) for n worQers."""
+    sock = root / f"q{n}.sock"
+    expired = []
+    queue = lib_briqqueue.BriqQueue(f"unix:{sock}", CONFIG, local_slots=0, lease_s=args.lease,
+                                    log=lambda msg: expired.append(msg) if "lease expired" in msg else None)
+    queue.start()
+    procs = start_workers(n, f"unix:{sock}", env, root / f"run{n}")
+    deadline = time.monotonic() + 30
+    while len(queue.workers) < n and time.monotonic() < deadline: time.sleep(0.05) # Startup is not throughput
+    ledger = root / f"metrics{n}.jsonl"
+    os.environ['QONQ_METRICS_FILE'] = str(ledger)
+
+    def build(i: int):
+        with lib_ai.briq_scope(f"cyqle1_briq{i:03d}.md"):
+            return queue.complete('gemini', 'fake', f"Implement module {i}", cache=False, tools=False)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.briqs) as pool:
+            t0 = time.perf_counter()
+            futures = [pool.submit(build, i) for i in range(args.briqs)]
+            if args.faults and n >= 3:
+                time.sleep(args.latency * 1.5)
+                procs[0].kill()
+                os.kill(procs[1].pid, signal.SIGSTOP)
+            built = sum(1 for f in futures if not f.exception() and f.result())
+            wall = time.perf_counter() - t0
+    finally:
+        queue.close()
+        for p in procs:
+            try: os.kill(p.pid, signal.SIGCONT)
+            except OSError: pass
+            p.kill()
+            p.wait()
+    per_worker = {}
+    for line in (ledger.read_text().splitlines() if ledger.exists() else []):
+        rec = json.loads(line)
+        per_worker[rec['worker']] = per_worker.get(rec['worker'], 0) + 1
+    return wall, built, per_worker, len(expired)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark briq queue throughput against the number of briq worQers")
+    parser.add_argument("--briqs", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake provider time to first byte (s)")
+    parser.add_argument("--lease", type=float, default=3.0, help="Lease seconds (a frozen worQer is cut off after this)")
+    parser.add_argument("--faults", action="store_true", help="Kill one worQer and freeze another mid-run (needs >= 3 workers)")
+    parser.add_argument("--stall", type=float, default=0.0, help="Seconds each call goes silent after its first text (set above --lease)")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="qonq_workers_"))
+    env = install_fake_clis(str(root / "bin"))
+    env.update(FAKE_LATENCY=str(args.latency), FAKE_OUTPUT_BYTES="2048", FAKE_STALL=str(args.stall))
+    os.environ['CYCLE_NUM'] = '1'
+    sys.stderr = open(os.devnull, 'w') # The queue mirrors the worQers' streamed text to stderr
+    print(f"{'worQers':>7} {'briqs':>6} {'wall s':>8} {'briqs/s':>8} {'speedup':>8}  per worQer")
+    base = None
+    try:
+        for n in args.workers:
+            wall, built, per_worker, expired = run(n, args, env, root)
+            base = base or wall
+            flag = "" if built == args.briqs else f"  ({args.briqs - built} lost)"
+            if expired and not args.faults: flag += f"  ({expired} leases expired)"
+            print(f"{n:>7} {built:>6} {wall:>8.2f} {built / wall:>8.2f} {base / wall:>7.2f}x  "
+                  f"{sorted(per_worker.values(), reverse=True)}{flag}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
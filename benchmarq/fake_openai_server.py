@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# benchmarq/fake_openai_server.py - Local stand-in for an OpenAI-compatible endpoint
+"""
+Serves POST /v1/chat/completions with HTTP/1.1 keep-alive. Streamed requests
+get server-sent events over chunked transfer encoding, like the real API.
+
+Usage: python3 benchmarq/fake_openai_server.py [--port 8765] [--latency 0.2] [--output-bytes 4096]
+Then point the openai-http provider at it: OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, output_bytes: int = 4096, token_size: int = 16, respond=None):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.output_bytes = output_bytes
+        self.token_size = token_size
+        # Optional callable(prompt) -> str, used by the offline benchmark suite
+        self.respond = respond
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        conn = super().get_request()
+        with self._lock: self.connections += 1
+        return conn
+
+    def completion_text(self, prompt: str) -> str:
+        if self.respond: return self.respond(prompt)
+        line = "def handler(request):  # qonqrete fake completion\n"
+        return (line * (self.output_bytes // len(line) + 1))[:self.output_bytes]
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        with self.server._lock: self.server.requests += 1
+        prompt = "".join(m.get('content', '') for m in request.get('messages', []))
+        text = self.server.completion_text(prompt)
+        time.sleep(self.server.latency)
+
+        if not request.get('stream'):
+            body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': text}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        step = self.server.token_size
+        for i in range(0, len(text), step):
+            event = {'choices': [{'delta': {'content': text[i:i + step]}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+def start_server(port: int = 0, **kwargs) -> FakeOpenAIServer:
+    """Starts the server on a background thread; port 0 picks a free port."""
+    server = FakeOpenAIServer(('127.0.0.1', port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--output-bytes", type=int, default=4096)
+    args = parser.parse_args()
+    server = FakeOpenAIServer(('127.0.0.1', args.port), latency=args.latency, output_bytes=args.output_bytes)
+    print(f"Fake OpenAI endpoint on http://127.0.0.1:{server.server_address[1]}/v1", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# benchmarq/fake_provider.py - Offline stand-in for the sgpt/gemini CLIs
+"""
+Reads the prompt from stdin (like lib_ai feeds sgpt/gemini) and streams a
+synthetic response to stdout. Tunable through environment variables:
+
+  FAKE_LATENCY       seconds to wait before the first byte   (default 0)
+  FAKE_OUTPUT_BYTES  approximate size of the response         (default 4096)
+  FAKE_LINE_LEN      characters per emitted line              (default 80)
+  FAKE_WRITE_SIZE    bytes per stdout write                   (default 4096)
+  FAKE_EXIT_CODE     exit status                               (default 0)
+  FAKE_MODE          lorem (default) or qonqrete
+  FAKE_BRIQS         briqs per instruQtor plan, qonqrete mode  (default 8)
+  FAKE_BRIQ_DELAY    seconds spent "generating" each plan briq (default 0)
+  FAKE_TOOL_WRITES   1 (default): the construQtor response is also written to
+                     qodeyard/ like a tool call; 0 leaves that to the materializer
+  FAKE_STALL         seconds to go silent after the first write (default 0)
+  FAKE_SLOW_RATE     probability a call stalls FAKE_SLOW_LATENCY seconds
+                     (default 0 / 30) before its first byte
+  FAKE_THROTTLE_RATE probability of answering "429 Too Many Requests" (default 0)
+  FAKE_MAX_INFLIGHT  answer 429 while more calls than this are in flight,
+                     counted in FAKE_STATE_DIR                 (default 0 = off)
+
+In qonqrete mode the response follows the prompt's agent: the instruQtor
+gets a <briq> XML plan, the construQtor gets fenced code (and, like gemini
+in yolo mode, the file is also written to qodeyard/), the inspeQtor gets a
+reQap starting with "Assessment: Success".
+
+Installed on PATH as `sgpt`/`gemini` by install_fake_clis().
+"""
+import atexit
+import os
+import random
+import re
+import stat
+import sys
+import time
+
+def env_num(name: str, default, cast=int):
+    try: return cast(os.environ.get(name, default))
+    except ValueError: return default
+
+def synthetic_lines(total_bytes: int, line_len: int):
+    line = ("lorem ipsum dolor sit amet qonqrete " * (line_len // 36 + 1))[:max(1, line_len - 1)] + "\n"
+    emitted = 0
+    n = 0
+    while emitted < total_bytes:
+        out = f"{n:08d} {line}"
+        emitted += len(out)
+        n += 1
+        yield out
+
+def synthetic_code(name: str, total_bytes: int) -> str:
+    lines = [f'"""{name}: generated by the fake provider."""', "import logging", "", f"logger = logging.getLogger({name!r})", ""]
+    size = sum(len(l) + 1 for l in lines)
+    n = 0
+    while size < total_bytes:
+        fn = [f"def {name}_step_{n}(value: int) -> int:", f'    logger.debug("step {n} %s", value)', f"    return value * {n + 2} + {n}", ""]
+        lines += fn
+        size += sum(len(l) + 1 for l in fn)
+        n += 1
+    return "\n".join(lines) + "\n"
+
+def qonqrete_response(prompt: str):
+    """Yields the response in chunks (a plan streams briq by briq)."""
+    total = env_num('FAKE_OUTPUT_BYTES', 4096)
+    if "ATOMIC BREAKDOWN" in prompt:
+        delay = env_num('FAKE_BRIQ_DELAY', 0.0, float)
+        # Chunked planning: each section gets its own modules (section k numbers from k*100)
+        section = re.search(r'SECTION (\d+)/\d+', prompt)
+        base = (int(section.group(1)) - 1) * 100 if section else 0
+        for i in range(env_num('FAKE_BRIQS', 8)):
+            if i and delay: time.sleep(delay)
+            n = base + i
+            yield f'<briq title="{n:03d}_Module_{n}">\n- Create `module_{n:03d}.py` with `module_{n:03d}_step_0`\n- Log every step\n</briq>\n'
+        return
+    if "'construQtor'" in prompt:
+        m = re.search(r'\*\*Plan:\*\*\s*#\s*(\S+)', prompt)
+        name = "module_" + (m.group(1).split('_', 1)[0] if m else "x").lower()
+        code = synthetic_code(name, total)
+        if os.path.isdir("qodeyard") and env_num('FAKE_TOOL_WRITES', 1):
+            tmp = os.path.join("qodeyard", f".tmp_{name}.py")
+            with open(tmp, 'w', encoding='utf-8') as f: f.write(code)
+            os.replace(tmp, os.path.join("qodeyard", f"{name}.py"))
+        yield f"File: {name}.py\n```python\n{code}```\n"
+    elif "'inspeQtor'" in prompt:
+        body = "".join(synthetic_lines(total, env_num('FAKE_LINE_LEN', 80)))
+        yield f"Assessment: Success\n\n## Summary\nAll briqs built.\n\n## Suggestions\n{body}"
+    else:
+        yield "".join(synthetic_lines(total, env_num('FAKE_LINE_LEN', 80)))
+
+def install_fake_clis(bin_dir: str, env: dict = None) -> dict:
+    """Writes `sgpt` and `gemini` shims into bin_dir; returns env with bin_dir first on PATH."""
+    os.makedirs(bin_dir, exist_ok=True)
+    for name in ("sgpt", "gemini"):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as f:
+            f.write(f"#!/bin/sh\nexec {sys.executable} {os.path.abspath(__file__)} \"$@\"\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    env = dict(os.environ if env is None else env)
+    env['PATH'] = bin_dir + os.pathsep + env.get('PATH', '')
+    env.setdefault('FAKE_MODE', 'qonqrete')
+    return env
+
+def throttle(message: str = "Error: 429 Too Many Requests - rate limit reached"):
+    sys.stderr.write(message + "\n")
+    sys.exit(1)
+
+def main():
+    prompt = sys.stdin.read()
+    if random.random() < env_num('FAKE_THROTTLE_RATE', 0.0, float): throttle()
+    max_inflight, state_dir = env_num('FAKE_MAX_INFLIGHT', 0), os.environ.get('FAKE_STATE_DIR')
+    if max_inflight and state_dir:
+        os.makedirs(state_dir, exist_ok=True)
+        marker = os.path.join(state_dir, f"inflight_{os.getpid()}")
+        open(marker, 'w').close()
+        atexit.register(os.unlink, marker)
+        if len([n for n in os.listdir(state_dir) if n.startswith('inflight_')]) > max_inflight: throttle()
+    time.sleep(env_num('FAKE_LATENCY', 0.0, float))
+    if random.random() < env_num('FAKE_SLOW_RATE', 0.0, float): time.sleep(env_num('FAKE_SLOW_LATENCY', 30.0, float))
+
+    write_size = env_num('FAKE_WRITE_SIZE', 4096)
+    stall = env_num('FAKE_STALL', 0.0, float)
+    out = sys.stdout.buffer
+    def write(data: bytes):
+        nonlocal stall
+        out.write(data); out.flush()
+        if stall: time.sleep(stall); stall = 0 # Streamed, then silent (a model thinking mid-response)
+    if os.environ.get('FAKE_MODE') == 'qonqrete':
+        for chunk in qonqrete_response(prompt):
+            data = chunk.encode('utf-8')
+            for i in range(0, len(data), write_size):
+                write(data[i:i + write_size])
+        sys.exit(env_num('FAKE_EXIT_CODE', 0))
+
+    buf = []
+    size = 0
+    for line in synthetic_lines(env_num('FAKE_OUTPUT_BYTES', 4096), env_num('FAKE_LINE_LEN', 80)):
+        buf.append(line)
+        size += len(line)
+        if size >= write_size:
+            write("".join(buf).encode('utf-8'))
+            buf = []; size = 0
+    if buf: write("".join(buf).encode('utf-8'))
+    sys.exit(env_num('FAKE_EXIT_CODE', 0))
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,26 @@ log_qrane() {
     echo -e "${PREFIX_TPL/\{PREFIX\}/$prefix} $1"
 }
 
+require_api_keys() {
+    if [[ -z "${OPENAI_API_KEY:-}" || -z "${GOOGLE_API_KEY:-}" ]]; then
+        log_qrane "[ERROR] API Keys missing."; exit 1
+    fi
+}
+
+# launch_qage <tty flags> <mounts> <container cmd>: runs the command in the Qage (Docker or msb)
+launch_qage() {
+    local tty_flags="$1" mounts="$2" container_cmd="$3"
+    local dev_mounts="-v ${SCRIPT_DIR}/qrane:/qonqrete/qrane -v ${SCRIPT_DIR}/worqer:/qonqrete/worqer"
+    local cmd_bin="docker"
+    if [ "$RUNTIME_MODE" == "msb" ]; then
+        cmd_bin="msb"; if command -v mbx >/dev/null 2>&1; then cmd_bin="mbx"; fi
+    fi
+    # [FIX] Pass the container command as a single quoted argument to bash -c
+    $cmd_bin run --rm $tty_flags $mounts $dev_mounts \
+        -e OPENAI_API_KEY="$OPENAI_API_KEY" -e GOOGLE_API_KEY="$GOOGLE_API_KEY" -e GEMINI_API_KEY="$GOOGLE_API_KEY" -e OPENAI_BASE_URL \
+        -e QONQ_CACHE_DIR=/qache "$IMAGE_NAME" /bin/bash -c "$container_cmd"
+}
+
 exec_qrane() {
     "$@" 2>&1 | while IFS= read -r line; do
         echo -e "${PREFIX_TPL/\{PREFIX\}/_QQ} $line"
@@ -58,6 +78,10 @@ Commands:
   init            Build the Qage container image.
   run             Start the Qrane orchestration engine.
   clean           Remove all 'qage_*' run directories from worqspace.
+  stats [QAGE]    Print the metrics report of a run (default: the latest qage).
+  logs [QAGE] ... Query the agent logs of a run (default: the latest qage; logs --help for filters).
+  worqer <ADDR>   Build briqs for a construQtor's briq queue (unix:PATH or tcp:HOST:PORT, --slots N).
+  batch <DIR>     Run every *.md tasq in DIR autonomously, one qage per tasq.
 
 Global Options:
   -h, --help      Show this help message.
@@ -71,6 +95,11 @@ Run Options:
   -s, --msb                   Force Microsandbox (msb).
   -d, --docker                Force Docker.
   -w, --wonqrete              Enable experimental mode.
+      --no-cache              Bypass the LLM response cache (worqspace/qache.d).
+      --resume <QAGE>         Resume an interrupted run in worqspace/<QAGE> (skips finished work).
+
+Batch Options:
+      --max-agents <N>        Agent processes running at once across all qages (default: CPU count).
 EOF
 }
 
@@ -98,12 +127,47 @@ while [[ $# -gt 0 ]]; do
             COMMAND="$1"
             shift
             ;;
+        stats)
+            COMMAND="$1"
+            shift
+            if [[ $# -gt 0 && "$1" != -* ]]; then STATS_TARGET="$1"; shift; fi
+            ;;
+        logs)
+            COMMAND="$1"
+            shift
+            if [[ $# -gt 0 && "$1" != -* ]]; then LOGS_TARGET="$1"; shift; fi
+            LOGS_ARGS=("$@")
+            break
+            ;;
+        worqer)
+            COMMAND="$1"
+            shift
+            WORQER_ARGS=("$@")
+            break
+            ;;
+        batch)
+            COMMAND="$1"
+            BATCH_DIR="${2:-}"
+            # Resolved against the caller's directory: execution runs from $SCRIPT_DIR
+            if [[ -n "$BATCH_DIR" && -d "$BATCH_DIR" ]]; then BATCH_DIR="$(cd "$BATCH_DIR" && pwd)"; fi
+            shift; [[ $# -gt 0 ]] && shift
+            ;;
+        --max-agents)
+            PY_ARGS="$PY_ARGS --max-agents $2"
+            shift 2
+            ;;
         -h|--help) show_help; exit 0 ;;
         -V|--version) show_version; exit 0 ;;
 
         -a|--auto) PY_ARGS="$PY_ARGS --auto"; shift ;;
         -t|--tui) PY_ARGS="$PY_ARGS --tui"; shift ;;
         -w|--wonqrete) PY_ARGS="$PY_ARGS --wonqrete"; shift ;;
+        --no-cache) PY_ARGS="$PY_ARGS --no-cache"; shift ;;
+        --resume)
+            RESUME_QAGE="$2"
+            PY_ARGS="$PY_ARGS --resume"
+            shift 2
+            ;;
 
         -m|--mode)
             PY_ARGS="$PY_ARGS --mode $2"
@@ -168,30 +232,63 @@ case "$COMMAND" in
         fi
         ;;
 
-    run)
-        if [[ -z "${OPENAI_API_KEY:-}" || -z "${GOOGLE_API_KEY:-}" ]]; then
-            log_qrane "[ERROR] API Keys missing."; exit 1
-        fi
+    stats)
+        if [[ -z "$STATS_TARGET" ]]; then STATS_TARGET="$(ls -d "${WORKSPACE_DIR}"/qage_* 2>/dev/null | sort | tail -n 1)"; fi
+        if [[ -z "$STATS_TARGET" ]]; then log_qrane "[ERROR] No 'qage_*' directories found."; exit 1; fi
+        python3 qrane/metrics.py "$STATS_TARGET"
+        ;;
+
+    logs)
+        if [[ -z "${LOGS_TARGET:-}" ]]; then LOGS_TARGET="$(ls -d "${WORKSPACE_DIR}"/qage_* 2>/dev/null | sort | tail -n 1)"; fi
+        if [[ -z "$LOGS_TARGET" ]]; then log_qrane "[ERROR] No 'qage_*' directories found."; exit 1; fi
+        python3 qrane/logstore.py "$LOGS_TARGET" ${LOGS_ARGS[@]+"${LOGS_ARGS[@]}"}
+        ;;
 
-        TIMESTAMP="$(date +%Y%m%d_%H%M%S)"
-        RUN_DIR_NAME="qage_${TIMESTAMP}"
-        RUN_HOST_PATH="${WORKSPACE_DIR}/${RUN_DIR_NAME}"
+    worqer)
+        if [[ ${#WORQER_ARGS[@]} -eq 0 ]]; then log_qrane "[ERROR] worqer needs the briq queue address."; exit 1; fi
+        python3 worqer/briqworqer.py "${WORQER_ARGS[@]}"
+        ;;
 
-        if [ "$RUNTIME_MODE" == "msb" ]; then
-             log_qrane "Seeding worQspace in Qage at: $RUN_HOST_PATH"
+    batch)
+        if [[ -z "${BATCH_DIR:-}" || ! -d "$BATCH_DIR" ]]; then log_qrane "[ERROR] batch needs a directory of tasq files."; exit 1; fi
+        require_api_keys
+        mkdir -p "${WORKSPACE_DIR}/qache.d"
+        # Sandboxed like run: every job gets its own qage under worqspace/, the tasqs are mounted read-only
+        BATCH_MOUNTS="-v ${WORKSPACE_DIR}:${CONTAINER_WORKSPACE} -v ${BATCH_DIR}:/tasqs:ro -v ${WORKSPACE_DIR}/qache.d:/qache"
+        TTY_FLAGS="-i"; if [ -t 0 ] && [ -t 1 ]; then TTY_FLAGS="-it"; fi
+        launch_qage "$TTY_FLAGS" "$BATCH_MOUNTS -e QONQ_WORKSPACE=${CONTAINER_WORKSPACE}" "exec python3 qrane/qrane.py --batch /tasqs ${PY_ARGS}"
+        ;;
+
+    run)
+        require_api_keys
+
+        if [[ -n "${RESUME_QAGE:-}" ]]; then
+            # Resume the existing qage in place (its journal decides where to continue)
+            RUN_HOST_PATH="${WORKSPACE_DIR}/$(basename "$RESUME_QAGE")"
+            if [ ! -d "$RUN_HOST_PATH/struqture" ]; then log_qrane "[ERROR] No qage to resume at: $RUN_HOST_PATH"; exit 1; fi
+            log_qrane "Resuming worQspace at: $RUN_HOST_PATH"
         else
-             log_qrane "Seeding worQspace locally at: $RUN_HOST_PATH"
-        fi
+            TIMESTAMP="$(date +%Y%m%d_%H%M%S)"
+            RUN_DIR_NAME="qage_${TIMESTAMP}"
+            RUN_HOST_PATH="${WORKSPACE_DIR}/${RUN_DIR_NAME}"
+
+            if [ "$RUNTIME_MODE" == "msb" ]; then
+                 log_qrane "Seeding worQspace in Qage at: $RUN_HOST_PATH"
+            else
+                 log_qrane "Seeding worQspace locally at: $RUN_HOST_PATH"
+            fi
 
-        mkdir -p "$RUN_HOST_PATH"/{tasq.d,exeq.d,reqap.d,qodeyard,struqture}
+            mkdir -p "$RUN_HOST_PATH"/{tasq.d,exeq.d,reqap.d,qodeyard,struqture}
 
-        if [ -f "${WORKSPACE_DIR}/config.yaml" ]; then cp "${WORKSPACE_DIR}/config.yaml" "$RUN_HOST_PATH/"; fi
-        if [ -f "${WORKSPACE_DIR}/pipeline_config.yaml" ]; then cp "${WORKSPACE_DIR}/pipeline_config.yaml" "$RUN_HOST_PATH/"; fi
-        if [ -f "${WORKSPACE_DIR}/tasq.md" ]; then cp "${WORKSPACE_DIR}/tasq.md" "$RUN_HOST_PATH/tasq.d/cyqle1_tasq.md"
-        else echo "Create a simple Python script." > "$RUN_HOST_PATH/tasq.d/cyqle1_tasq.md"; fi
+            if [ -f "${WORKSPACE_DIR}/config.yaml" ]; then cp "${WORKSPACE_DIR}/config.yaml" "$RUN_HOST_PATH/"; fi
+            if [ -f "${WORKSPACE_DIR}/pipeline_config.yaml" ]; then cp "${WORKSPACE_DIR}/pipeline_config.yaml" "$RUN_HOST_PATH/"; fi
+            if [ -f "${WORKSPACE_DIR}/tasq.md" ]; then cp "${WORKSPACE_DIR}/tasq.md" "$RUN_HOST_PATH/tasq.d/cyqle1_tasq.md"
+            else echo "Create a simple Python script." > "$RUN_HOST_PATH/tasq.d/cyqle1_tasq.md"; fi
+        fi
+        # Response cache is shared across qages so re-runs can replay earlier stages
+        mkdir -p "${WORKSPACE_DIR}/qache.d"
 
-        DEV_MOUNTS="-v ${SCRIPT_DIR}/qrane:/qonqrete/qrane -v ${SCRIPT_DIR}/worqer:/qonqrete/worqer"
-        RUN_MOUNTS="-v ${RUN_HOST_PATH}:${CONTAINER_WORKSPACE}"
+        RUN_MOUNTS="-v ${RUN_HOST_PATH}:${CONTAINER_WORKSPACE} -v ${WORKSPACE_DIR}/qache.d:/qache"
 
         # [NEW] Container-side Splash Logic
         SPLASH_CMD=""
@@ -202,16 +299,6 @@ case "$COMMAND" in
         # [FIX] Construct the internal command string safely
         CONTAINER_CMD="${SPLASH_CMD} exec python3 qrane/qrane.py ${PY_ARGS}"
 
-        if [ "$RUNTIME_MODE" == "msb" ]; then
-            CMD_BIN="msb"; if command -v mbx >/dev/null 2>&1; then CMD_BIN="mbx"; fi
-            $CMD_BIN run --rm -it $RUN_MOUNTS $DEV_MOUNTS \
-                -e OPENAI_API_KEY="$OPENAI_API_KEY" -e GOOGLE_API_KEY="$GOOGLE_API_KEY" -e GEMINI_API_KEY="$GOOGLE_API_KEY" \
-                -e QONQ_WORKSPACE="$CONTAINER_WORKSPACE" "$IMAGE_NAME" /bin/bash -c "$CONTAINER_CMD"
-        else
-            # [FIX] Pass CONTAINER_CMD as a single quoted argument to bash -c
-            docker run --rm -it $RUN_MOUNTS $DEV_MOUNTS \
-                -e OPENAI_API_KEY="$OPENAI_API_KEY" -e GOOGLE_API_KEY="$GOOGLE_API_KEY" -e GEMINI_API_KEY="$GOOGLE_API_KEY" \
-                -e QONQ_WORKSPACE="$CONTAINER_WORKSPACE" "$IMAGE_NAME" /bin/bash -c "$CONTAINER_CMD"
-        fi
+        launch_qage "-it" "$RUN_MOUNTS -e QONQ_WORKSPACE=${CONTAINER_WORKSPACE}" "$CONTAINER_CMD"
         ;;
 esac
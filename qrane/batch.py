@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# qrane/batch.py - Multi-tasq batch scheduler (one qage per tasq)
+"""
+Runs many qages in autonomous mode under one AgentSupervisor. The unit of
+scheduling is an agent: each job's cyQle is a pipeline.ReadySet, and an
+agent starts as soon as its own dependencies have finished. At most
+`max_agents` agent processes run at once across all jobs, and free slots
+are handed out round-robin, one agent at a time, so a job with a long
+construQtor never starves the others of their short instruQtor/inspeQtor runs.
+"""
+import time
+
+from journal import input_digest
+
+class BatchJob:
+    def __init__(self, name: str, root, cycles: int, env: dict, ledger=None, journal=None, specs=None):
+        self.name = name
+        self.root = root
+        self.cycles = cycles
+        self.env = env
+        self.specs = specs or []
+        self.ledger = ledger
+        self.journal = journal
+        self.cycle = 1
+        self.schedule = None
+        self.agents = {}
+        self.running = {}
+        self.failed = False
+        self.status = 'queued'
+        self.started = None
+        self.ended = None
+        self.cycle_start = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None: return 0.0
+        return (self.ended or time.monotonic()) - self.started
+
+class BatchScheduler:
+    """
+    plan_cycle(job) -> (ReadySet, agents) for job.cycle, agents mapping each
+    agent_name to (command, env, log_file, input_path); spawn(command, env, cwd) -> process;
+    finish_cycle(job) runs after every agent of a cycle has succeeded.
+    """
+    def __init__(self, jobs: list, max_agents: int, supervisor, plan_cycle, spawn, finish_cycle, log=print):
+        self.jobs = jobs
+        self.max_agents = max(1, max_agents)
+        self.supervisor = supervisor
+        self.supervisor.on_exit = self._on_exit
+        self.plan_cycle = plan_cycle
+        self.spawn = spawn
+        self.finish_cycle = finish_cycle
+        self.log = log
+        self.next_job = 0
+
+    def run(self):
+        for job in self.jobs: self._plan(job)
+        self._fill()
+        self.supervisor.run()
+
+    def _active_agents(self) -> int:
+        return sum(len(job.running) for job in self.jobs)
+
+    def _plan(self, job: BatchJob):
+        job.cycle_start = time.monotonic()
+        try: job.schedule, job.agents = self.plan_cycle(job)
+        except Exception as e:
+            self._finish(job, 'failed', f"planning cyQle {job.cycle} failed: {e}")
+
+    def _fill(self):
+        # Round-robin over jobs, one ready agent per free slot
+        progressed = True
+        while progressed and self._active_agents() < self.max_agents:
+            progressed = False
+            for offset in range(len(self.jobs)):
+                index = (self.next_job + offset) % len(self.jobs)
+                job = self.jobs[index]
+                if job.status in ('done', 'failed') or job.failed or job.schedule is None: continue
+                ready = job.schedule.take(limit=1)
+                if not ready: continue
+                self._start_agent(job, ready[0].name)
+                self.next_job = index + 1
+                progressed = True
+                break
+
+    def _start_agent(self, job: BatchJob, name: str):
+        if job.started is None: job.started = time.monotonic()
+        job.status = 'running'
+        command, env, log_file, input_path = job.agents[name]
+        try: proc = self.spawn(command, env, job.root)
+        except Exception as e:
+            job.failed = True
+            if job.running: self.log(f"{job.name}: failed to start {name}: {e}")
+            else: self._finish(job, 'failed', f"failed to start {name}: {e}")
+            return
+        agent = self.supervisor.add(f"{job.name}/{name}", proc, log_file)
+        agent.job, agent.agent_name, agent.input_path = job, name, input_path
+        job.running[name] = agent
+
+    def _on_exit(self, agent):
+        job = getattr(agent, 'job', None)
+        if job is None: return
+        job.running.pop(agent.agent_name, None)
+        ok = agent.returncode == 0
+        wall_s = round(agent.ended - agent.started, 4)
+        if job.ledger: job.ledger.record('agent', job.cycle, agent=agent.agent_name, wall_s=wall_s, ok=ok)
+        if ok:
+            job.schedule.finish(agent.agent_name)
+            if job.journal: job.journal.mark_agent(job.cycle, agent.agent_name, input_digest(agent.input_path, job.cycle))
+        if not ok and not job.failed:
+            job.failed = True
+            self.log(f"{job.name}: cyQle {job.cycle} {agent.agent_name} failed (code {agent.returncode})")
+            for other in job.running.values():
+                try: other.proc.kill() # Pipelined partners of a failed agent
+                except Exception: pass
+
+        if not job.running:
+            if job.failed:
+                self._finish(job, 'failed')
+            elif job.schedule.complete:
+                self._complete_cycle(job)
+        self._fill()
+
+    def _complete_cycle(self, job: BatchJob):
+        try: self.finish_cycle(job)
+        except Exception as e:
+            self._finish(job, 'failed', f"cheqpoint of cyQle {job.cycle} failed: {e}")
+            return
+        self.log(f"{job.name}: cyQle {job.cycle} done ({job.duration:.1f}s elapsed)")
+        if job.cycle >= job.cycles:
+            self._finish(job, 'done')
+            return
+        job.cycle += 1
+        self._plan(job)
+
+    def _finish(self, job: BatchJob, status: str, reason: str = None):
+        job.status = status
+        job.schedule = None
+        job.ended = time.monotonic()
+        if reason: self.log(f"{job.name}: {reason}")
+
+def render_summary(jobs: list) -> str:
+    width = max([len(j.name) for j in jobs] + [4])
+    lines = [f"{'tasq':<{width}}  {'status':<7} {'cyQles':>6} {'duration':>9}  qage"]
+    for job in jobs:
+        cycles = job.cycle if job.status == 'done' else job.cycle - 1
+        lines.append(f"{job.name:<{width}}  {job.status:<7} {cycles:>6} {job.duration:>8.1f}s  {job.root.name}")
+    done = sum(1 for j in jobs if j.status == 'done')
+    lines.append(f"{done}/{len(jobs)} tasqs finished")
+    return "\n".join(lines)
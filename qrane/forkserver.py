@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# qrane/forkserver.py - Pre-imported fork server for worQer agents
+"""
+Launching `python3 worqer/<script>.py` for every agent re-pays interpreter
+startup, the yaml/lib_ai imports and the config.yaml parse on every cycle.
+The fork server pays them once: it is started per run with the worqer
+libraries imported, and every agent is forked from that warm parent.
+
+Protocol (AF_UNIX stream socket, one connection per agent):
+  client -> server   JSON line {"argv", "env", "cwd"} + stdout/stderr fds (SCM_RIGHTS)
+  server -> client   JSON line {"pid": N}
+  server -> client   JSON line {"returncode": N} once the agent has exited
+
+The agent sees the same argv, env, cwd and exit code contract as a
+subprocess launch; stdin is /dev/null.
+"""
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+PRELOAD_MODULES = ["yaml", "lib_ai", "concurrent.futures", "json", "hashlib", "http.client"]
+
+# --- Server side -------------------------------------------------------------
+
+def serve(sock_path: str, worqer_dir: str):
+    sys.path.insert(0, worqer_dir)
+    for name in PRELOAD_MODULES:
+        try: __import__(name)
+        except Exception: pass
+    try:
+        import lib_ai
+        lib_ai.load_config() # Warm parse of the worqspace config.yaml (cwd)
+    except Exception: pass
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(sock_path)
+    listener.listen(16)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Qrane owns Ctrl-C handling
+
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ, 'accept')
+    children = {} # pid -> client connection
+    use_pidfd = hasattr(os, 'pidfd_open')
+
+    while True:
+        events = sel.select(None if use_pidfd else 0.1)
+        for key, _ in events:
+            if key.data == 'accept':
+                conn, _ = listener.accept()
+                request, fds = _recv_request(conn)
+                if request is None:
+                    conn.close(); continue
+                if request.get('op') == 'shutdown':
+                    conn.close(); listener.close()
+                    for pid in list(children): _reap(pid, children, sel, block=True)
+                    return
+                sys.stdout.flush(); sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    sel.close(); listener.close(); conn.close()
+                    _run_child(request, fds)
+                for fd in fds: os.close(fd)
+                _send(conn, {'pid': pid})
+                children[pid] = conn
+                if use_pidfd:
+                    sel.register(os.pidfd_open(pid), selectors.EVENT_READ, ('exit', pid))
+            else:
+                _reap(key.data[1], children, sel, pidfd=key.fd)
+        if not use_pidfd:
+            for pid in list(children): _reap(pid, children, sel, block=False)
+
+def _reap(pid: int, children: dict, sel, pidfd=None, block=True):
+    try: done, status = os.waitpid(pid, 0 if block else os.WNOHANG)
+    except ChildProcessError: done, status = pid, 0
+    if not done: return
+    if pidfd is not None:
+        sel.unregister(pidfd); os.close(pidfd)
+    conn = children.pop(pid, None)
+    if conn:
+        try: _send(conn, {'returncode': os.waitstatus_to_exitcode(status)})
+        except OSError: pass
+        conn.close()
+
+def _run_child(request: dict, fds: list):
+    code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0); os.dup2(fds[0], 1); os.dup2(fds[1], 2)
+        for fd in [devnull] + list(fds):
+            if fd > 2: os.close(fd)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.chdir(request['cwd'])
+        os.environ.clear(); os.environ.update(request['env'])
+        sys.argv = request['argv'][1:] # Drop the interpreter, keep script + args
+        code = 0
+        runpy.run_path(sys.argv[0], run_name='__main__')
+    except SystemExit as e:
+        if e.code is None: code = 0
+        elif isinstance(e.code, int): code = e.code
+        else: sys.stderr.write(f"{e.code}\n"); code = 1
+    except BaseException:
+        traceback.print_exc(); code = 1
+    finally:
+        try: sys.stdout.flush(); sys.stderr.flush()
+        except Exception: pass
+        os._exit(code)
+
+def _recv_request(conn):
+    buf = b""
+    fds = []
+    while not buf.endswith(b"\n"):
+        data, new_fds, _, _ = socket.recv_fds(conn, 65536, 4)
+        fds.extend(new_fds)
+        if not data: return None, fds
+        buf += data
+    return json.loads(buf), fds
+
+def _send(conn, message: dict):
+    conn.sendall((json.dumps(message) + "\n").encode())
+
+# --- Client side (Qrane) -----------------------------------------------------
+
+class ForkedProcess:
+    """Popen-compatible handle for an agent forked by the fork server."""
+    def __init__(self, conn, stdout, stderr):
+        self.conn = conn
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._buf = b""
+        self.pid = self._read_message(timeout=None)['pid']
+
+    def _read_message(self, timeout):
+        # timeout: None = block, 0 = non-blocking poll
+        self.conn.settimeout(timeout)
+        try:
+            while b"\n" not in self._buf:
+                data = self.conn.recv(4096)
+                if not data: raise ConnectionError("fork server closed the connection")
+                self._buf += data
+        except BlockingIOError:
+            return None
+        line, self._buf = self._buf.split(b"\n", 1)
+        return json.loads(line)
+
+    def poll(self):
+        if self.returncode is None:
+            try: msg = self._read_message(timeout=0)
+            except ConnectionError: msg = {'returncode': -signal.SIGKILL}
+            if msg: self._finish(msg['returncode'])
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is None:
+            try: msg = self._read_message(timeout=timeout)
+            except socket.timeout: raise subprocess.TimeoutExpired(self.pid, timeout)
+            except ConnectionError: msg = {'returncode': -signal.SIGKILL}
+            self._finish(msg['returncode'])
+        return self.returncode
+
+    def _finish(self, returncode: int):
+        self.returncode = returncode
+        self.conn.close()
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            try: os.kill(self.pid, sig)
+            except ProcessLookupError: pass
+
+    def terminate(self): self.send_signal(signal.SIGTERM)
+    def kill(self): self.send_signal(signal.SIGKILL)
+
+class ForkServerLauncher:
+    """Starts the fork server for a run and launches agents through it."""
+    def __init__(self, worqspace, worqer_dir, env=None, timeout: float = 10):
+        self.tmpdir = tempfile.mkdtemp(prefix="qonq_forkserver_")
+        self.sock_path = os.path.join(self.tmpdir, "forkserver.sock")
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), self.sock_path, str(worqer_dir)],
+            cwd=str(worqspace), env=env, stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(self.sock_path):
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError("fork server failed to start")
+            time.sleep(0.01)
+
+    def spawn(self, command: list[str], env: dict, cwd) -> ForkedProcess:
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.sock_path)
+            request = json.dumps({'argv': command, 'env': dict(env), 'cwd': str(cwd)}) + "\n"
+            socket.send_fds(conn, [request.encode()], [out_w, err_w])
+        except OSError:
+            for fd in (out_r, out_w, err_r, err_w): os.close(fd)
+            conn.close()
+            raise
+        os.close(out_w); os.close(err_w)
+        return ForkedProcess(conn, os.fdopen(out_r, 'rb', buffering=0), os.fdopen(err_r, 'rb', buffering=0))
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                conn.connect(self.sock_path)
+                conn.sendall(b'{"op": "shutdown"}\n')
+                conn.close()
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+                self.proc.wait()
+        try: os.unlink(self.sock_path)
+        except OSError: pass
+        try: os.rmdir(self.tmpdir)
+        except OSError: pass
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# qrane/journal.py - Durable completion journal for resumable runs
+"""
+struqture/journal.jsonl records finished work, one JSON object per line:
+
+  {"kind": "run", "resume": false}                      a fresh run starts
+  {"kind": "agent", "cycle": N, "name": A, "input": H}  agent A finished cyQle N
+  {"kind": "cycle", "cycle": N}                         cyQle N passed its cheqpoint
+  {"kind": "briq", "cycle": N, "name": B, "input": H}   construQtor built briq B
+
+H is the SHA-256 of the unit's input, so work is only skipped on --resume
+when it would see exactly the same input again. Every record is fsync'd
+before the next unit starts. Only records after the last fresh-run marker
+count, so a reused worqspace never resumes an older session.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+JOURNAL_NAME = "journal.jsonl"
+
+def input_digest(path: Path, cycle: int):
+    """SHA-256 of an agent's input: the file, or a directory's cyqle<N>_* files. None if missing."""
+    path = Path(path)
+    h = hashlib.sha256()
+    if path.is_dir():
+        files = sorted(path.glob(f"cyqle{cycle}_*"))
+        if not files: return None
+        for f in files:
+            h.update(f.name.encode() + b"\0")
+            h.update(f.read_bytes() + b"\0")
+    elif path.is_file():
+        h.update(path.read_bytes())
+    else:
+        return None
+    return h.hexdigest()
+
+class RunJournal:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.agents = {}
+        self.cycles = set()
+
+    def load(self):
+        self.agents, self.cycles = {}, set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: rec = json.loads(line)
+                    except ValueError: continue # Torn tail from a crash
+                    kind = rec.get('kind')
+                    if kind == 'run' and not rec.get('resume'):
+                        self.agents, self.cycles = {}, set()
+                    elif kind == 'agent':
+                        self.agents[(rec['cycle'], rec['name'])] = rec.get('input')
+                    elif kind == 'cycle':
+                        self.cycles.add(rec['cycle'])
+        except OSError: pass
+        return self
+
+    def start(self, resume: bool):
+        if resume: self.load()
+        else: self.agents, self.cycles = {}, set()
+        self._append({'kind': 'run', 'resume': resume})
+
+    def resume_cycle(self) -> int:
+        """First cyQle that has not passed its cheqpoint."""
+        return max(self.cycles) + 1 if self.cycles else 1
+
+    def agent_done(self, cycle: int, name: str, digest) -> bool:
+        return digest is not None and self.agents.get((cycle, name)) == digest
+
+    def mark_agent(self, cycle: int, name: str, digest):
+        self.agents[(cycle, name)] = digest
+        self._append({'kind': 'agent', 'cycle': cycle, 'name': name, 'input': digest})
+
+    def mark_cycle(self, cycle: int):
+        self.cycles.add(cycle)
+        self._append({'kind': 'cycle', 'cycle': cycle})
+
+    def _append(self, rec: dict):
+        rec = {'ts': round(time.time(), 3), **rec}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(rec, separators=(',', ':')) + "\n").encode('utf-8'))
+            os.fsync(fd)
+        finally: os.close(fd)
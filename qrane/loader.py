@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # qrane/loader.py - Visual utilities for the Qrane orchestrator
 import sys
-import time
 import threading
 
 class Colors:
@@ -27,18 +26,21 @@ class Spinner:
 
         self.delay = delay
         self.running = False
+        self._wake = threading.Event()
         self.spinner_thread = None
         self.prefix = prefix
         self.message = message
 
     def start(self):
         self.running = True
+        self._wake.clear()
         self.spinner_thread = threading.Thread(target=self._spin)
         self.spinner_thread.daemon = True
         self.spinner_thread.start()
 
     def stop(self):
         self.running = False
+        self._wake.set() # Interrupt the frame delay so stop() doesn't stall the caller
         if self.spinner_thread:
             self.spinner_thread.join()
         sys.stdout.write("\r" + " " * 80 + "\r")
@@ -52,5 +54,5 @@ class Spinner:
             output = f"{Colors.B}{self.prefix} {frame}  ⸎  {Colors.C}{self.message}{Colors.R}"
             sys.stdout.write(f"\r{output}")
             sys.stdout.flush()
-            time.sleep(self.delay)
+            self._wake.wait(self.delay)
             i += 1
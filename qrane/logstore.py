@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# qrane/logstore.py - Indexed, compressed agent log store (struqture/logs/)
+"""
+Agent output is kept as records {ts, agent, cycle, briq, stream, text}, one
+per output line, instead of raw struqture/cyqle<N>_<agent>.log files:
+
+  struqture/logs/seg_<NNNNNN>.qlog  zlib-compressed blocks of JSON lines, back to back
+  struqture/logs/seg_<NNNNNN>.idx   one JSON line per block: off, len, raw, n,
+                                    t0/t1 (time range), c0/c1 (cyQle range), agents, briqs
+
+Every block (up to BLOCK_BYTES of records) is compressed on its own. A query
+reads the small indexes, skips the blocks that cannot match and
+decompresses only the rest; --tail reads blocks backwards from the end.
+A segment is closed once it holds SEGMENT_BYTES. The Qrane is the only
+writer; worQers tag lines with their briq (lib_ai.briq_tag).
+
+Queries only need the stdlib, so they also run on the host:
+  python3 qrane/logstore.py worqspace/qage_<timestamp> --agent construqtor --tail 50
+"""
+import argparse
+import fnmatch
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+LOGS_DIR = "logs"
+BLOCK_BYTES = 64 * 1024
+SEGMENT_BYTES = 8 * 1024 * 1024
+FLUSH_INTERVAL = 2.0 # Seconds a partial block may wait, so --follow keeps up with a live run
+FOLLOW_POLL = 0.5
+BRIQ_TAG_RE = re.compile(r'^\[briq ([^\]\s]+)\] ')
+SEGMENT_RE = re.compile(r'^seg_(\d{6})\.qlog$')
+AGO_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+AGO_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def logs_dir(worqspace) -> Path:
+    return Path(worqspace) / "struqture" / LOGS_DIR
+
+def split_briq_tag(line: str) -> tuple:
+    """(briq, line) of a worQer output line, without its briq tag."""
+    m = BRIQ_TAG_RE.match(line)
+    return (m.group(1), line[m.end():]) if m else (None, line)
+
+def _segment_numbers(directory: Path) -> list[int]:
+    try: return sorted(int(m.group(1)) for m in (SEGMENT_RE.match(p.name) for p in directory.iterdir()) if m)
+    except OSError: return []
+
+def _segment_paths(directory: Path, seq: int) -> tuple:
+    return directory / f"seg_{seq:06d}.qlog", directory / f"seg_{seq:06d}.idx"
+
+class LogStore:
+    """Appends records in compressed blocks. Write errors are swallowed: logging never fails a run."""
+    def __init__(self, directory, block_bytes: int = BLOCK_BYTES, segment_bytes: int = SEGMENT_BYTES):
+        self.dir = Path(directory)
+        self.block_bytes = block_bytes
+        self.segment_bytes = segment_bytes
+        try: self.dir.mkdir(parents=True, exist_ok=True)
+        except OSError: pass
+        segments = _segment_numbers(self.dir)
+        self.seq = segments[-1] if segments else 1
+        self._reset()
+
+    def _reset(self):
+        self.lines, self.raw = [], 0
+        self.t0 = self.t1 = self.c0 = self.c1 = None
+        self.agents, self.briqs = set(), set()
+        self.last_flush = time.monotonic()
+
+    def agent_log(self, agent: str, cycle: int) -> 'AgentLog':
+        return AgentLog(self, agent, cycle)
+
+    def append(self, agent: str, cycle: int, stream: str, text: str, briq: str = None, ts: float = None):
+        ts = round(time.time() if ts is None else ts, 3)
+        line = json.dumps({'ts': ts, 'agent': agent, 'cycle': cycle, 'briq': briq, 'stream': stream, 'text': text},
+                          ensure_ascii=False, separators=(',', ':')) + "\n"
+        self.lines.append(line)
+        self.raw += len(line)
+        self.t0 = ts if self.t0 is None else min(self.t0, ts)
+        self.t1 = ts if self.t1 is None else max(self.t1, ts)
+        self.c0 = cycle if self.c0 is None else min(self.c0, cycle)
+        self.c1 = cycle if self.c1 is None else max(self.c1, cycle)
+        self.agents.add(agent)
+        if briq: self.briqs.add(briq)
+        if self.raw >= self.block_bytes or time.monotonic() - self.last_flush >= FLUSH_INTERVAL: self.flush()
+
+    def flush(self):
+        if not self.lines:
+            self.last_flush = time.monotonic()
+            return
+        data = zlib.compress("".join(self.lines).encode('utf-8'), 6)
+        entry = {'off': 0, 'len': len(data), 'raw': self.raw, 'n': len(self.lines), 't0': self.t0, 't1': self.t1,
+                 'c0': self.c0, 'c1': self.c1, 'agents': sorted(self.agents), 'briqs': sorted(self.briqs)}
+        self._reset()
+        try:
+            seg, idx = _segment_paths(self.dir, self.seq)
+            off = seg.stat().st_size if seg.exists() else 0
+            if off and off + len(data) > self.segment_bytes:
+                self.seq += 1
+                (seg, idx), off = _segment_paths(self.dir, self.seq), 0
+            entry['off'] = off
+            # Block first, index entry second: a crash in between leaves unindexed bytes, never a bad entry
+            with open(seg, 'ab') as f: f.write(data)
+            with open(idx, 'a', encoding='utf-8') as f: f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        except OSError: pass
+
+class AgentLog:
+    """One agent run's output sink (SupervisedAgent log interface)."""
+    def __init__(self, store: LogStore, agent: str, cycle: int):
+        self.store = store
+        self.agent = agent
+        self.cycle = cycle
+
+    def write(self, stream: str, text: str, briq: str = None):
+        self.store.append(self.agent, self.cycle, stream, text, briq)
+
+    def close(self):
+        self.store.flush()
+
+class LogQuery:
+    """Record filter; block_may_match() decides from an index entry alone whether a block is worth reading."""
+    def __init__(self, agent=None, briq=None, cycle=None, stream=None, since=None, until=None, grep=None):
+        self.agent = agent
+        # A plain name matches as a substring (--briq briq003); globs are taken as given
+        self.briq = briq if not briq or any(c in briq for c in '*?[') else f"*{briq}*"
+        self.cycle = cycle
+        self.stream = stream
+        self.since = since
+        self.until = until
+        self.grep = re.compile(grep) if grep else None
+
+    def block_may_match(self, entry: dict) -> bool:
+        if self.since is not None and entry['t1'] < self.since: return False
+        if self.until is not None and entry['t0'] > self.until: return False
+        if self.cycle is not None and not entry['c0'] <= self.cycle <= entry['c1']: return False
+        if self.agent and self.agent not in entry['agents']: return False
+        if self.briq and not any(fnmatch.fnmatchcase(b, self.briq) for b in entry['briqs']): return False
+        return True
+
+    def match(self, rec: dict) -> bool:
+        if self.since is not None and rec['ts'] < self.since: return False
+        if self.until is not None and rec['ts'] > self.until: return False
+        if self.cycle is not None and rec['cycle'] != self.cycle: return False
+        if self.agent and rec['agent'] != self.agent: return False
+        if self.briq and not (rec.get('briq') and fnmatch.fnmatchcase(rec['briq'], self.briq)): return False
+        if self.stream and rec['stream'] != self.stream: return False
+        if self.grep and not self.grep.search(rec['text']): return False
+        return True
+
+class LogReader:
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.blocks_read = 0
+
+    def index(self, positions: dict = None) -> list[tuple]:
+        """
+        [(segment, entry)] of every complete block, oldest first. With a
+        positions dict ({seq: byte offset into its .idx}), only entries added
+        since the last call are returned and the offsets are advanced.
+        """
+        blocks = []
+        for seq in _segment_numbers(self.dir):
+            seg, idx = _segment_paths(self.dir, seq)
+            start = positions.get(seq, 0) if positions is not None else 0
+            try:
+                size = seg.stat().st_size
+                with open(idx, 'rb') as f:
+                    f.seek(start)
+                    data = f.read()
+            except OSError: continue
+            consumed = data.rfind(b"\n") + 1 # A torn last line is read again next time
+            for line in data[:consumed].splitlines():
+                try: entry = json.loads(line)
+                except ValueError: continue
+                if entry['off'] + entry['len'] <= size: blocks.append((seg, entry))
+            if positions is not None: positions[seq] = start + consumed
+        return blocks
+
+    def read_block(self, seg: Path, entry: dict) -> list[dict]:
+        """Decompresses one block: a seek and a read of just its bytes."""
+        self.blocks_read += 1
+        try:
+            with open(seg, 'rb') as f:
+                f.seek(entry['off'])
+                data = zlib.decompress(f.read(entry['len']))
+        except (OSError, zlib.error): return []
+        records = []
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            try: records.append(json.loads(line))
+            except ValueError: continue
+        return records
+
+    def query(self, q: LogQuery, tail: int = None, blocks: list = None):
+        """Matching records in order; with tail, only the last `tail` of them (reading blocks from the end)."""
+        blocks = [b for b in (self.index() if blocks is None else blocks) if q.block_may_match(b[1])]
+        if tail is None:
+            for seg, entry in blocks:
+                yield from (rec for rec in self.read_block(seg, entry) if q.match(rec))
+            return
+        found = []
+        for seg, entry in reversed(blocks):
+            if len(found) >= tail: break
+            found[:0] = [rec for rec in self.read_block(seg, entry) if q.match(rec)]
+        yield from found[-tail:] if tail > 0 else []
+
+def parse_time(value: str, now: float = None) -> float:
+    """Epoch seconds from '<n>[smhd]' (ago), 'HH:MM[:SS]' (today), an ISO date/time or an epoch number."""
+    now = time.time() if now is None else now
+    value = value.strip()
+    m = AGO_RE.match(value)
+    if m: return now - float(m.group(1)) * AGO_UNITS[m.group(2)]
+    try: return float(value)
+    except ValueError: pass
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            t = datetime.strptime(value, fmt).time()
+            return datetime.combine(datetime.fromtimestamp(now).date(), t).timestamp()
+        except ValueError: pass
+    try: return datetime.fromisoformat(value).timestamp()
+    except ValueError: raise argparse.ArgumentTypeError(f"unrecognized time: {value}")
+
+def format_record(rec: dict) -> str:
+    stamp = datetime.fromtimestamp(rec['ts']).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    mark = "!" if rec['stream'] == 'stderr' else "|"
+    return f"{stamp} c{rec['cycle']} {rec['agent']:<11} {rec.get('briq') or '-'} {mark} {rec['text']}"
+
+def render_info(reader: LogReader) -> str:
+    blocks = reader.index()
+    if not blocks: return f"No indexed logs in {reader.dir}"
+    segments = {seg for seg, _ in blocks}
+    raw = sum(e.get('raw', 0) for _, e in blocks)
+    packed = sum(e['len'] for _, e in blocks)
+    t0 = min(e['t0'] for _, e in blocks)
+    t1 = max(e['t1'] for _, e in blocks)
+    agents = sorted({a for _, e in blocks for a in e['agents']})
+    return "\n".join([
+        f"Logs: {reader.dir}",
+        f"  {len(segments)} segments, {len(blocks)} blocks, {sum(e['n'] for _, e in blocks)} records",
+        f"  {raw / 1e6:.2f} MB raw, {packed / 1e6:.2f} MB compressed ({raw / max(1, packed):.1f}x)",
+        f"  {datetime.fromtimestamp(t0):%Y-%m-%d %H:%M:%S} .. {datetime.fromtimestamp(t1):%Y-%m-%d %H:%M:%S}",
+        f"  cyQles {min(e['c0'] for _, e in blocks)}-{max(e['c1'] for _, e in blocks)}, agents: {', '.join(agents)}",
+    ])
+
+def main(argv: list = None, default_root=None):
+    parser = argparse.ArgumentParser(prog="qrane.py --logs", description="Query the indexed agent logs of a qage.")
+    parser.add_argument("qage", nargs="?", help="Qage directory (default: the current worqspace)")
+    parser.add_argument("--agent", help="Only this agent (instruqtor, construqtor, ...)")
+    parser.add_argument("--briq", help="Only this briq (substring or glob of its file name)")
+    parser.add_argument("--cycle", type=int, help="Only this cyQle")
+    parser.add_argument("--stream", choices=("stdout", "stderr"), help="Only this output stream")
+    parser.add_argument("--since", type=parse_time, help="Start time: 10m / 2h (ago), HH:MM[:SS], ISO date/time")
+    parser.add_argument("--until", type=parse_time, help="End time (same formats as --since)")
+    parser.add_argument("--grep", metavar="REGEX", help="Only lines matching REGEX")
+    parser.add_argument("-n", "--tail", type=int, metavar="N", help="Only the last N matching lines")
+    parser.add_argument("-f", "--follow", action="store_true", help="Keep printing new lines as they are logged")
+    parser.add_argument("--json", action="store_true", help="Print records as JSON lines")
+    parser.add_argument("--info", action="store_true", help="Print segment/block statistics and exit")
+    args = parser.parse_args(argv)
+
+    root = Path(args.qage) if args.qage else Path(default_root or ".")
+    reader = LogReader(root if root.name == LOGS_DIR else logs_dir(root))
+    if not reader.dir.is_dir() and not args.follow:
+        print(f"No indexed logs at {reader.dir} (set options.log_store: indexed; plain runs keep struqture/cyqle<N>_<agent>.log)", file=sys.stderr)
+        sys.exit(1)
+    if args.info:
+        print(render_info(reader))
+        return
+
+    q = LogQuery(args.agent, args.briq, args.cycle, args.stream, args.since, args.until, args.grep)
+    emit = (lambda rec: json.dumps(rec, ensure_ascii=False)) if args.json else format_record
+    positions = {}
+    try:
+        for rec in reader.query(q, args.tail, reader.index(positions)): print(emit(rec))
+        while args.follow:
+            sys.stdout.flush()
+            time.sleep(FOLLOW_POLL)
+            for rec in reader.query(q, blocks=reader.index(positions)): print(emit(rec))
+    except (KeyboardInterrupt, BrokenPipeError): pass
+
+if __name__ == "__main__":
+    main(default_root=os.environ.get("QONQ_WORKSPACE", "."))
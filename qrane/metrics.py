@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# qrane/metrics.py - Run metrics ledger and stats report
+"""
+Qrane and the worQers append one JSON object per line to
+struqture/metrics.jsonl. Every record carries ts, run, cycle, agent and
+event; the events are:
+
+  agent          Qrane: wall_s, ok per agent run
+  cycle          Qrane: wall_s of the cycle's agent pipeline
+  provider_call  lib_ai: provider, model, cache_hit, wall_s, ttfb_s,
+                 prompt/response bytes and estimated tokens
+  briq           construQtor: briq, status, wall_s
+
+The report only reads the ledger (stdlib only), so it also runs on the host:
+  python3 qrane/metrics.py worqspace/qage_<timestamp>
+"""
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+METRICS_NAME = "metrics.jsonl"
+
+def ledger_path(worqspace) -> Path:
+    return Path(worqspace) / "struqture" / METRICS_NAME
+
+class MetricsLedger:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.run_id = None
+
+    def start_run(self) -> str:
+        """Tags this Qrane run; the id is passed on to the worQers as QONQ_RUN_ID."""
+        self.run_id = time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+        return self.run_id
+
+    def record(self, event: str, cycle: int, agent: str = "qrane", **fields):
+        rec = {'ts': round(time.time(), 3), 'run': self.run_id, 'cycle': cycle, 'agent': agent, 'event': event}
+        rec.update(fields)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try: os.write(fd, (json.dumps(rec, separators=(',', ':')) + "\n").encode('utf-8'))
+            finally: os.close(fd)
+        except OSError: pass
+
+    def load(self, run='latest') -> list[dict]:
+        """Records of one run ('latest' = the last run in the ledger, None = all runs)."""
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: records.append(json.loads(line))
+                    except ValueError: continue # Torn line from a killed agent
+        except OSError: return []
+        if run == 'latest':
+            runs = [r.get('run') for r in records if r.get('run')]
+            run = runs[-1] if runs else None
+        if run is None: return records
+        return [r for r in records if r.get('run') == run]
+
+def percentile(values: list, pct: float):
+    """Nearest-rank percentile; None for an empty list."""
+    if not values: return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def _fmt_s(value) -> str:
+    if value is None: return "-"
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.2f}s"
+
+def _dist(values: list) -> str:
+    return f"p50 {_fmt_s(percentile(values, 50))}  p90 {_fmt_s(percentile(values, 90))}  max {_fmt_s(max(values) if values else None)}"
+
+def render_report(records: list[dict], slowest: int = 10) -> str:
+    if not records: return "No metrics recorded."
+    by_cycle = defaultdict(list)
+    for r in records: by_cycle[r.get('cycle', 0)].append(r)
+
+    run = records[-1].get('run') or "?"
+    lines = [f"=== QonQrete Run Stats (run {run}) ==="]
+    for cycle in sorted(by_cycle):
+        recs = by_cycle[cycle]
+        total = [r['wall_s'] for r in recs if r['event'] == 'cycle']
+        lines.append("")
+        lines.append(f"--- cyQle {cycle}" + (f" ({_fmt_s(total[-1])}) ---" if total else " ---"))
+        for r in recs:
+            if r['event'] == 'agent':
+                status = "ok" if r.get('ok') else "failed"
+                lines.append(f"  {r['agent']:<14}{_fmt_s(r['wall_s']):>10}  ({status})")
+
+        calls = [r for r in recs if r['event'] == 'provider_call']
+        if calls:
+            hits = sum(1 for r in calls if r.get('cache_hit'))
+            live = [r for r in calls if not r.get('cache_hit')]
+            lines.append(f"  provider calls: {len(calls)} ({hits} cache hits)")
+            lines.append(f"    wall  {_dist([r['wall_s'] for r in live])}")
+            lines.append(f"    ttfb  {_dist([r['ttfb_s'] for r in live if r.get('ttfb_s') is not None])}")
+            hedged = [r for r in live if r.get('hedged')]
+            if hedged:
+                won = sum(1 for r in hedged if r.get('winner') == 'fallback')
+                lines.append(f"    hedged {len(hedged)} ({won} won by the fallback)  {_dist([r['wall_s'] for r in hedged])}")
+            p_bytes = sum(r.get('prompt_bytes', 0) for r in calls)
+            r_bytes = sum(r.get('response_bytes', 0) for r in calls)
+            p_tok = sum(r.get('prompt_tokens', 0) for r in calls)
+            r_tok = sum(r.get('response_tokens', 0) for r in calls)
+            lines.append(f"    prompt {p_bytes / 1024:.1f}KB (~{p_tok} tok)  response {r_bytes / 1024:.1f}KB (~{r_tok} tok)")
+
+        briqs = [r for r in recs if r['event'] == 'briq']
+        if briqs:
+            failed = sum(1 for r in briqs if r.get('status') != 'success')
+            lines.append(f"  briqs: {len(briqs)} ({failed} failed)  {_dist([r['wall_s'] for r in briqs])}")
+
+    briqs = sorted((r for r in records if r['event'] == 'briq'), key=lambda r: -r['wall_s'])[:slowest]
+    if briqs:
+        lines.append("")
+        lines.append("--- Slowest briqs ---")
+        for r in briqs:
+            lines.append(f"  {_fmt_s(r['wall_s']):>10}  cyQle {r.get('cycle', 0):<3} {r['briq']} ({r.get('status')})")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(os.environ.get("QONQ_WORKSPACE", "."))
+    if target.is_dir(): target = ledger_path(target)
+    print(render_report(MetricsLedger(target).load()))
@@ -38,5 +38,8 @@ class PathManager:
     def get_reqap_path(self, cycle: int) -> Path:
         return self.get_reqap_dir() / f"cyqle{cycle}_reqap.md"
 
+    def get_journal_path(self) -> Path:
+        return self.struqture_dir / "journal.jsonl"
+
     def get_agent_log_path(self, cycle: int, agent_name: str) -> Path:
         return self.struqture_dir / f"cyqle{cycle}_{agent_name}.log"
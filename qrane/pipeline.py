@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# qrane/pipeline.py - pipeline_config.yaml compiled into an agent DAG
+"""
+Each agent may list `depends_on` (names of other agents). Without it an agent
+depends on the one listed before it, so a plain list stays a linear chain;
+`depends_on: []` makes an agent a root. The pipeline is validated (unknown
+agents, cycles) and compiled once per run into its agents in run order.
+
+Each cyQle is scheduled from a ReadySet: an agent starts as soon as its own
+dependencies have finished, so a slow agent only holds up the agents that
+depend on it, not unrelated siblings.
+
+Pipelined mode: an agent whose only dependency writes the directory it
+reads (briq.d/) starts together with its producer and streams the files as
+they are published.
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+TEMPLATE_RE = re.compile(r'\{([^}]*)\}')
+TEMPLATE_KEYS = {'N'}
+
+class PipelineError(ValueError): pass
+
+@dataclass(frozen=True)
+class AgentSpec:
+    name: str
+    script: str
+    input: str
+    output: str
+    depends_on: tuple
+    streams: bool = False
+
+def resolve(template: str, cycle: int) -> str:
+    return template.replace("{N}", str(cycle))
+
+def _check_template(name: str, field: str, value) -> str:
+    if not isinstance(value, str) or not value:
+        raise PipelineError(f"agent '{name}': '{field}' must be a non-empty string")
+    unknown = set(TEMPLATE_RE.findall(value)) - TEMPLATE_KEYS
+    if unknown: raise PipelineError(f"agent '{name}': unknown placeholder(s) {sorted(unknown)} in '{field}'")
+    return value
+
+def compile_pipeline(config: dict, pipelined: bool = False) -> list[AgentSpec]:
+    """Validates the agents of a pipeline config and returns them in run order (each after its dependencies)."""
+    defs = (config or {}).get('agents') or []
+    if not defs: raise PipelineError("no agents defined")
+
+    specs, order = {}, []
+    for i, agent_def in enumerate(defs):
+        if not isinstance(agent_def, dict) or not agent_def.get('name'):
+            raise PipelineError(f"agent #{i + 1} has no name")
+        name = agent_def['name']
+        if name in specs: raise PipelineError(f"duplicate agent '{name}'")
+        if 'depends_on' in agent_def:
+            deps = agent_def['depends_on'] or []
+            if isinstance(deps, str): deps = [deps]
+        else:
+            deps = [order[-1]] if order else []
+        specs[name] = AgentSpec(name, _check_template(name, 'script', agent_def.get('script')),
+                                _check_template(name, 'input', agent_def.get('input')),
+                                _check_template(name, 'output', agent_def.get('output')), tuple(deps))
+        order.append(name)
+
+    for spec in specs.values():
+        for dep in spec.depends_on:
+            if dep not in specs: raise PipelineError(f"agent '{spec.name}' depends on unknown agent '{dep}'")
+            if dep == spec.name: raise PipelineError(f"agent '{spec.name}' depends on itself")
+
+    # Depth-first walk (post-order = run order): a node met again while still on the stack closes a cycle
+    run_order, state = [], {}
+    def visit(name: str, stack: list):
+        if state.get(name) == 'done': return
+        if state.get(name) == 'active':
+            loop = stack[stack.index(name):] + [name]
+            raise PipelineError("dependency cycle: " + " -> ".join(loop))
+        state[name] = 'active'
+        spec = specs[name]
+        for dep in spec.depends_on: visit(dep, stack + [name])
+        producer = specs[spec.depends_on[0]] if len(spec.depends_on) == 1 else None
+        if pipelined and producer and spec.input.endswith('/') and spec.input == producer.output:
+            specs[name] = AgentSpec(spec.name, spec.script, spec.input, spec.output, spec.depends_on, streams=True)
+        state[name] = 'done'
+        run_order.append(specs[name])
+
+    for name in order: visit(name, [])
+    return run_order
+
+class ReadySet:
+    """
+    One cyQle's progress through a compiled pipeline. take() hands out, in run
+    order, every agent that may start now: all of its dependencies finished
+    (a streaming agent: its producer started). finish() records an agent as
+    done; agents listed in `done` (resume) count as finished from the start.
+    """
+    def __init__(self, specs: list, done=()):
+        self.waiting = [spec for spec in specs if spec.name not in done]
+        self.started = set(done)
+        self.finished = set(done)
+
+    def take(self, limit: int = None) -> list[AgentSpec]:
+        ready = []
+        for spec in list(self.waiting):
+            if limit is not None and len(ready) >= limit: break
+            if spec.streams: ok = spec.depends_on[0] in self.started
+            else: ok = all(dep in self.finished for dep in spec.depends_on)
+            if ok:
+                self.waiting.remove(spec)
+                self.started.add(spec.name)
+                ready.append(spec)
+        return ready
+
+    def finish(self, name: str):
+        self.finished.add(name)
+
+    @property
+    def complete(self) -> bool:
+        return not self.waiting and self.started <= self.finished
+
+def load_pipeline(path, pipelined: bool = False) -> list[AgentSpec]:
+    try:
+        with open(Path(path), 'r', encoding='utf-8') as f: config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise PipelineError(f"cannot read {path}: {e}")
+    return compile_pipeline(config, pipelined)
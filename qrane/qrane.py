@@ -7,7 +7,6 @@ import subprocess
 import sys
 import time
 import traceback
-import select
 from pathlib import Path
 import yaml
 import re
@@ -19,14 +18,27 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from loader import Spinner, Colors
     from paths import PathManager
+    from supervisor import AgentSupervisor
+    from journal import RunJournal, input_digest
+    from batch import BatchJob, BatchScheduler, render_summary
+    from pipeline import PipelineError, ReadySet, load_pipeline, resolve as resolve_template
+    import logstore
+    import metrics
 except ImportError:
-    Spinner = None; Colors = None; PathManager = None
+    Spinner = None; Colors = None; PathManager = None; AgentSupervisor = None; metrics = None
+    RunJournal = None; input_digest = None; BatchJob = None; BatchScheduler = None; render_summary = None
+    PipelineError = None; ReadySet = None; load_pipeline = None; resolve_template = None; logstore = None
 
 try:
     import tui
 except ImportError:
     tui = None
 
+try:
+    from forkserver import ForkServerLauncher
+except ImportError:
+    ForkServerLauncher = None
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 AGENT_MODULE_DIR = PROJECT_ROOT / "worqer"
 
@@ -76,10 +88,12 @@ def run_pre_flight_checks(path_manager: PathManager, ui=None) -> bool:
             if provider:
                 required_providers.add(provider)
 
-    provider_map = { 'openai': 'sgpt', 'gemini': 'gemini' }
+    # None = in-process provider, no CLI tool required
+    provider_map = { 'openai': 'sgpt', 'gemini': 'gemini', 'openai-http': None }
 
     all_found = True
     for provider in required_providers:
+        if provider in provider_map and provider_map[provider] is None: continue
         tool = provider_map.get(provider)
         if not tool or not shutil.which(tool):
             msg = f"CRITICAL: CLI tool for provider '{provider}' ('{tool}') not found in PATH."
@@ -89,111 +103,177 @@ def run_pre_flight_checks(path_manager: PathManager, ui=None) -> bool:
 
     return all_found
 
-def check_tui_keys(ui, proc=None):
-    key = ui.get_key_nonblocking()
-    if key == -1: return
-    if key == 32: ui.toggle_qonsole()
-    elif key == ord('w') or key == ord('W'): ui.toggle_wonqrete()
-    elif key == 27:
-        if proc: proc.terminate()
-        raise KeyboardInterrupt
-    elif key == ord('k') or key == ord('K'):
-        if proc: proc.kill()
-        raise KillSignal
-
-def run_agent(agent_name: str, command: list[str], prefix: str, color: str, logger: logging.Logger, log_file: Path, env: dict, ui=None) -> bool:
-    agent_display_name = agent_name.replace('q', 'Q')
+def check_tui_keys(ui, procs=None):
+    # Drain every pending key; curses may hold several behind a single stdin wakeup
+    procs = procs or []
+    while True:
+        key = ui.get_key_nonblocking()
+        if key == -1: return
+        if key == 32: ui.toggle_qonsole()
+        elif key == ord('w') or key == ord('W'): ui.toggle_wonqrete()
+        elif key == 27:
+            for proc in procs: proc.terminate()
+            raise KeyboardInterrupt
+        elif key == ord('k') or key == ord('K'):
+            for proc in procs: proc.kill()
+            raise KillSignal
+
+# [FIX] Expanded keyword list ensures logs from InstruQtor and ConstruQtor are visible
+VISIBLE_KEYWORDS = [
+    "Handing off", "Processing", "Executed", "Wrote", "reQap",
+    "Checking", "Generating", "Ingesting", "Architect", "Plan",
+    "Found", "Summary", "Skipping"
+]
+
+def spawn_agent(command: list[str], env: dict, launcher=None, cwd=None):
+    cwd = cwd or get_worqspace()
+    # Python worqer scripts can be forked from the warm fork server instead of exec'd
+    if launcher and len(command) > 1 and command[1].endswith('.py'):
+        return launcher.spawn(command, env, cwd)
+    return subprocess.Popen(command, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+
+def open_log_store(root: Path, options: dict):
+    """The qage's indexed log store (struqture/logs/) for options.log_store: indexed, else None (plain, the default)."""
+    if options.get('log_store', 'plain') != 'indexed' or not logstore: return None
+    return logstore.LogStore(logstore.logs_dir(root))
+
+def agent_log(log_store, path_manager: PathManager, cycle: int, name: str):
+    """Log sink for one agent run: a record stream in the log store, or the raw cyqle<N>_<agent>.log."""
+    return log_store.agent_log(name, cycle) if log_store else path_manager.get_agent_log_path(cycle, name)
+
+def build_agents(specs: list, path_manager: PathManager, cycle: int, env: dict) -> dict:
+    """
+    Agents of one cyQle from the compiled pipeline (qrane/pipeline.py):
+    {agent_name: (command, env, input_path)}.
+    """
+    agents = {}
+    for spec in specs:
+        input_path = path_manager.root / resolve_template(spec.input, cycle)
+        output_path = path_manager.root / resolve_template(spec.output, cycle)
+        cmd = ["python3", str(AGENT_MODULE_DIR / spec.script), str(input_path), str(output_path)]
+        agents[spec.name] = (cmd, dict(env, QONQ_PIPELINED='1') if spec.streams else env, input_path)
+    return agents
+
+def run_agents(schedule, entries: dict, prefix: str, logger: logging.Logger, ui=None, launcher=None, skip=None, on_finish=None) -> dict:
+    """
+    Runs one cyQle of the pipeline under one supervisor. schedule is a
+    pipeline.ReadySet: every agent is started as soon as its own dependencies
+    have finished, so independent agents (and pipelined streaming agents) run
+    side by side. entries maps agent_name to (command, color, log_file, env).
+    skip(name) -> True counts an agent as finished without running it (resume);
+    on_finish(name, ok, wall_seconds) is called as each agent exits. If one
+    agent fails the running ones are killed and nothing further is started.
+    Returns {agent_name: (ok, wall_seconds)}.
+    """
     target_width = 11
-    padding = " " * (target_width - len(agent_display_name))
     qrane_padding = " " * (target_width - 5)
-
     qrane_prefix = f"{Colors.B}〘{prefix}〙『{Colors.WHITE}Qrane{Colors.B}』{qrane_padding}⸎ {Colors.R}"
-    agent_prefix = f"{Colors.B}〘{prefix}〙『{color}{agent_display_name}{Colors.B}』{padding}⸎ {Colors.R}"
 
-    # [FIX] Expanded keyword list ensures logs from InstruQtor and ConstruQtor are visible
-    VISIBLE_KEYWORDS = [
-        "Handing off", "Processing", "Executed", "Wrote", "reQap",
-        "Checking", "Generating", "Ingesting", "Architect", "Plan",
-        "Found", "Summary"
-    ]
+    def agent_prefix(name, color):
+        display = name.replace('q', 'Q')
+        return f"{Colors.B}〘{prefix}〙『{color}{display}{Colors.B}』{' ' * (target_width - len(display))}⸎ {Colors.R}"
+
+    colors = {name: color for name, (_, color, *_) in entries.items()}
+    failed = []
+
+    def launch(supervisor, announce, add_agent) -> bool:
+        """Starts every agent that is ready now; False once nothing is left to start."""
+        while not failed:
+            ready = schedule.take()
+            if not ready: break
+            skipped = [spec.name for spec in ready if skip and skip(spec.name)]
+            for name in skipped: schedule.finish(name)
+            names = [spec.name for spec in ready if spec.name not in skipped]
+            if names: announce(" + ".join(name.replace('q', 'Q') for name in names), [a.name for a in supervisor.active] + names)
+            for name in names:
+                command, color, log_file, env = entries[name]
+                add_agent(name, command, color, log_file, env)
+        return bool(supervisor.active)
+
+    def on_exit(agent):
+        ok = agent.returncode == 0
+        if on_finish: on_finish(agent.name, ok, round(agent.ended - agent.started, 4))
+        # A streaming consumer would wait forever on a producer that died
+        if not ok:
+            failed.append(agent)
+            supervisor.kill_all()
+            return
+        schedule.finish(agent.name)
+        launch(supervisor, announce, add_agent)
+
+    def results(supervisor) -> dict:
+        return {a.name: (a.returncode == 0, round(a.ended - a.started, 4)) for a in supervisor.finished}
 
     if ui:
-        ui.log_main(f"{qrane_prefix}Initiating {agent_display_name}...")
+        def announce(display_names, running):
+            ui.log_main(f"{qrane_prefix}Initiating {display_names}...")
+
+        def add_agent(name, command, color, log_file, env):
+            display, a_prefix = name.replace('q', 'Q'), agent_prefix(name, color)
+
+            def on_stdout(clean):
+                # [FIX] Use visibility list
+                if any(x in clean for x in VISIBLE_KEYWORDS):
+                    ui.log_main(f"{a_prefix} {clean}")
+                ui.log_agent(f"[{display}] {clean}")
+
+            def on_stderr(clean):
+                ui.log_agent(f"[{display} RAW] {clean}")
+
+            supervisor.add(name, spawn_agent(command, env, launcher), log_file, on_stdout, on_stderr)
+
         try:
-            with subprocess.Popen(command, cwd=str(get_worqspace()), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, env=env, universal_newlines=True) as proc:
-                reads = [proc.stdout, proc.stderr]
-                while True:
-                    check_tui_keys(ui, proc)
-                    readable, _, _ = select.select(reads, [], [], 0.05)
-                    for r in readable:
-                        line = r.readline()
-                        if not line: reads.remove(r); continue
-                        clean = line.strip()
-                        if r == proc.stdout:
-                            # [FIX] Use visibility list
-                            if any(x in clean for x in VISIBLE_KEYWORDS):
-                                ui.log_main(f"{agent_prefix} {clean}")
-                            ui.log_agent(f"[{agent_display_name}] {clean}")
-                            with open(log_file, 'a', encoding='utf-8') as f: f.write(line)
-                        elif r == proc.stderr:
-                            ui.log_agent(f"[{agent_display_name} RAW] {clean}")
-                            with open(log_file, 'a', encoding='utf-8') as f: f.write(line)
-                    if proc.poll() is not None and not reads: break
-
-                if proc.returncode != 0:
-                    ui.log_main(f"{agent_prefix}FAILED (Code {proc.returncode})")
-                    return False
-                return True
+            supervisor = AgentSupervisor(on_key=lambda procs: check_tui_keys(ui, procs), on_exit=on_exit, idle_timeout=ui.render_tick)
+            if launch(supervisor, announce, add_agent): supervisor.run()
+
+            for agent in failed:
+                ui.log_main(f"{agent_prefix(agent.name, colors[agent.name])}FAILED (Code {agent.returncode})")
+            return results(supervisor)
         except KillSignal: raise
         except Exception as e:
             ui.log_main(f"CRITICAL EXCEPTION: {e}")
-            return False
+            return {name: (False, 0.0) for name in entries}
     else:
-        print(f"{qrane_prefix}Initiating {agent_display_name}...")
-        spinner = Spinner(prefix=f"〘{prefix}〙", message=f"Running {agent_display_name}...")
-        spinner.start()
+        spinner = Spinner(prefix=f"〘{prefix}〙", message="Running...")
+
+        def announce(display_names, running):
+            spinner.stop()
+            print(f"{qrane_prefix}Initiating {display_names}...")
+            spinner.message = f"Running {' + '.join(name.replace('q', 'Q') for name in running)}..."
+            spinner.start()
+
+        def add_agent(name, command, color, log_file, env):
+            a_prefix = agent_prefix(name, color)
+
+            def on_stdout(clean):
+                # [FIX] Use visibility list
+                if any(x in clean for x in VISIBLE_KEYWORDS):
+                    spinner.stop()
+                    print(f"{a_prefix}{clean}")
+                    spinner.start()
+
+            supervisor.add(name, spawn_agent(command, env, launcher), log_file, on_stdout)
+
         try:
-            proc = subprocess.Popen(command, cwd=str(get_worqspace()), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env, bufsize=1, universal_newlines=True)
-            reads = [proc.stdout, proc.stderr]
-            while True:
-                readable, _, _ = select.select(reads, [], [], 0.05)
-                if not readable and proc.poll() is not None: break
-                for r in readable:
-                    line = r.readline()
-                    if not line: reads.remove(r); continue
-                    clean = line.strip()
-                    if r == proc.stdout:
-                        # [FIX] Use visibility list
-                        if any(x in clean for x in VISIBLE_KEYWORDS):
-                            spinner.stop()
-                            print(f"{agent_prefix}{clean}")
-                            spinner.start()
-                    with open(log_file, 'a', encoding='utf-8') as f: f.write(line)
-
-            stderr = proc.stderr.read()
-            if stderr:
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(stderr)
+            supervisor = AgentSupervisor(on_exit=on_exit)
+            if launch(supervisor, announce, add_agent): supervisor.run()
 
             spinner.stop()
-            if proc.returncode != 0:
-                print(f"{agent_prefix}{Colors.RED}ERROR: Agent exited with code: {proc.returncode}{Colors.R}")
-                if stderr:
+            for agent in failed:
+                print(f"{agent_prefix(agent.name, colors[agent.name])}{Colors.RED}ERROR: Agent exited with code: {agent.returncode}{Colors.R}")
+                if agent.stderr_tail:
                     print(f"{Colors.RED}--- STDERR DUMP ---{Colors.R}")
-                    for line in stderr.strip().split('\n'):
+                    for line in agent.stderr_tail:
                         print(f"{Colors.RED}{line}{Colors.R}")
-                return False
-            return True
+            return results(supervisor)
         except KillSignal: spinner.stop(); raise
         except KeyboardInterrupt:
             spinner.stop()
-            try: proc.kill()
-            except: pass
             raise
         except Exception as e:
             spinner.stop()
             print(f"{Colors.RED}Critical Error: {e}{Colors.R}")
-            return False
+            return {name: (False, 0.0) for name in entries}
 
 def handle_cheqpoint(cycle: int, args, reqap_path: Path, prefix: str, path_manager: PathManager, ui=None) -> str:
     target_width = 11
@@ -257,7 +337,7 @@ def handle_cheqpoint(cycle: int, args, reqap_path: Path, prefix: str, path_manag
             except: pass
             continue
 
-def promote_reqap(cycle: int, prefix: str, path_manager: PathManager, ui=None):
+def promote_reqap(cycle: int, prefix: str, path_manager: PathManager, ui=None, quiet=False):
     src = path_manager.get_reqap_path(cycle)
     dst = path_manager.get_tasq_path(cycle + 1)
 
@@ -279,6 +359,7 @@ def promote_reqap(cycle: int, prefix: str, path_manager: PathManager, ui=None):
         with open(dst, 'w') as f: f.write(header + content)
 
         msg = f"Successfully created {dst.name}."
+        if quiet: return
         if ui: ui.log_main(f"{qrane_prefix}{msg}")
         else: print(f"{qrane_prefix}{msg}")
 
@@ -298,15 +379,37 @@ def main():
     parser.add_argument("-V", "--version", action="version", version=get_version())
     parser.add_argument("-m", "--mode", type=str, help="Operational Mode (program, enterprise, etc)")
     parser.add_argument("-b", "--briq-sensitivity", type=int, help="Granularity (0-9)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the qache.d LLM response cache")
+    parser.add_argument("--stats", action="store_true", help="Print the metrics report of the last run and exit")
+    parser.add_argument("--resume", nargs="?", const="", metavar="QAGE_DIR", help="Resume an interrupted run (default: the current worqspace)")
+    parser.add_argument("--batch", metavar="TASQ_DIR", help="Run every *.md tasq in TASQ_DIR autonomously, one qage each")
+    parser.add_argument("--max-agents", type=int, help="Batch mode: agent processes running at once across all qages")
+    parser.add_argument("--logs", nargs=argparse.REMAINDER, metavar="QUERY", help="Query the indexed agent logs and exit (--logs --help for options)")
     args = parser.parse_args()
 
-    prefix = "aQQ" if args.auto else "uQQ"
+    if args.logs is not None:
+        logstore.main(args.logs, default_root=get_worqspace())
+        return
+
+    if args.resume: os.environ['QONQ_WORKSPACE'] = str(Path(args.resume).resolve())
+
+    if args.stats:
+        print(metrics.render_report(metrics.MetricsLedger(metrics.ledger_path(get_worqspace())).load()))
+        return
+
+    prefix = "aQQ" if args.auto or args.batch else "uQQ"
     if args.wonqrete: prefix = "aWQ" if args.auto else "uWQ"
 
     target_width = 11
     qrane_padding = " " * (target_width - 5)
     qrane_prefix = f"{Colors.B}〘{prefix}〙『{Colors.WHITE}Qrane{Colors.B}』{qrane_padding}⸎ {Colors.R}"
 
+    if args.batch:
+        try: run_batch(args, qrane_prefix)
+        except KeyboardInterrupt:
+            print(f"\r{qrane_prefix}{Colors.RED}︻デ┳═ー - - - Qilled all agents in every Qage...{Colors.R}")
+        return
+
     if args.tui and tui:
         try:
             with tui.QonqreteTUI() as ui:
@@ -348,6 +451,15 @@ def run_orchestration(args, prefix, ui):
 
     os.environ['QONQ_MODE'] = final_mode
     os.environ['QONQ_SENSITIVITY'] = str(final_sens)
+    if args.no_cache: os.environ['QONQ_NO_CACHE'] = '1'
+
+    ledger = None
+    if config.get('options', {}).get('metrics', True) and metrics:
+        ledger = metrics.MetricsLedger(metrics.ledger_path(worqspace))
+        os.environ['QONQ_RUN_ID'] = ledger.start_run()
+        os.environ['QONQ_METRICS_FILE'] = str(ledger.path)
+    else:
+        os.environ['QONQ_METRICS_FILE'] = '' # Disables lib_metrics in the worQers
 
     max_cycles = config.get('options', {}).get('auto_cycle_limit', 0)
     target_width = 11
@@ -363,12 +475,43 @@ def run_orchestration(args, prefix, ui):
     else:
         ui.log_main(f"{qrane_prefix}Initiating Qrew... (Mode: {final_mode})")
 
-    cycle = 1
+    launcher = None
+    if config.get('options', {}).get('agent_launcher', 'subprocess') == 'forkserver' and ForkServerLauncher:
+        try: launcher = ForkServerLauncher(worqspace, AGENT_MODULE_DIR, env=os.environ.copy())
+        except Exception as e:
+            msg = f"Fork server unavailable ({e}), launching agents as subprocesses."
+            if ui: ui.log_main(f"{qrane_prefix}{msg}")
+            else: print(f"{qrane_prefix}{msg}\r")
+
+    # Agent output goes to compressed, indexed segments in struqture/logs/ (query with --logs)
+    log_store = open_log_store(worqspace, config.get('options', {}))
+
+    # Durable record of finished agents, briqs and cyQles; --resume continues after them
+    journal = RunJournal(path_manager.get_journal_path())
+    resuming = args.resume is not None
+    journal.start(resume=resuming)
+    if resuming:
+        os.environ['QONQ_RESUME'] = '1'
+        msg = f"Resuming at {Colors.C}cyQle {journal.resume_cycle()}{Colors.R} (finished agents and briqs are skipped)"
+        if ui: ui.log_main(f"{qrane_prefix}{msg}")
+        else: print(f"{qrane_prefix}{msg}\r")
+
+    cycle = journal.resume_cycle() if resuming else 1
     session_failed = False
     user_aborted = False
 
+    # The pipeline is validated and compiled once per run, not re-read every cyQle
     try:
-        while True:
+        specs = load_pipeline(path_manager.root / 'pipeline_config.yaml', bool(config.get('options', {}).get('pipelined', False)))
+    except PipelineError as e:
+        specs = None
+        session_failed = True
+        msg = f"{Colors.RED}Pipeline Error:{Colors.R} {e}"
+        if ui: ui.log_main(f"{qrane_prefix}{msg}")
+        else: print(f"{qrane_prefix}{msg}\r")
+
+    try:
+        while specs:
             if args.auto and max_cycles > 0 and cycle > max_cycles:
                 limit_str = f"{Colors.C}{max_cycles}{Colors.R}"
                 msg = f"Max cyQle limit hit ({limit_str}) - Edit config.yaml to change this."
@@ -379,25 +522,7 @@ def run_orchestration(args, prefix, ui):
             env = os.environ.copy()
             env["CYCLE_NUM"] = str(cycle)
 
-            try:
-                with open(path_manager.root / 'pipeline_config.yaml', 'r') as f:
-                    pipeline_config = yaml.safe_load(f)
-            except:
-                if ui: ui.log_main("Config Error"); break
-                else: print("Config Error"); break
-
-            def resolve_template(tpl):
-                if "{N}" in tpl: return tpl.replace("{N}", str(cycle))
-                return tpl
-
-            agents_to_run = []
-            for agent_def in pipeline_config.get('agents', []):
-                name = agent_def['name']
-                script = agent_def['script']
-                input_path = path_manager.root / resolve_template(agent_def['input'])
-                output_path = path_manager.root / resolve_template(agent_def['output'])
-                cmd = ["python3", str(AGENT_MODULE_DIR / script), str(input_path), str(output_path)]
-                agents_to_run.append((name, cmd))
+            agents = build_agents(specs, path_manager, cycle, env)
 
             AGENT_COLORS = {"instruqtor": Colors.LIME, "construqtor": Colors.C, "inspeqtor": Colors.MAGENTA}
 
@@ -410,15 +535,30 @@ def run_orchestration(args, prefix, ui):
                      inst_padding = " " * 1
                      print(f"{Colors.B}〘{prefix}〙『{Colors.LIME}instruQtor{Colors.B}』{inst_padding}⸎ {Colors.R}Ingesting cyqle{cycle}_tasq.md...\r")
 
-            for name, cmd in agents_to_run:
-                log_file = path_manager.get_agent_log_path(cycle, name)
-                if not run_agent(name, cmd, prefix, AGENT_COLORS.get(name, Colors.WHITE), logger, log_file, env, ui):
-                    session_failed = True; break
+            cycle_start = time.monotonic()
+            def already_done(name, cycle=cycle):
+                # Checked once the agent is ready, so its input is the one its dependencies just left
+                if not resuming or not journal.agent_done(cycle, name, input_digest(agents[name][2], cycle)): return False
+                msg = f"{name.replace('q', 'Q')} already finished cyQle {cycle}, skipping."
+                if ui: ui.log_main(f"{qrane_prefix}{msg}")
+                else: print(f"{qrane_prefix}{msg}\r")
+                return True
 
+            def agent_finished(name, ok, wall_s, cycle=cycle):
+                if ledger: ledger.record('agent', cycle, agent=name, wall_s=wall_s, ok=ok)
+                if ok: journal.mark_agent(cycle, name, input_digest(agents[name][2], cycle))
+
+            entries = {name: (cmd, AGENT_COLORS.get(name, Colors.WHITE), agent_log(log_store, path_manager, cycle, name), agent_env)
+                       for name, (cmd, agent_env, _) in agents.items()}
+            outcome = run_agents(ReadySet(specs), entries, prefix, logger, ui, launcher, skip=already_done, on_finish=agent_finished)
+            if not all(ok for ok, _ in outcome.values()): session_failed = True
+
+            if ledger: ledger.record('cycle', cycle, wall_s=round(time.monotonic() - cycle_start, 4))
             if session_failed: break
 
             res = handle_cheqpoint(cycle, args, path_manager.get_reqap_path(cycle), prefix, path_manager, ui)
             if res == 'QUIT': break
+            journal.mark_cycle(cycle)
             cycle += 1
 
     except KeyboardInterrupt:
@@ -426,6 +566,8 @@ def run_orchestration(args, prefix, ui):
             raise
         session_failed = True
         user_aborted = True
+    finally:
+        if launcher: launcher.close()
 
     if not ui:
         print()
@@ -436,5 +578,80 @@ def run_orchestration(args, prefix, ui):
         else:
              print(f"{qrane_prefix}QonQrete session finished. Enjoy :)\r")
 
+def seed_qage(worqspace: Path, tasq_file: Path, stamp: str) -> Path:
+    """Creates worqspace/qage_<stamp>_<tasq> with the worqspace configs and the tasq as cyQle 1."""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', tasq_file.stem).strip('_') or 'tasq'
+    root = worqspace / f"qage_{stamp}_{slug}"
+    for d in ("tasq.d", "briq.d", "exeq.d", "reqap.d", "qodeyard", "struqture"): (root / d).mkdir(parents=True, exist_ok=True)
+    for name in ("config.yaml", "pipeline_config.yaml"):
+        if (worqspace / name).exists(): shutil.copy(worqspace / name, root / name)
+    shutil.copy(tasq_file, PathManager(root).get_tasq_path(1))
+    return root
+
+def run_batch(args, qrane_prefix: str):
+    worqspace = get_worqspace()
+    tasq_files = sorted(Path(args.batch).glob("*.md"))
+    if not tasq_files:
+        print(f"{qrane_prefix}No *.md tasqs found in {args.batch}.")
+        return
+
+    os.environ.setdefault('QONQ_CACHE_DIR', str(worqspace / 'qache.d')) # One response cache for every job
+    if args.no_cache: os.environ['QONQ_NO_CACHE'] = '1'
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+
+    jobs, log_stores = [], {}
+    for tasq_file in tasq_files:
+        root = seed_qage(worqspace, tasq_file, stamp)
+        try:
+            with open(root / 'config.yaml', 'r') as f: config = yaml.safe_load(f) or {}
+        except: config = {}
+        options = config.get('options', {})
+        try: specs = load_pipeline(root / 'pipeline_config.yaml', bool(options.get('pipelined', False)))
+        except PipelineError as e:
+            print(f"{qrane_prefix}{Colors.RED}Pipeline Error{Colors.R} in {root.name}: {e}")
+            continue
+        env = os.environ.copy()
+        env['QONQ_MODE'] = args.mode if args.mode else options.get('mode', 'program')
+        env['QONQ_SENSITIVITY'] = str(args.briq_sensitivity if args.briq_sensitivity is not None else options.get('briq_sensitivity', 5))
+        ledger = None
+        if options.get('metrics', True) and metrics:
+            ledger = metrics.MetricsLedger(metrics.ledger_path(root))
+            env['QONQ_RUN_ID'] = ledger.start_run()
+            env['QONQ_METRICS_FILE'] = str(ledger.path)
+        else:
+            env['QONQ_METRICS_FILE'] = ''
+        journal = RunJournal(PathManager(root).get_journal_path())
+        journal.start(resume=False)
+        # Batch jobs never stop at a cheqpoint, so an unlimited cyQle count means one cyQle
+        jobs.append(BatchJob(tasq_file.stem, root, options.get('auto_cycle_limit', 0) or 1, env, ledger, journal, specs))
+        log_stores[tasq_file.stem] = open_log_store(root, options)
+        print(f"{qrane_prefix}Seeded {Colors.C}{root.name}{Colors.R} for {tasq_file.name}")
+
+    def plan_cycle(job):
+        path_manager = PathManager(job.root)
+        env = dict(job.env, CYCLE_NUM=str(job.cycle))
+        agents = {name: (cmd, agent_env, agent_log(log_stores[job.name], path_manager, job.cycle, name), input_path)
+                  for name, (cmd, agent_env, input_path) in build_agents(job.specs, path_manager, job.cycle, env).items()}
+        return ReadySet(job.specs), agents
+
+    def finish_cycle(job):
+        path_manager = PathManager(job.root)
+        if job.ledger: job.ledger.record('cycle', job.cycle, wall_s=round(time.monotonic() - job.cycle_start, 4))
+        promote_reqap(job.cycle, "aQQ", path_manager, quiet=True)
+        job.journal.mark_cycle(job.cycle)
+
+    if not jobs: return
+    max_agents = args.max_agents or os.cpu_count() or 4
+    print(f"{qrane_prefix}Batch of {len(jobs)} tasqs, at most {max_agents} agents at once...")
+    scheduler = BatchScheduler(jobs, max_agents, AgentSupervisor(), plan_cycle,
+                               lambda command, env, cwd: spawn_agent(command, env, cwd=cwd), finish_cycle,
+                               log=lambda msg: print(f"{qrane_prefix}{msg}"))
+    t0 = time.monotonic()
+    try: scheduler.run()
+    finally:
+        print()
+        print(render_summary(jobs))
+        print(f"Batch wall time: {time.monotonic() - t0:.1f}s")
+
 if __name__ == "__main__":
     main()
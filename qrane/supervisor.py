@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# qrane/supervisor.py - Event-driven agent supervisor
+import os
+import selectors
+import sys
+import time
+from collections import deque
+
+from logstore import split_briq_tag
+
+READ_CHUNK = 64 * 1024
+LOG_BUFFER = 64 * 1024
+STDERR_TAIL = 200
+
+class PlainLog:
+    """Raw struqture/cyqle<N>_<agent>.log, for options.log_store: plain."""
+    def __init__(self, path):
+        # One buffered handle for the agent's lifetime instead of an open() per line
+        self.f = open(path, 'a', encoding='utf-8', buffering=LOG_BUFFER)
+
+    def write(self, stream: str, text: str, briq: str = None):
+        self.f.write(text + "\n")
+
+    def close(self):
+        try: self.f.close()
+        except OSError: pass
+
+class SupervisedAgent:
+    """
+    One agent process: its output callbacks, line buffers and its log sink,
+    either a path (PlainLog) or an object with write(stream, text, briq) and
+    close() such as logstore.AgentLog.
+    """
+    def __init__(self, name: str, proc, log_file, on_stdout=None, on_stderr=None):
+        self.name = name
+        self.proc = proc
+        self.on_stdout = on_stdout
+        self.on_stderr = on_stderr
+        self.stderr_tail = deque(maxlen=STDERR_TAIL)
+        self.open_streams = 0
+        self.returncode = None
+        self.started = time.monotonic()
+        self.ended = None
+        self._partial = {}
+        if log_file is None or hasattr(log_file, 'write'): self.log = log_file
+        else: self.log = PlainLog(log_file)
+
+    def feed(self, stream: str, data: bytes):
+        buf = self._partial.get(stream, b"") + data
+        *lines, rest = buf.split(b"\n")
+        self._partial[stream] = rest
+        for raw in lines: self._emit(stream, raw.decode('utf-8', errors='replace') + "\n")
+
+    def flush_partial(self, stream: str):
+        rest = self._partial.pop(stream, b"")
+        if rest: self._emit(stream, rest.decode('utf-8', errors='replace'))
+
+    def _emit(self, stream: str, line: str):
+        briq, line = split_briq_tag(line)
+        if self.log: self.log.write(stream, line.rstrip("\n"), briq)
+        clean = line.strip()
+        if stream == 'stdout':
+            if self.on_stdout: self.on_stdout(clean)
+        else:
+            self.stderr_tail.append(clean)
+            if self.on_stderr: self.on_stderr(clean)
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+class AgentSupervisor:
+    """
+    Multiplexes stdout/stderr of any number of agent processes (and, in TUI
+    mode, keyboard input) over one selector. The loop sleeps until a pipe or
+    the keyboard has data, so an idle Qrane costs no CPU.
+
+    on_key(procs) is called when stdin becomes readable; it may raise to abort
+    the run, in which case every supervised process is killed. on_exit(agent)
+    is called once per finished agent and may add() further agents.
+    """
+    def __init__(self, on_key=None, on_exit=None, idle_timeout=None):
+        self.selector = selectors.DefaultSelector()
+        self.on_key = on_key
+        self.on_exit = on_exit
+        # Callable returning the next select() timeout (None = wait for events)
+        self.idle_timeout = idle_timeout
+        self.active = []
+        self.finished = []
+        if on_key:
+            try: self.selector.register(sys.stdin.fileno(), selectors.EVENT_READ, None)
+            except (ValueError, OSError, KeyError): self.on_key = None
+
+    def add(self, name: str, proc, log_file=None, on_stdout=None, on_stderr=None) -> SupervisedAgent:
+        agent = SupervisedAgent(name, proc, log_file, on_stdout, on_stderr)
+        for stream, pipe in (('stdout', proc.stdout), ('stderr', proc.stderr)):
+            if pipe is None: continue
+            os.set_blocking(pipe.fileno(), False)
+            self.selector.register(pipe.fileno(), selectors.EVENT_READ, (agent, stream))
+            agent.open_streams += 1
+        self.active.append(agent)
+        if not agent.open_streams: self._reap(agent)
+        return agent
+
+    def run(self) -> dict:
+        """Supervises until every agent has exited. Returns {name: returncode}."""
+        try:
+            while self.active:
+                timeout = self.idle_timeout() if self.idle_timeout else None
+                for key, _ in self.selector.select(timeout):
+                    if key.data is None:
+                        self.on_key([a.proc for a in self.active])
+                        continue
+                    agent, stream = key.data
+                    try: data = os.read(key.fd, READ_CHUNK)
+                    except BlockingIOError: continue
+                    if data:
+                        agent.feed(stream, data)
+                        continue
+                    self.selector.unregister(key.fd)
+                    agent.flush_partial(stream)
+                    agent.open_streams -= 1
+                    if agent.open_streams == 0: self._reap(agent)
+        except BaseException:
+            self.kill_all()
+            raise
+        finally:
+            for agent in self.active + self.finished: agent.close()
+            self.selector.close()
+        return {a.name: a.returncode for a in self.finished}
+
+    def _reap(self, agent: SupervisedAgent):
+        # Both pipes hit EOF: the process is exiting, wait() returns promptly
+        agent.returncode = agent.proc.wait()
+        agent.ended = time.monotonic()
+        agent.close()
+        self.active.remove(agent)
+        self.finished.append(agent)
+        if self.on_exit: self.on_exit(agent)
+
+    def kill_all(self):
+        for agent in self.active:
+            try:
+                if agent.proc.poll() is None: agent.proc.kill()
+                agent.proc.wait(timeout=5)
+            except Exception: pass
@@ -6,20 +6,31 @@ import threading
 import re
 import subprocess
 import os
+from collections import deque
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# Scrollback kept per panel; older lines fall off the ring buffer
+SCROLLBACK_LINES = 2000
+# Log lines are coalesced and drawn at most this many times per second
+MAX_FPS = 30
 
 class QonqreteTUI:
     def __init__(self):
         self.stdscr = None
         self.top_win = None
         self.bottom_win = None
-        self.log_lock = threading.Lock()
+        self.log_lock = threading.RLock()
 
         self.show_qonsole = True
         self.wonqrete_mode = False
 
-        self.top_win_buffer = []
-        self.bottom_win_buffer = []
+        self.top_win_buffer = deque(maxlen=SCROLLBACK_LINES)
+        self.bottom_win_buffer = deque(maxlen=SCROLLBACK_LINES)
 
+        self.frame_interval = 1.0 / MAX_FPS
+        self.last_frame = 0.0
+        self.dirty = False
 
         # Colors
         self.COLOR_DEFAULT = 1
@@ -80,26 +91,17 @@ class QonqreteTUI:
             self.bottom_win.scrollok(True)
             self.bottom_win.idlok(True)
 
-        # Redraw from buffers
-        for text, attr in self.top_win_buffer:
-            self._append_to_win(self.top_win, text, attr, buffer_only=False)
-        for text, attr in self.bottom_win_buffer:
-            self._append_to_win(self.bottom_win, text, attr, buffer_only=False)
-
-
-        self.refresh_borders()
+        # Redraw from buffers (only the visible tail is drawn)
         self.draw_helper_bar()
+        self.render()
 
     def toggle_qonsole(self):
         self.show_qonsole = not self.show_qonsole
-        # Clear buffers for a clean redraw on toggle, as window sizes change
-        self.top_win_buffer.clear()
-        self.bottom_win_buffer.clear()
         self.setup_windows()
 
     def toggle_wonqrete(self):
         self.wonqrete_mode = not self.wonqrete_mode
-        self.refresh_borders()
+        self.render()
 
     def close(self):
         if self.stdscr:
@@ -111,8 +113,7 @@ class QonqreteTUI:
             curses.endwin()
 
     def _strip_ansi(self, text: str) -> str:
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        return ansi_escape.sub('', text)
+        return ANSI_ESCAPE.sub('', text)
 
     def draw_helper_bar(self):
         h, w = self.stdscr.getmaxyx()
@@ -123,49 +124,53 @@ class QonqreteTUI:
         except: pass
 
     def refresh_borders(self):
-        self.top_win.box()
-        title = " Qommander (Flow) "
-        if self.wonqrete_mode: title = " WoNQrete (Flow) "
-        self.top_win.addstr(0, 2, title, curses.A_BOLD | curses.color_pair(self.COLOR_CYAN))
-
-        if self.bottom_win:
-            self.bottom_win.box()
-            self.bottom_win.addstr(0, 2, " Qonsole (Raw Logs) ", curses.A_BOLD | curses.color_pair(self.COLOR_YELLOW))
-            self.bottom_win.refresh()
-
-        self.top_win.refresh()
-
-    def _append_to_win(self, window, text: str, color_attr, buffer_only=False):
-        if not window: return
+        self.render()
+
+    def _draw_window(self, window, buffer, title: str, title_color: int):
+        """Redraws one panel from the tail of its ring buffer; cost depends on window height only."""
+        h, w = window.getmaxyx()
+        window.erase()
+        rows = max(0, h - 3)
+        start = max(0, len(buffer) - rows)
+        for i in range(start, len(buffer)):
+            line, attr = buffer[i]
+            try: window.addstr(2 + i - start, 2, line[:max(0, w - 4)], attr)
+            except curses.error: pass
+        window.box()
+        try: window.addstr(0, 2, title, curses.A_BOLD | curses.color_pair(title_color))
+        except curses.error: pass
+        window.noutrefresh()
+
+    def render(self):
+        """Draws pending log lines now (one doupdate for both panels)."""
+        with self.log_lock:
+            if not self.top_win: return
+            title = " WoNQrete (Flow) " if self.wonqrete_mode else " Qommander (Flow) "
+            self._draw_window(self.top_win, self.top_win_buffer, title, self.COLOR_CYAN)
+            if self.bottom_win:
+                self._draw_window(self.bottom_win, self.bottom_win_buffer, " Qonsole (Raw Logs) ", self.COLOR_YELLOW)
+            curses.doupdate()
+            self.dirty = False
+            self.last_frame = time.monotonic()
+
+    def render_tick(self):
+        """
+        Renders if lines are pending and a frame is due. Returns the seconds
+        until the next frame is due (None when nothing is pending), for use
+        as the supervisor's select() timeout.
+        """
+        if not self.dirty: return None
+        remaining = self.frame_interval - (time.monotonic() - self.last_frame)
+        if remaining > 0: return remaining
+        self.render()
+        return None
+
+    def _append_to_buffer(self, buffer, text: str, color_attr):
         with self.log_lock:
-            if buffer_only:
-                if window == self.top_win: self.top_win_buffer.append((text, color_attr))
-                else: self.bottom_win_buffer.append((text, color_attr))
-
-            h, w = window.getmaxyx()
-            clean_text = self._strip_ansi(text)
-
-            lines = clean_text.split('\n')
-            for line in lines:
-                if len(line) > w - 4: line = line[:w-4]
-                try:
-                    # Use insertln to scroll content up
-                    window.move(h-2, 2)
-                    window.insertln()
-                    window.addstr(2, 2, line, color_attr)
-                except: pass
-
-                window.box()
-                # Redraw title
-                if window == self.top_win:
-                    t = " WoNQrete (Flow) " if self.wonqrete_mode else " Qommander (Flow) "
-                    c = self.COLOR_CYAN
-                else:
-                    t = " Qonsole (Raw Logs) "
-                    c = self.COLOR_YELLOW
-                window.addstr(0, 2, t, curses.A_BOLD | curses.color_pair(c))
-
-            window.refresh()
+            for line in self._strip_ansi(text).split('\n'):
+                buffer.append((line, color_attr))
+            self.dirty = True
+        self.render_tick()
 
     def log_main(self, text: str):
         attr = curses.color_pair(self.COLOR_DEFAULT) | curses.A_BOLD
@@ -173,15 +178,13 @@ class QonqreteTUI:
         elif "construQtor" in text: attr = curses.color_pair(self.COLOR_CYAN)
         elif "inspeQtor" in text: attr = curses.color_pair(self.COLOR_MAGENTA)
         elif "Qrane" in text: attr = curses.color_pair(self.COLOR_WHITE)
-        self.top_win_buffer.append((text, attr))
-        self._append_to_win(self.top_win, text, attr, buffer_only=False)
+        self._append_to_buffer(self.top_win_buffer, text, attr)
 
     def log_agent(self, text: str):
         if not self.show_qonsole: return
         attr = curses.color_pair(self.COLOR_DEFAULT)
         if "error" in text.lower(): attr = curses.color_pair(self.COLOR_RED)
-        self.bottom_win_buffer.append((text, attr))
-        self._append_to_win(self.bottom_win, text, attr, buffer_only=False)
+        self._append_to_buffer(self.bottom_win_buffer, text, attr)
 
     def get_key_nonblocking(self):
         try:
@@ -192,6 +195,7 @@ class QonqreteTUI:
         """Used for checkpoints, blocks execution."""
         self.stdscr.nodelay(False)
         self.log_main(prompt)
+        self.render()
         curses.echo()
         curses.curs_set(1)
         h, w = self.top_win.getmaxyx()
@@ -207,7 +211,7 @@ class QonqreteTUI:
         self.stdscr.nodelay(True)
         # Clear the input window area
         self.top_win.touchwin()
-        self.top_win.refresh()
+        self.render()
 
         return inp_str
 
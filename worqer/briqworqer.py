@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# worqer/briqworqer.py - Remote briq worQer: builds briqs pulled from a construQtor's briq queue
+"""
+Usage: briqworqer.py <unix:PATH | tcp:HOST:PORT> [--slots N] [--token T] [--worqspace DIR] [--once]
+
+Connects to the briq queue (lib_briqqueue), runs up to --slots briqs at once
+through lib_ai and sends each response back. Jobs always run with provider
+tools off (the queue only hands out materialized briqs), and the
+construQtor writes the response's files into its own qodeyard. The
+construQtor only hosts the queue while it builds a cyQle, so the worQer
+reconnects until it is stopped (--once: exit after the first cyQle).
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+try:
+    import yaml
+    import lib_ai, lib_briqqueue, lib_metrics
+except ImportError as e: print(f"CRITICAL: {e}"); sys.exit(1)
+
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 5.0
+TEXT_FLUSH = 0.2 # Streamed text is batched into one message per job at most this often
+
+_print_lock = threading.Lock()
+
+def log(msg: str):
+    with _print_lock:
+        sys.stdout.write(f"{msg}\n")
+        sys.stdout.flush()
+
+class Session:
+    """One connection to a queue, from welcome to bye."""
+    def __init__(self, channel: lib_briqqueue.Channel, slots: int, lease_s: float):
+        self.channel = channel
+        self.slots = slots
+        self.lease_s = lease_s
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.running = set() # Leases being built, beaten until their result is sent
+        self.done = threading.Event()
+        self.built = 0
+
+    def run(self):
+        threading.Thread(target=self._beat_loop, daemon=True).start()
+        pool = ThreadPoolExecutor(max_workers=self.slots)
+        try:
+            for _ in range(self.slots): self.channel.send({'op': 'pull'})
+            while True:
+                msg = self.channel.recv()
+                if msg is None or msg.get('op') == 'bye': break
+                if msg.get('op') == 'job': pool.submit(self._build, msg)
+        finally:
+            self.done.set()
+            self.channel.close()
+            # Briqs still running can no longer report back (the queue re-queues them), so they are not waited for
+            pool.shutdown(wait=False, cancel_futures=True)
+        return self.built
+
+    def _on_text(self, lease: str, text: str):
+        with self.lock: self.buffers.setdefault(lease, []).append(text)
+
+    def _flush(self, lease: str = None):
+        with self.lock:
+            leases = [lease] if lease else list(self.buffers)
+            chunks = {l: "".join(self.buffers.pop(l, [])) for l in leases if self.buffers.get(l)}
+        for l, text in chunks.items(): self.channel.send({'op': 'text', 'job': l, 'text': text})
+
+    def _beat_loop(self):
+        last_beat = time.monotonic()
+        while not self.done.wait(TEXT_FLUSH):
+            self._flush()
+            if time.monotonic() - last_beat >= self.lease_s / 3:
+                with self.lock: leases = list(self.running)
+                self.channel.send({'op': 'beat', 'jobs': leases})
+                last_beat = time.monotonic()
+
+    def _build(self, job: dict):
+        lease = job['job']
+        with self.lock: self.running.add(lease)
+        started = time.monotonic()
+        log(f"-- Building Briq: {job.get('briq')} --")
+        try:
+            with lib_ai.briq_scope(job.get('briq')), lib_metrics.capture() as records:
+                text = lib_ai.run_ai_completion(job['provider'], job['model'], job['prompt'], cache=job.get('cache', True), tools=False,
+                                                on_text=lambda t: self._on_text(lease, t), fallback=job.get('fallback'))
+            self._flush(lease)
+            self.channel.send({'op': 'result', 'job': lease, 'ok': True, 'text': text, 'metrics': records})
+            self.built += 1
+            log(f"-- Built Briq: {job.get('briq')} ({time.monotonic() - started:.1f}s) --")
+        except Exception as e:
+            self._flush(lease)
+            self.channel.send({'op': 'result', 'job': lease, 'ok': False, 'error': str(e)})
+            log(f"-- Failed Briq: {job.get('briq')}: {e} --")
+        finally:
+            with self.lock:
+                self.running.discard(lease)
+                self.buffers.pop(lease, None)
+        self.channel.send({'op': 'pull'})
+
+def main():
+    parser = argparse.ArgumentParser(prog="briqworqer.py", description="Build briqs pulled from a construQtor's briq queue.")
+    parser.add_argument("address", help="unix:PATH or tcp:HOST:PORT of the briq queue")
+    parser.add_argument("--slots", type=int, default=1, help="Briqs built at once")
+    parser.add_argument("--token", default=os.environ.get('QONQ_QUEUE_TOKEN'), help="Shared secret of the queue (default: $QONQ_QUEUE_TOKEN)")
+    parser.add_argument("--worqspace", help="Scratch directory (default: a new temporary directory)")
+    parser.add_argument("--once", action="store_true", help="Exit after the first cyQle instead of reconnecting")
+    args = parser.parse_args()
+
+    # lib_ai reads config.yaml and keeps its limiter state relative to the working directory
+    worqspace = Path(args.worqspace or tempfile.mkdtemp(prefix="briqworqer_")).resolve()
+    (worqspace / "struqture").mkdir(parents=True, exist_ok=True)
+    os.chdir(worqspace)
+    os.environ['QONQ_METRICS_FILE'] = '' # Records go back to the queue's ledger
+    name = f"{socket.gethostname()}:{os.getpid()}"
+
+    delay = RECONNECT_MIN
+    waiting = False
+    while True:
+        try: channel = lib_briqqueue.Channel(lib_briqqueue.connect(args.address))
+        except OSError:
+            if not waiting: log(f"--- Waiting for the briq queue at {args.address} ---")
+            waiting = True
+            time.sleep(delay)
+            delay = min(RECONNECT_MAX, delay * 2)
+            continue
+        waiting, delay = False, RECONNECT_MIN
+        channel.send({'op': 'hello', 'worker': name, 'slots': args.slots, 'token': args.token})
+        welcome = channel.recv()
+        if not welcome or welcome.get('op') != 'welcome':
+            channel.close()
+            if welcome and welcome.get('op') == 'error': log(f"CRITICAL: {welcome.get('error')}"); sys.exit(1)
+            time.sleep(delay) # Queue closing between cyQles
+            continue
+        with open(worqspace / "config.yaml", 'w', encoding='utf-8') as f: yaml.safe_dump(welcome.get('config') or {}, f)
+        log(f"--- Connected to {args.address} as {name} ({args.slots} slots) ---")
+        built = Session(channel, max(1, args.slots), float(welcome.get('lease_s') or lib_briqqueue.DEFAULT_LEASE)).run()
+        log(f"--- Queue closed, {built} briqs built ---")
+        if args.once: return
+
+if __name__ == "__main__":
+    try: main()
+    except KeyboardInterrupt: pass
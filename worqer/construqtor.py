@@ -2,20 +2,134 @@
 # worqer/construqtor.py
 import sys
 import os
-import yaml
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-try: import lib_ai
+try: import lib_ai, lib_manifest, lib_context, lib_metrics, lib_journal, lib_carryover, lib_materialize, lib_briqqueue
 except ImportError: print("CRITICAL: lib_ai.py not found."); sys.exit(1)
 
+# Briq 00-05 lay down the project skeleton (see instruqtor SETUP FIRST directive)
+SETUP_BRIQ_LIMIT = 5
+# Pipelined mode: how often briq.d/ is checked for newly published briqs
+PLAN_POLL_INTERVAL = 0.05
+MATERIALIZE_OUTPUT = """Return EVERY file as a fenced code block directly preceded by a line `File: <path relative to the project root>`.
+To change part of an existing file you may instead return a ```diff block holding a unified diff (`--- a/<path>` / `+++ b/<path>` headers, `@@` hunks with 3 lines of context)."""
+
+_print_lock = threading.Lock()
+
+def log(msg: str):
+    # Whole-line writes so parallel briqs never interleave inside a Qrane log line
+    with _print_lock:
+        sys.stdout.write(f"{lib_ai.briq_tag()}{msg}\n")
+        sys.stdout.flush()
+
 def get_mode_persona(mode: str) -> str:
     m = mode.lower()
     if m == 'enterprise': return "Code Style: Enterprise. Add logging, error handling, docstrings, and modular structure."
     if m == 'security': return "Code Style: Security. Validate all inputs, use secure defaults."
     return "Code Style: Functional."
 
+def is_setup_briq(briq_file: Path) -> bool:
+    m = re.search(r'_briq(\d+)', briq_file.name)
+    return bool(m) and int(m.group(1)) <= SETUP_BRIQ_LIMIT
+
+def follow_briqs(briq_dir: Path, cycle_num: str):
+    """
+    Yields this cycle's briqs as the instruQtor publishes them (pipelined
+    mode), in plan order, until its cyqle<N>_plan.done marker appears.
+    """
+    marker = briq_dir / f"cyqle{cycle_num}_plan.done"
+    seen = set()
+    while True:
+        done = marker.exists() # Checked before listing, so no briq written before the marker is missed
+        new = sorted(p for p in briq_dir.glob(f"cyqle{cycle_num}_*.md") if p.name not in seen)
+        for briq_file in new:
+            seen.add(briq_file.name)
+            yield briq_file
+        if done: return
+        if not new: time.sleep(PLAN_POLL_INTERVAL)
+
+def execute_briq(briq_file: Path, ai_provider: str, ai_model: str, mode: str, mode_prompt: str, packer, journal=None, resume=False, carry=None, fallback=None, qodeyard=None, complete=None) -> dict:
+    with open(briq_file, 'r', encoding='utf-8') as f: briq_content = f.read()
+    cycle = int(os.environ.get('CYCLE_NUM', '1'))
+    digest = lib_journal.content_sha(briq_content)
+    if resume and journal and journal.is_done(cycle, briq_file.name, digest):
+        log(f"-- Skipping Briq: {briq_file.name} (journaled) --")
+        return { 'briq_file': briq_file.name, 'status': 'success' }
+
+    if carry:
+        carried = carry.match(briq_content)
+        if carried:
+            source, files = carried
+            carry.record(briq_file.name, briq_content, files, carried_from=source)
+            lib_metrics.record('briq', briq=briq_file.name, status='carried', wall_s=0.0)
+            log(f"-- Carried Over Briq: {briq_file.name} (unchanged since cyQle {carry.previous_cycle}, {len(files)} files intact) --")
+            return { 'briq_file': briq_file.name, 'status': 'success', 'carried': True }
+
+    log(f"-- Processing Briq: {briq_file.name} --")
+    started = time.monotonic()
+
+    context_files = []
+    if packer:
+        context_files, context_tokens = packer.select(briq_content)
+        log(f"     [Context] {len(context_files)} files, ~{context_tokens} tokens")
+
+    # With a qodeyard to materialize into, the response itself carries the files
+    output_rule = MATERIALIZE_OUTPUT if qodeyard else "Return the code files inside markdown blocks."
+    prompt = f"""You are the 'construQtor'.
+**OBJECTIVE:** Write the code to implement the plan.
+**RESTRICTION:** GENERATE CODE ONLY.
+**OUTPUT:** {output_rule}
+
+**MODE:** {mode.upper()}
+{mode_prompt}
+
+**Plan:**
+{briq_content}
+"""
+    success = False
+    result = ""
+    applied = None
+    try:
+        # Without materialization the construQtor's output is the file writes done by the provider's
+        # tools, so replaying a cached response would leave the qodeyard empty. With it, tools are off:
+        # the response is the whole output, so a cache hit reproduces it exactly
+        result = (complete or lib_ai.run_ai_completion)(ai_provider, ai_model, prompt, context_files=context_files,
+                                                        cache=bool(qodeyard), fallback=fallback, tools=not qodeyard)
+        success = True
+    except Exception as e:
+        # [FIX] If we got a partial result or pipe error, check if code was generated anyway
+        log(f"     [WARN] AI Pipe Signal: {e}")
+        if "```" in str(e) or (result and "```" in result):
+            success = True
+        else:
+            success = False
+
+    # [FIX] Double check: Did we actually get code?
+    if result and "```" in result:
+         success = True
+
+    if qodeyard and result:
+        applied = lib_materialize.materialize(result, qodeyard)
+        changed = len(applied['written']) + len(applied['patched']) + len(applied['deleted'])
+        log(f"     [Materialize] {len(applied['written'])} written, {len(applied['patched'])} patched, {len(applied['deleted'])} deleted")
+        for error in applied['errors']: log(f"     [WARN] Materialize: {error}")
+        if applied['errors'] and not changed: success = False
+
+    status = "success" if success else "failure"
+    counts = {k: len(v) for k, v in applied.items()} if applied else {}
+    lib_metrics.record('briq', briq=briq_file.name, status=status, wall_s=round(time.monotonic() - started, 4), **counts)
+    if success and journal: journal.mark_done(cycle, briq_file.name, digest)
+    if success and carry and applied:
+        # The materializer's own list of what this briq wrote, exact even with parallel briqs
+        carry.record(briq_file.name, briq_content, applied['written'] + applied['patched'])
+    log(f"-- Executed Briq: {briq_file.name} (Status: {status}) --")
+    return { 'briq_file': briq_file.name, 'status': status }
+
 def main():
     if len(sys.argv) < 3: print("Usage: construqtor.py <input> <output>"); sys.exit(1)
 
@@ -25,77 +139,124 @@ def main():
     qodeyard_path = worqspace_root / "qodeyard"
     qodeyard_path.mkdir(parents=True, exist_ok=True)
 
-    try:
-        with open('config.yaml', 'r', encoding='utf-8') as f: config = yaml.safe_load(f) or {}
-    except: config = {}
+    config = lib_ai.load_config()
 
     agent_cfg = config.get('agents', {}).get('construqtor', {})
     ai_provider = agent_cfg.get('provider', 'gemini')
     ai_model = agent_cfg.get('model', 'gemini-1.5-pro')
 
+    try: max_parallel = max(1, int(config.get('options', {}).get('max_parallel_briqs', 1) or 1))
+    except: max_parallel = 1
+
+    try: token_budget = int(config.get('options', {}).get('context_token_budget', 0) or 0)
+    except: token_budget = 0
+
     mode = os.environ.get('QONQ_MODE', 'enterprise')
     mode_prompt = get_mode_persona(mode)
 
     cycle_num = os.environ.get('CYCLE_NUM', '1')
-    pattern = f"cyqle{cycle_num}_*.md"
-    briq_files = sorted(briq_dir.glob(pattern))
+    pipelined = os.environ.get('QONQ_PIPELINED') == '1'
+    if pipelined:
+        print(f"--- Construqtor Following the Plan ({max_parallel} parallel) ---", flush=True)
+        briq_source = follow_briqs(briq_dir, cycle_num)
+    else:
+        briq_source = sorted(briq_dir.glob(f"cyqle{cycle_num}_*.md"))
+        if not briq_source:
+            print(f"CRITICAL: No briqs found.", flush=True); sys.exit(1)
+        print(f"--- Construqtor Found {len(briq_source)} Briqs ---", flush=True)
+        if max_parallel > 1:
+            print(f"--- Construqtor Processing Briqs ({max_parallel} parallel) ---", flush=True)
+    # Warm provider processes only pay off over several calls (options.provider_pool_size)
+    if pipelined or len(briq_source) > 1: lib_ai.use_session_pool()
 
-    if not briq_files:
-        print(f"CRITICAL: No briqs found.", flush=True); sys.exit(1)
+    # Relevance-ranked qodeyard files, packed into a fixed token budget per briq
+    packer = lib_context.ContextPacker(worqspace_root, token_budget) if token_budget > 0 else None
 
-    all_briqs_summary = []
-    failure_count = 0
+    # Finished briqs are journaled; on --resume, unchanged briqs that already succeeded are skipped
+    journal = lib_journal.BriqJournal(worqspace_root)
+    resume = os.environ.get('QONQ_RESUME') == '1'
 
-    print(f"--- Construqtor Found {len(briq_files)} Briqs ---", flush=True)
-
-    context_dirs = [str(qodeyard_path.resolve())]
-
-    for briq_file in briq_files:
-        print(f"-- Processing Briq: {briq_file.name} --", flush=True)
-        with open(briq_file, 'r', encoding='utf-8') as f: briq_content = f.read()
-
-        prompt = f"""You are the 'construQtor'.
-**OBJECTIVE:** Write the code to implement the plan.
-**RESTRICTION:** GENERATE CODE ONLY.
-**OUTPUT:** Return the code files inside markdown blocks.
+    # Fenced blocks and diffs in each response are written to the qodeyard locally (no provider tool round trips)
+    materialize_into = qodeyard_path if config.get('options', {}).get('materialize', False) else None
 
-**MODE:** {mode.upper()}
-{mode_prompt}
+    # Briqs identical to one of the previous cycle's, whose files are still intact, are not rebuilt.
+    # Needs materialization: its list of written files is what ties a briq to its files
+    carry = None
+    if config.get('options', {}).get('briq_carry_over', False):
+        if materialize_into: carry = lib_carryover.CarryOver(worqspace_root, cycle_num)
+        else: print("[WARN] briq_carry_over needs materialize: true, carry-over is off.", flush=True)
 
-**Plan:**
-{briq_content}
-"""
-        success = False
-        result = ""
+    # Briq queue: provider calls go to max_parallel local slots and to any briqworqer.py connected to it
+    queue_cfg = config.get('options', {}).get('briq_queue') or {}
+    listen = os.environ.get('QONQ_BRIQ_QUEUE') or queue_cfg.get('listen')
+    queue = None
+    if listen:
         try:
-            result = lib_ai.run_ai_completion(ai_provider, ai_model, prompt, context_files=context_dirs)
-            success = True
-        except Exception as e:
-            # [FIX] If we got a partial result or pipe error, check if code was generated anyway
-            print(f"     [WARN] AI Pipe Signal: {e}", flush=True)
-            if "```" in str(e) or (result and "```" in result):
-                success = True
-            else:
-                success = False
+            queue = lib_briqqueue.BriqQueue(listen, config, local_slots=max_parallel,
+                                            lease_s=float(queue_cfg.get('lease_s', lib_briqqueue.DEFAULT_LEASE)),
+                                            max_attempts=int(queue_cfg.get('max_attempts', lib_briqqueue.DEFAULT_ATTEMPTS)),
+                                            token=os.environ.get('QONQ_QUEUE_TOKEN') or queue_cfg.get('token'), log=log)
+            queue.start()
+            print(f"--- Construqtor Briq Queue on {listen} ({max_parallel} local slots) ---", flush=True)
+            # Tool-using providers act on this qodeyard, so without materialization every briq stays local
+            if not materialize_into: print("[WARN] briq_queue: remote worQers only take materialized briqs (materialize: true); building locally.", flush=True)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Briq queue unavailable ({e}), building locally.", flush=True)
+            queue = None
 
-        # [FIX] Double check: Did we actually get code?
-        if result and "```" in result:
-             success = True
+    def run(briq_file: Path) -> dict:
+        # Everything logged for the briq (including mirrored provider output) is tagged with its name
+        with lib_ai.briq_scope(briq_file.name):
+            return execute_briq(briq_file, ai_provider, ai_model, mode, mode_prompt, packer, journal, resume, carry,
+                                agent_cfg.get('fallback'), materialize_into, queue.complete if queue else None)
 
-        status = "success" if success else "failure"
-        if not success: failure_count += 1
+    # Setup briqs run first and in order; everything after them is independent.
+    # Plans list setup briqs first, so they are done before any other briq is submitted.
+    # With a queue every briq is submitted at once; the queue's slots and worQers bound the provider calls
+    briq_files = []
+    results = {}
+    in_flight = max(max_parallel, int(queue_cfg.get('max_in_flight', 64))) if queue else max_parallel
+    try:
+        with ThreadPoolExecutor(max_workers=in_flight) as pool:
+            pending = []
+            for briq_file in briq_source:
+                briq_files.append(briq_file)
+                if is_setup_briq(briq_file): results[briq_file.name] = run(briq_file)
+                else: pending.append(pool.submit(run, briq_file))
+            for future in pending:
+                item = future.result()
+                results[item['briq_file']] = item
+    finally:
+        if queue: queue.close()
 
-        all_briqs_summary.append({ 'briq_file': briq_file.name, 'status': status })
-        print(f"-- Executed Briq: {briq_file.name} (Status: {status}) --", flush=True)
+    if not briq_files:
+        print(f"CRITICAL: No briqs found.", flush=True); sys.exit(1)
+    if pipelined: print(f"--- Construqtor Found {len(briq_files)} Briqs ---", flush=True)
+    if carry: carry.save()
+
+    # Summary keeps the briq order regardless of completion order
+    all_briqs_summary = [results[b.name] for b in briq_files]
+    failure_count = sum(1 for item in all_briqs_summary if item['status'] != 'success')
 
     final_status = "Success" if failure_count == 0 else ("Partial" if failure_count < len(briq_files) else "Failure")
 
     summary_content = f"# Execution Summary\n\n**Overall Status:** {final_status}\n"
-    summary_content += f"**Processed:** {len(briq_files)} | **Failures:** {failure_count}\n\n"
+    carried_count = sum(1 for item in all_briqs_summary if item.get('carried'))
+    summary_content += f"**Processed:** {len(briq_files)} | **Failures:** {failure_count} | **Carried Over:** {carried_count}\n\n"
     for item in all_briqs_summary:
-        summary_content += f"- **{item['briq_file']}**: {item['status']}\n"
+        summary_content += f"- **{item['briq_file']}**: {item['status']}{' (carried over)' if item.get('carried') else ''}\n"
 
     os.makedirs(summary_file.parent, exist_ok=True)
     with open(summary_file, 'w', encoding='utf-8') as f: f.write(summary_content)
 
+    # Record what this cycle left in the qodeyard (stat pass, re-hashes modified files only)
+    manifest = lib_manifest.QodeyardManifest(worqspace_root)
+    entries = manifest.refresh(cycle_num)
+    earlier = [c for c in manifest.cycles() if c < int(cycle_num)]
+    if earlier:
+        changes = manifest.changes_since(earlier[-1], entries)
+        print(f"--- Qodeyard Manifest: {len(entries)} files (+{len(changes['added'])} ~{len(changes['changed'])} -{len(changes['removed'])} since cyQle {earlier[-1]}) ---", flush=True)
+    else:
+        print(f"--- Qodeyard Manifest: {len(entries)} files ---", flush=True)
+
 if __name__ == "__main__": main()
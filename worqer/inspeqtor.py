@@ -1,14 +1,152 @@
 #!/usr/bin/env python3
 # worqer/inspeqtor.py
 import os
+import re
 import sys
-import yaml
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-try: import lib_ai
+try:
+    import lib_ai, lib_manifest, lib_prompt
+    from lib_context import estimate_tokens
 except ImportError: sys.exit(1)
 
+ASSESSMENTS = ("Success", "Partial", "Failure") # Best to worst
+ASSESSMENT_RE = re.compile(r'Assessment:\s*\**\s*(Success|Partial|Failure)', re.IGNORECASE)
+
+REVIEW_HEADER = """
+You are the 'inspeQtor'.
+**TASK:** Review the generated code.
+**OUTPUT:** Strict Markdown reQap.
+1. Assessment: Success/Partial/Failure
+2. Summary
+3. Suggestions
+"""
+
+SHARD_PROMPT = """
+You are the 'inspeQtor', reviewing one shard of a larger codebase ({label}).
+Other shards are reviewed separately, so do not flag symbols merely because they are defined elsewhere.
+**OUTPUT:** Strict Markdown.
+1. Assessment: Success/Partial/Failure (for this shard only)
+2. Findings (bugs, missing pieces, inconsistencies; cite files)
+3. Suggestions
+
+**Files:**
+{files}
+
+**Begin Review:**
+"""
+
+MERGE_PROMPT = """
+You are the 'inspeQtor'. The codebase was reviewed in {count} shards; merge the partial reviews below into ONE reQap.
+**OUTPUT:** Strict Markdown reQap. The first line MUST be `Assessment: Success`, `Assessment: Partial` or `Assessment: Failure`
+for the whole codebase (never better than the worst shard unless its finding is clearly wrong).
+1. Assessment
+2. Summary
+3. Suggestions (deduplicated, most important first, cite files)
+
+**Context:**
+{context}
+
+## Partial Reviews
+{reviews}
+
+**Begin Review:**
+"""
+
+FILE_FOOTER = "\n```\n"
+# Shards are sized from manifest file sizes: estimate_tokens averages ~3 UTF-8 bytes per token on code
+BYTES_PER_TOKEN = 3
+
+def file_header(rel: str) -> str:
+    return f"\n### File: `{rel}`\n```\n"
+
+def file_block(rel: str, content: str) -> str:
+    return file_header(rel) + content + FILE_FOOTER
+
+def shard_files(qodeyard_path: Path, entries: dict, shard_tokens: int) -> list[dict]:
+    """
+    Packs qodeyard files into shards of at most ~shard_tokens, keeping each
+    directory together where it fits. Larger directories are split by file,
+    and a single file over the budget is split into numbered parts, so every
+    line of code lands in some shard. Sizes come from the manifest entries
+    (rel -> [size, mtime_ns, sha256]); only files that must be split are read here.
+    """
+    by_dir = {}
+    for rel in sorted(entries):
+        tokens = (entries[rel][0] + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+        by_dir.setdefault(str(PurePosixPath(rel).parent), []).append((rel, tokens))
+
+    # Shards reference whole files (read only while the prompt streams); only split parts hold text
+    shards, current = [], None
+    def start():
+        shard = {'dirs': [], 'prompt': lib_prompt.Prompt(), 'files': 0, 'tokens': 0}
+        shards.append(shard)
+        return shard
+    def add(shard, directory, rel, tokens, content=None):
+        if directory not in shard['dirs']: shard['dirs'].append(directory)
+        if content is None: shard['prompt'].file(qodeyard_path / rel, header=file_header(rel), footer=FILE_FOOTER, errors='skip')
+        else: shard['prompt'].text(file_block(rel, content))
+        shard['files'] += 1
+        shard['tokens'] += tokens
+
+    for directory, files in by_dir.items():
+        dir_tokens = sum(t for _, t in files)
+        if current is None or current['tokens'] + dir_tokens > shard_tokens: current = start()
+        for rel, tokens in files:
+            if tokens > shard_tokens:
+                try:
+                    with open(qodeyard_path / rel, 'r', encoding='utf-8') as f: lines = f.readlines()
+                except (OSError, UnicodeDecodeError): continue
+                parts, buf, buf_tokens = [], [], 0
+                for line in lines:
+                    t = estimate_tokens(line)
+                    if buf and buf_tokens + t > shard_tokens:
+                        parts.append("".join(buf)); buf, buf_tokens = [], 0
+                    buf.append(line); buf_tokens += t
+                if buf: parts.append("".join(buf))
+                for i, part in enumerate(parts, 1):
+                    add(start(), directory, f"{rel} (part {i}/{len(parts)})", estimate_tokens(part), part)
+                current = None
+                continue
+            if current is None or (current['prompt'] and current['tokens'] + tokens > shard_tokens): current = start()
+            add(current, directory, rel, tokens)
+    return [shard for shard in shards if shard['prompt']]
+
+def worst_assessment(texts: list[str]) -> str:
+    found = [ASSESSMENT_RE.search(t) for t in texts]
+    ranks = [ASSESSMENTS.index(m.group(1).capitalize()) if m else 1 for m in found]
+    return ASSESSMENTS[max(ranks)] if ranks else "Partial"
+
+def review_sharded(shards: list[dict], context_str: str, provider: str, model: str, fallback, workers: int) -> str:
+    """Reviews shards in parallel (map), then merges their reviews into one reQap (reduce)."""
+    def review(index_shard):
+        index, shard = index_shard
+        label = f"shard {index}/{len(shards)}: " + ", ".join(f"`{d}/`" if d != '.' else "`./`" for d in shard['dirs'])
+        print(f"Reviewing {label} ({shard['files']} files, ~{shard['tokens']} tok)", flush=True)
+        head, tail = SHARD_PROMPT.split("{files}")
+        prompt = lib_prompt.Prompt(head.format(label=label)).add(shard['prompt']).text(tail)
+        try: text = lib_ai.run_ai_completion(provider, model, prompt, fallback=fallback, tools=False)
+        except Exception as e: text = f"Assessment: Partial\nReview of this shard failed: {e}"
+        return label, text
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        partials = list(pool.map(review, enumerate(shards, 1)))
+
+    worst = worst_assessment([text for _, text in partials])
+    reviews = "".join(f"\n### {label}\n{text}\n" for label, text in partials)
+    print(f"Merging {len(partials)} shard reviews (worst shard: {worst})", flush=True)
+    try:
+        merged = lib_ai.run_ai_completion(provider, model, MERGE_PROMPT.format(count=len(partials), context=context_str, reviews=reviews), fallback=fallback, tools=False)
+    except Exception as e:
+        print(f"Merge failed ({e}), concatenating shard reviews", flush=True)
+        merged = f"## Summary\nReviewed in {len(partials)} shards; the merge step failed, shard reviews follow.\n{reviews}"
+    # Qrane's cheqpoint reads the assessment from the first line
+    first = merged.lstrip().split('\n', 1)[0]
+    if not ASSESSMENT_RE.search(first): merged = f"Assessment: {worst}\n\n{merged.lstrip()}"
+    return merged
+
 def main() -> None:
     if len(sys.argv) != 3: sys.exit(1)
 
@@ -23,48 +161,58 @@ def main() -> None:
         with open(summary_path, 'r', encoding='utf-8') as f: summary_content = f.read()
     except: summary_content = "Summary not found."
 
-    try:
-        with open('config.yaml', 'r') as f: config = yaml.safe_load(f) or {}
-    except: config = {}
+    config = lib_ai.load_config()
 
     agent_cfg = config.get('agents', {}).get('inspeqtor', {})
     ai_provider = agent_cfg.get('provider', 'openai')
     ai_model = agent_cfg.get('model', 'gpt-4o')
 
-    # Gather Code Context (Safe Limit)
-    context_str = f"## ConstruQtor's Report\n{summary_content}\n\n## Artifacts\n"
-    total_chars = 0
-    MAX_CHARS = 300000 # ~75k tokens, safe for GPT-4o
-
-    if qodeyard_path.is_dir():
-        for root, _, files in os.walk(qodeyard_path):
-            for name in files:
-                if total_chars > MAX_CHARS: break
-                fpath = os.path.join(root, name)
-                try:
-                    with open(fpath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        context_str += f"\n### File: `{name}`\n```\n{content}\n```\n"
-                        total_chars += len(content)
-                except: pass
+    # Refresh the qodeyard manifest (stat pass) and review changed files first
+    manifest = lib_manifest.QodeyardManifest(os.getcwd())
+    entries = manifest.refresh(cycle_num)
+    earlier = [c for c in manifest.cycles() if c < int(cycle_num)]
+    if earlier: changes = manifest.changes_since(earlier[-1], entries)
+    else: changes = {'added': set(entries), 'changed': set(), 'removed': set()}
+    touched = changes['added'] | changes['changed']
 
-    reviewer_prompt = f"""
-You are the 'inspeQtor'.
-**TASK:** Review the generated code.
-**OUTPUT:** Strict Markdown reQap.
-1. Assessment: Success/Partial/Failure
-2. Summary
-3. Suggestions
+    # Gather Code Context (Safe Limit)
+    context_str = f"## ConstruQtor's Report\n{summary_content}\n\n"
+    if earlier:
+        context_str += f"## Changes since cyQle {earlier[-1]}\n"
+        for label in ('added', 'changed', 'removed'):
+            paths = sorted(changes[label])
+            if paths: context_str += f"- {label.capitalize()} ({len(paths)}): " + ", ".join(f"`{p}`" for p in paths[:200]) + "\n"
+        context_str += "\n"
+    options = config.get('options', {})
+    try: shard_tokens = int(options.get('review_shard_tokens', 0) or 0)
+    except: shard_tokens = 0
+    try: workers = max(1, int(options.get('max_parallel_reviews', 4) or 1))
+    except: workers = 4
+
+    # Map-reduce review once the codebase no longer fits in one shard
+    shards = shard_files(qodeyard_path, entries, shard_tokens) if shard_tokens > 0 else []
+    if len(shards) > 1:
+        print(f"Sharded review: {len(shards)} shards of <= ~{shard_tokens} tok, {workers} parallel", flush=True)
+        lib_ai.use_session_pool()
+        try: content = review_sharded(shards, context_str, ai_provider, ai_model, agent_cfg.get('fallback'), workers)
+        except Exception as e: content = f"Assessment: Partial\nError: {e}"
+        os.makedirs(reqap_path.parent, exist_ok=True)
+        with open(reqap_path, 'w', encoding='utf-8') as f: f.write(content)
+        print(f"reQap written to {reqap_path}", flush=True)
+        return
 
-**Context:**
-{context_str[:MAX_CHARS]}
+    # The context is capped while it streams: files past MAX_CHARS are never read
+    MAX_CHARS = 300000 # ~75k tokens, safe for GPT-4o (single-prompt review)
+    context = lib_prompt.Prompt(context_str, max_chars=MAX_CHARS).text("## Artifacts\n")
+    for rel in sorted(entries, key=lambda p: (p not in touched, p)):
+        context.file(qodeyard_path / rel, header=file_header(rel), footer=FILE_FOOTER, errors='skip')
 
-**Begin Review:**
-"""
+    reviewer_prompt = lib_prompt.Prompt(f"{REVIEW_HEADER}\n**Context:**\n").add(context).text("\n\n**Begin Review:**\n")
 
     try:
         # [FIX] This will now use stdin via lib_ai, avoiding Argument list too long
-        content = lib_ai.run_ai_completion(ai_provider, ai_model, reviewer_prompt)
+        # The reQap is the response itself: no provider tools, so the call may also be hedged
+        content = lib_ai.run_ai_completion(ai_provider, ai_model, reviewer_prompt, fallback=agent_cfg.get('fallback'), tools=False)
 
         os.makedirs(reqap_path.parent, exist_ok=True)
         with open(reqap_path, 'w', encoding='utf-8') as f: f.write(content)
@@ -2,16 +2,27 @@
 # worqer/instruqtor.py
 import os
 import sys
-import yaml
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-try: import lib_ai
+try:
+    import lib_ai
+    from lib_context import estimate_tokens
 except ImportError as e:
     sys.stderr.write(f"CRITICAL: Could not import lib_ai.py: {e}\n")
     sys.exit(1)
 
+ATX_HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+# PDF/plain-text exports number their headings instead ("3.1.2 Advanced Sleep Obfuscation")
+NUMBERED_HEADING_RE = re.compile(r'^((?:\d+\.)*\d+)\.?\s+([A-Z].{0,78}?)\s*$')
+FENCE_LINE_RE = re.compile(r'^\s*(```|~~~)')
+TITLE_INDEX_RE = re.compile(r'^\d+[_\s-]*')
+OUTLINE_MAX_CHARS = 4000
+PREAMBLE_MAX_CHARS = 2000
+
 def clean_input_content(text: str) -> str:
     text = text.replace('\u200b', '').replace('\ufeff', '')
     text = text.replace('\xa0', ' ')
@@ -34,6 +45,218 @@ def parse_xml_briqs(content: str) -> list[dict]:
             results.append({'title': title, 'content': content_body})
     return results
 
+class BriqStreamParser:
+    """
+    Incremental form of parse_xml_briqs' strict pattern: feed() the plan as it
+    streams in and each <briq title="..."> is returned as soon as its closing
+    tag arrives. Scanning resumes after the last closed briq, so the whole
+    stream is parsed in linear time.
+    """
+    CLOSE = '</briq>'
+    CLOSE_RE = re.compile(re.escape(CLOSE), re.IGNORECASE)
+    PATTERN = re.compile(r'<briq\s+title=["\'](.*?)["\']\s*>(.*?)</briq>', re.DOTALL | re.IGNORECASE)
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+
+    def feed(self, text: str) -> list[dict]:
+        # Resume the close-tag search just before the new text (a tag may straddle chunks)
+        search_from = max(self.pos, len(self.buffer) - len(self.CLOSE))
+        self.buffer += text
+        found = []
+        while True:
+            close = self.CLOSE_RE.search(self.buffer, search_from)
+            if not close:
+                self.buffer, self.pos = self.buffer[self.pos:], 0 # Closed briqs are no longer needed
+                return found
+            end = close.end()
+            m = self.PATTERN.search(self.buffer, self.pos, end)
+            if m: found.append({'title': m.group(1).strip(), 'content': m.group(2).strip()})
+            self.pos = search_from = end
+
+def find_headings(lines: list[str]) -> list[tuple]:
+    """(line index, level, title) of markdown headings outside code fences, else of numbered headings."""
+    atx, numbered, fenced = [], [], False
+    for i, line in enumerate(lines):
+        if FENCE_LINE_RE.match(line):
+            fenced = not fenced
+            continue
+        if fenced: continue
+        m = ATX_HEADING_RE.match(line)
+        if m: atx.append((i, len(m.group(1)), m.group(2).strip()))
+        m = NUMBERED_HEADING_RE.match(line)
+        if m and not line.rstrip().endswith(('.', ',', ';', ':')):
+            numbered.append((i, m.group(1).count('.') + 1, f"{m.group(1)} {m.group(2).strip()}"))
+    return atx or numbered
+
+def split_sections(text: str, max_tokens: int) -> list[dict]:
+    """
+    Splits a tasq along its heading structure into sections of at most
+    ~max_tokens: the top heading level first, deeper levels only inside
+    sections that are still too large, then paragraphs (or lines). Adjacent
+    small sections are merged back up to the budget. Returns
+    [{'title', 'text'}] in document order.
+    """
+    lines = text.split('\n')
+    heads = find_headings(lines)
+
+    def pieces(lo: int, hi: int, title: str) -> list[tuple]:
+        body = "\n".join(lines[lo:hi])
+        if estimate_tokens(body) <= max_tokens or hi - lo <= 1: return [(title, body)]
+        inner = [h for h in heads if lo < h[0] < hi]
+        if inner:
+            level = min(h[1] for h in inner)
+            cuts = [h for h in inner if h[1] == level]
+            out = pieces(lo, cuts[0][0], title) if cuts[0][0] > lo else []
+            for j, (index, _, heading) in enumerate(cuts):
+                out += pieces(index, cuts[j + 1][0] if j + 1 < len(cuts) else hi, heading)
+            return out
+        # No headings left: pack paragraphs (or single lines) up to the budget
+        blank = [i for i in range(lo, hi) if not lines[i].strip()]
+        bounds = sorted({lo, *blank, hi}) if blank else list(range(lo, hi + 1))
+        out, start, size = [], lo, 0
+        for a, b in zip(bounds, bounds[1:]):
+            t = estimate_tokens("\n".join(lines[a:b]))
+            if size and size + t > max_tokens and a - lo > 1: # A lone heading line stays with its text
+                out.append((f"{title} (cont.)" if out else title, "\n".join(lines[start:a])))
+                start, size = a, 0
+            size += t
+        out.append((f"{title} (cont.)" if out else title, "\n".join(lines[start:hi])))
+        return out
+
+    sections = []
+    for title, body in pieces(0, len(lines), "Introduction"):
+        if not body.strip(): continue
+        tokens = estimate_tokens(body)
+        if sections and sections[-1]['tokens'] + tokens <= max_tokens:
+            last = sections[-1]
+            last['text'] += "\n" + body
+            last['tokens'] += tokens
+            last['titles'].append(title)
+        else:
+            sections.append({'titles': [title], 'text': body, 'tokens': tokens})
+    for section in sections:
+        titles = section.pop('titles')
+        section['title'] = titles[0] if len(titles) == 1 else f"{titles[0]} ... {titles[-1]}"
+    return sections
+
+def document_outline(text: str) -> str:
+    """Shared context of every section planner: the preamble and the heading outline."""
+    lines = text.split('\n')
+    heads = find_headings(lines)
+    preamble = "\n".join(lines[:heads[0][0]] if heads else lines[:20]).strip()[:PREAMBLE_MAX_CHARS]
+    outline = "\n".join(f"{'  ' * (level - 1)}- {title}" for _, level, title in heads)[:OUTLINE_MAX_CHARS]
+    return f"{preamble}\n\n**Document outline:**\n{outline}" if outline else preamble
+
+def title_key(title: str) -> str:
+    """Briq identity across sections: title without its plan index, case or separators."""
+    return " ".join(re.sub(r'[_\W]+', ' ', TITLE_INDEX_RE.sub('', title.strip())).lower().split())
+
+class PlanPublisher:
+    """
+    Publishes the briqs of concurrently planned sections in document order
+    with one global briqNNN numbering. The earliest unfinished section
+    streams straight to briq.d/; later sections are held back until every
+    section before them has finished. Briqs whose title repeats an already
+    published one (setup briqs planned by several sections) are dropped.
+    """
+    def __init__(self, output_dir: Path, cycle_num: str, count: int):
+        self.output_dir = output_dir
+        self.cycle_num = cycle_num
+        self.buffers = [[] for _ in range(count)]
+        self.finished = [False] * count
+        self.head = 0
+        self.seen = set()
+        self.written = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def _publish(self, item: dict):
+        key = title_key(item['title'])
+        if key in self.seen:
+            self.dropped += 1
+            return
+        self.seen.add(key)
+        self.written.append(write_briq(self.output_dir, self.cycle_num, len(self.written), item))
+
+    def add(self, section: int, item: dict):
+        with self._lock:
+            if section == self.head: self._publish(item)
+            else: self.buffers[section].append(item)
+
+    def finish(self, section: int):
+        with self._lock:
+            self.finished[section] = True
+            while self.head < len(self.finished) and self.finished[self.head]:
+                self.head += 1
+                if self.head < len(self.buffers):
+                    for item in self.buffers[self.head]: self._publish(item)
+                    self.buffers[self.head] = []
+
+def plan_chunked(sections: list[dict], outline: str, base_prompt: str, publisher: PlanPublisher,
+                 ai_provider: str, ai_model: str, fallback, workers: int) -> list:
+    """Plans every section concurrently; returns the sections whose planning call failed."""
+    failed = []
+    def plan(index: int):
+        section = sections[index]
+        scope = ("Include the SETUP FIRST briqs for the whole project." if index == 0 else
+                 "Do NOT create project setup briqs (structure, gitignore, requirements, configs, loggers): section 1 owns them.")
+        prompt = f"""{base_prompt}
+**CHUNKED PLANNING:** The specification is planned in {len(sections)} sections by parallel architects.
+You own ONLY section {index + 1}/{len(sections)} ("{section['title']}"). Plan briqs for this section alone,
+using the shared context to stay consistent with file names implied elsewhere. {scope}
+
+**SHARED CONTEXT (whole document):**
+{outline}
+
+**INPUT DOCUMENT (SECTION {index + 1}/{len(sections)}):**
+{section['text']}
+
+**BEGIN ATOMIC BREAKDOWN:**
+"""
+        print(f"  - Planning section {index + 1}/{len(sections)}: {section['title']} (~{section['tokens']} tok)", flush=True)
+        parser = BriqStreamParser()
+        streamed = []
+        def on_text(text: str):
+            for item in parser.feed(text):
+                streamed.append(item)
+                publisher.add(index, item)
+        try:
+            result = lib_ai.run_ai_completion(ai_provider, ai_model, prompt, on_text=on_text, fallback=fallback, tools=False)
+            if not streamed:
+                items = parse_xml_briqs(result) or [{'title': f"{section['title']} Plan Fallback", 'content': result}]
+                for item in items: publisher.add(index, item)
+        except Exception as e:
+            print(f"[WARN] Section {index + 1} planning failed: {e}", flush=True)
+            failed.append(index)
+        finally:
+            publisher.finish(index)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool: list(pool.map(plan, range(len(sections))))
+    return failed
+
+def write_briq(output_dir: Path, cycle_num: str, index: int, item: dict) -> str:
+    step_slug = clean_filename_slug(item['title'])
+    filename = f"cyqle{cycle_num}_tasq1_briq{index:03d}_{step_slug}.md"
+    # Publish atomically: a pipelined construQtor may pick the file up immediately
+    tmp_path = output_dir / f".tmp_{filename}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {item['title']}\n\n**ARCHITECT'S INSTRUCTION:**\n{item['content']}")
+    os.replace(tmp_path, output_dir / filename)
+    print(f"  - Wrote [Plan] {filename}", flush=True)
+    return filename
+
+def retract_plan(output_dir: Path, cycle_num: str) -> int:
+    """Removes every briq published for the cycle, so a failed or re-run plan never leaves a partial one behind."""
+    removed = 0
+    for path in output_dir.glob(f"cyqle{cycle_num}_*.md"):
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError: pass
+    return removed
+
 def clean_filename_slug(text: str) -> str:
     clean = re.sub(r'[^a-zA-Z0-9 ]', '', text)
     slug = "_".join(clean.split()[:8]).lower()
@@ -65,9 +288,7 @@ def main() -> None:
 
     os.makedirs(output_dir, exist_ok=True)
 
-    try:
-        with open('config.yaml', 'r', encoding='utf-8') as f: config = yaml.safe_load(f) or {}
-    except: config = {}
+    config = lib_ai.load_config()
 
     agent_cfg = config.get('agents', {}).get('instruqtor', {})
     ai_provider = agent_cfg.get('provider', 'openai')
@@ -79,7 +300,7 @@ def main() -> None:
 
     sens_prompt = get_sensitivity_prompt(sensitivity)
 
-    planner_prompt = f"""
+    base_prompt = f"""
 You are the **Principal Software Architect** operating in **ATOMIC BREAKDOWN MODE**.
 **OPERATIONAL MODE:** {mode.upper()}
 
@@ -99,16 +320,55 @@ You are the **Principal Software Architect** operating in **ATOMIC BREAKDOWN MOD
 - Create `requirements.txt`
 </briq>
 ...
-
+"""
+    planner_prompt = f"""{base_prompt}
 **INPUT DOCUMENT:**
 {task_content}
 
 **BEGIN ATOMIC BREAKDOWN:**
 """
 
+    # Briqs are published one by one as their closing tags stream in; the
+    # done marker tells a pipelined construQtor that the plan is complete.
+    # A failed plan is retracted, and a re-plan (--resume) starts from an empty cycle
+    done_marker = output_dir / f"cyqle{cycle_num}_plan.done"
+    try: done_marker.unlink()
+    except FileNotFoundError: pass
+    stale = retract_plan(output_dir, cycle_num)
+    if stale: print(f"--- Architect Removed {stale} Briqs of an Earlier Plan ---", flush=True)
+
+    # Large tasqs are planned section by section, concurrently (options.plan_chunk_tokens)
+    options = config.get('options', {})
+    try: chunk_tokens = int(options.get('plan_chunk_tokens', 0) or 0)
+    except: chunk_tokens = 0
+    sections = split_sections(task_content, chunk_tokens) if chunk_tokens > 0 and estimate_tokens(task_content) > chunk_tokens else []
+    if len(sections) > 1:
+        try: workers = max(1, int(options.get('max_parallel_plans', 4) or 1))
+        except: workers = 4
+        print(f"--- Architect Planning {len(sections)} Sections ({workers} parallel) ---", flush=True)
+        lib_ai.use_session_pool()
+        publisher = PlanPublisher(output_dir, cycle_num, len(sections))
+        failed = plan_chunked(sections, document_outline(task_content), base_prompt, publisher,
+                              ai_provider, ai_model, agent_cfg.get('fallback'), workers)
+        if failed:
+            retract_plan(output_dir, cycle_num)
+            sys.stderr.write(f"Instruqtor Failure: {len(failed)} of {len(sections)} sections could not be planned\n")
+            sys.exit(1)
+        with open(done_marker, 'w', encoding='utf-8') as f: f.write(f"{len(publisher.written)}\n")
+        print(f"--- Architect Generated {len(publisher.written)} Build Phases from {len(sections)} Sections "
+              f"({publisher.dropped} duplicates dropped, Sens:{sensitivity}) ---", flush=True)
+        return
+
+    stream_parser = BriqStreamParser()
+    written = []
+    def on_text(text: str):
+        for item in stream_parser.feed(text):
+            written.append(write_briq(output_dir, cycle_num, len(written), item))
+
     master_plan = ""
     try:
-        master_plan = lib_ai.run_ai_completion(ai_provider, ai_model, planner_prompt)
+        # The plan is the response itself: no provider tools, so the call may also be hedged
+        master_plan = lib_ai.run_ai_completion(ai_provider, ai_model, planner_prompt, on_text=on_text, fallback=agent_cfg.get('fallback'), tools=False)
     except Exception as e:
         # [FIX] If the AI failed but we captured output (partial stream), check if it's usable.
         print(f"[WARN] AI Stream Signal: {e}", flush=True)
@@ -116,26 +376,20 @@ You are the **Principal Software Architect** operating in **ATOMIC BREAKDOWN MOD
         # But if lib_ai raised, we might rely on what it printed to stderr/logs.
         # For Instruqtor, we can't easily recover the string if exception raised unless lib_ai returns partial.
         # However, with the new lib_ai, this exception shouldn't happen for just a closed pipe.
+        retract_plan(output_dir, cycle_num)
         sys.stderr.write(f"Instruqtor Failure: {e}\n")
         sys.exit(1)
 
-    briqs = parse_xml_briqs(master_plan)
-
-    if not briqs:
-        print("[WARN] Architect failed to produce valid XML. Generating raw output.", flush=True)
-        briqs = [{'title': 'Master_Plan_Fallback', 'content': master_plan}]
-
-    print(f"--- Architect Generating {len(briqs)} Build Phases (Sens:{sensitivity}) ---", flush=True)
-
-    for i, item in enumerate(briqs):
-        step_slug = clean_filename_slug(item['title'])
-        filename = f"cyqle{cycle_num}_tasq1_briq{i:03d}_{step_slug}.md"
-        file_path = output_dir / filename
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"# {item['title']}\n\n**ARCHITECT'S INSTRUCTION:**\n{item['content']}")
+    if not written:
+        # Nothing matched the strict form while streaming: loose <briq> tags or no XML at all
+        briqs = parse_xml_briqs(master_plan)
+        if not briqs:
+            print("[WARN] Architect failed to produce valid XML. Generating raw output.", flush=True)
+            briqs = [{'title': 'Master_Plan_Fallback', 'content': master_plan}]
+        for item in briqs: written.append(write_briq(output_dir, cycle_num, len(written), item))
 
-        print(f"  - Wrote [Plan] {filename}", flush=True)
+    with open(done_marker, 'w', encoding='utf-8') as f: f.write(f"{len(written)}\n")
+    print(f"--- Architect Generated {len(written)} Build Phases (Sens:{sensitivity}) ---", flush=True)
 
 if __name__ == '__main__':
     main()
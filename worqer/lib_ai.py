@@ -1,60 +1,413 @@
 #!/usr/bin/env python3
 # worqer/lib_ai.py
+import codecs
+import contextlib
+import contextvars
+import io
+import queue
 import subprocess
 import sys
 import os
 import threading
 import time
+import yaml
 
-def run_ai_completion(provider: str, model: str, prompt: str, context_files: list[str] = None) -> str:
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import lib_cache
+import lib_hedge
+import lib_http
+import lib_metrics
+import lib_prompt
+import lib_ratelimit
+import lib_session
+from lib_context import estimate_tokens
+
+STREAM_CHUNK_SIZE = 64 * 1024
+MIRROR_INTERVAL = 0.25 # Seconds a partial line may wait before it is mirrored to stderr
+
+_config_cache = {}
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_http_client = None
+_http_client_lock = threading.Lock()
+_session_pool = None
+_session_pool_lock = threading.Lock()
+_session_pool_wanted = False
+_limiters = {}
+_limiters_lock = threading.Lock()
+_latency_history = None
+_latency_history_lock = threading.Lock()
+
+# Briq the current call works for; stderr lines are tagged with it so Qrane's log store can attribute them
+_current_briq = contextvars.ContextVar('briq', default=None)
+BRIQ_TAG = "[briq {}] "
+
+@contextlib.contextmanager
+def briq_scope(name: str):
+    token = _current_briq.set(name)
+    try: yield
+    finally: _current_briq.reset(token)
+
+def current_briq():
+    return _current_briq.get()
+
+def briq_tag() -> str:
+    name = _current_briq.get()
+    return BRIQ_TAG.format(name) if name else ""
+
+def _tag_lines(text: str, tag: str) -> str:
+    """Prefixes every line of text with tag, ending it with a newline (a cut partial line becomes a fragment)."""
+    if not tag: return text
+    body = text[:-1] if text.endswith('\n') else text
+    return "".join(f"{tag}{line}\n" for line in body.split('\n'))
+
+def _stderr(text: str):
+    sys.stderr.write(_tag_lines(text, briq_tag()))
+    sys.stderr.flush()
+
+def load_config(path: str = 'config.yaml') -> dict:
+    """Parses the worqspace config once per process (re-read if the file changes)."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        cached = _config_cache.get(path)
+        if cached and cached[0] == mtime: return cached[1]
+        with open(path, 'r', encoding='utf-8') as f: config = yaml.safe_load(f) or {}
+        _config_cache[path] = (mtime, config)
+        return config
+    except: return {}
+
+def get_response_cache():
+    """Returns the shared qache.d response cache, or None when caching is off."""
+    global _response_cache
+    if os.environ.get('QONQ_NO_CACHE') == '1': return None
+    options = load_config().get('options', {})
+    if not options.get('cache', False): return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            root = os.environ.get('QONQ_CACHE_DIR') or os.path.join(os.getcwd(), 'qache.d')
+            try: max_mb = int(options.get('cache_max_mb', 256))
+            except: max_mb = 256
+            _response_cache = lib_cache.ResponseCache(root, max_bytes=max_mb * 1024 * 1024)
+    return _response_cache
+
+def run_ai_completion(provider: str, model: str, prompt, context_files: list[str] = None, cache: bool = True, on_text=None, fallback: dict = None, tools: bool = True) -> str:
+    """
+    Returns the provider's response; on_text(chunk) additionally receives it as it streams in.
+    prompt is a string or a lib_prompt.Prompt; it is never joined into one string on the way to the provider.
+    fallback ({provider, model}, the agent's config) is raced against slow primary calls, and takes over failed ones.
+    tools=False keeps CLI providers from acting on their own (no gemini yolo mode): the response is the only output.
+    Only such calls are hedged; a tool-using call writes files itself, so its fallback only runs after the primary exited.
+    """
     if context_files is None: context_files = []
 
-    # Build the prompt
-    full_prompt = _build_prompt(prompt, context_files)
+    # Build the prompt. Its files are copied once, so the cache key, the metrics and every send
+    # (retries, hedged calls) see the same bytes while parallel briqs rewrite the qodeyard
+    with lib_prompt.Snapshot(build_prompt(prompt, context_files)) as full_prompt:
+        started = time.monotonic()
+        stats = {'ttfb_s': None}
+        qache = get_response_cache() if cache else None
+        # The cache key pass measures the prompt too: one pass before the send, not two
+        meter = lib_prompt.Meter() if lib_metrics.enabled() else None
+        key = qache.key(provider, model, full_prompt, on_piece=meter.add if meter else None) if qache else None
+        result = qache.get(key) if qache else None
+        cache_hit = result is not None
+        if cache_hit:
+            _stderr(f"[Qache] HIT {key[:12]} ({len(result)} chars, {qache.hits} hits / {qache.misses} misses)\n")
+            if on_text: on_text(result)
+        else:
+            if fallback and fallback.get('provider') and fallback.get('model'):
+                # No delay (hedging off, too few samples yet, or a tool-using call that two racing agents
+                # would both write files for): the fallback only takes over a failed primary, sequentially
+                hedge_pct, min_samples = _hedge_policy(fallback) if not tools else (0, 0)
+                delay = get_latency_history().threshold(provider, model, hedge_pct, min_samples) if hedge_pct else None
+                result = _call_hedged(provider, model, fallback, full_prompt, stats, on_text, delay, tools)
+            else:
+                result = _call_with_retries(provider, model, full_prompt, stats, on_text, tools=tools)
+                get_latency_history().add(provider, model, time.monotonic() - started - stats.get('queued_s', 0.0))
+            if qache: qache.put(key, result)
+
+        prompt_bytes, prompt_tokens = (meter.total if qache else full_prompt.measure()) if meter else (0, 0)
+        lib_metrics.record(
+            'provider_call', provider=provider, model=model, cache_hit=cache_hit,
+            wall_s=round(time.monotonic() - started, 4), ttfb_s=stats['ttfb_s'],
+            attempts=stats.get('attempts', 0), throttled=stats.get('throttled', 0), queued_s=round(stats.get('queued_s', 0.0), 4),
+            hedged=stats.get('hedged', False), winner=stats.get('winner', 'primary'),
+            prompt_bytes=prompt_bytes, response_bytes=len(result.encode('utf-8', errors='replace')),
+            prompt_tokens=prompt_tokens, response_tokens=estimate_tokens(result))
+    return result
+
+def get_limiter(provider: str) -> lib_ratelimit.ProviderLimiter:
+    """The qage-wide limiter for a provider (options.rate_limits.<provider>)."""
+    key = provider.lower()
+    with _limiters_lock:
+        if key not in _limiters:
+            limits = (load_config().get('options', {}).get('rate_limits') or {}).get(key) or {}
+            state_path = os.path.join(os.getcwd(), 'struqture', lib_ratelimit.STATE_NAME)
+            _limiters[key] = lib_ratelimit.ProviderLimiter(
+                state_path, key, requests_per_min=limits.get('requests_per_min', 0), max_in_flight=limits.get('max_in_flight', 16))
+    return _limiters[key]
+
+def get_latency_history() -> lib_hedge.LatencyHistory:
+    global _latency_history
+    with _latency_history_lock:
+        if _latency_history is None: _latency_history = lib_hedge.LatencyHistory(lib_metrics.ledger_path())
+    return _latency_history
+
+def _hedge_policy(fallback: dict) -> tuple:
+    """(percentile, min samples) from options.hedge_percentile / hedge_min_samples; (0, 0) = no hedging."""
+    if not fallback or not fallback.get('provider') or not fallback.get('model'): return 0, 0
+    options = load_config().get('options', {})
+    try: return float(options.get('hedge_percentile', 95) or 0), int(options.get('hedge_min_samples', 8))
+    except (TypeError, ValueError): return 0, 0
+
+def _call_hedged(provider: str, model: str, fallback: dict, full_prompt: str, stats: dict, on_text, delay: float, tools: bool = True) -> str:
+    """
+    Starts the primary call; if it has not finished after `delay` seconds (and
+    has streamed nothing yet), races the fallback against it. The first
+    success wins and the other call is cancelled. Once hedged, streamed text
+    is buffered per call and only the winner's is passed on to on_text.
+    A primary that fails (after its retries) without having streamed anything
+    fails over to the fallback, also with delay None (no hedging).
+    """
+    results = queue.Queue()
+    lock = threading.Lock()
+    hedged, streamed = [], []
+    contenders = {'primary': (provider, model), 'fallback': (fallback['provider'], fallback['model'])}
+    tokens = {role: lib_hedge.CancelToken() for role in contenders}
+    buffers = {role: [] for role in contenders}
+
+    def forward(role, text):
+        with lock:
+            if not hedged:
+                streamed.append(True)
+                on_text(text)
+                return
+        buffers[role].append(text)
+
+    def run(role):
+        p, m = contenders[role]
+        call_stats = {'ttfb_s': None}
+        started = time.monotonic()
+        try:
+            text = _call_with_retries(p, m, full_prompt, call_stats, (lambda t: forward(role, t)) if on_text else None, tokens[role], tools)
+            get_latency_history().add(p, m, time.monotonic() - started - call_stats.get('queued_s', 0.0))
+            results.put((role, text, None, call_stats))
+        except lib_hedge.CallCancelled:
+            # Censored sample: the call took at least this long
+            get_latency_history().add(p, m, time.monotonic() - started)
+            results.put((role, None, None, call_stats))
+        except Exception as e:
+            results.put((role, None, e, call_stats))
+
+    def start(role):
+        threading.Thread(target=contextvars.copy_context().run, args=(run, role), daemon=True).start()
 
+    start('primary')
+    try: outcome = results.get(timeout=delay)
+    except queue.Empty:
+        outcome = None
+        with lock:
+            if not (on_text and streamed): hedged.append(True)
+        if hedged:
+            _stderr(f"[Hedge] {provider}/{model} slower than {delay:.1f}s, racing {fallback['provider']}/{fallback['model']}\n")
+            start('fallback')
+    running = 2 if hedged else 1
+    errors = {}
+    while True:
+        if outcome is None: outcome = results.get()
+        role, text, error, call_stats = outcome
+        running -= 1
+        if text is not None:
+            for other, token in tokens.items():
+                if other != role: token.cancel()
+            stats.update({k: v for k, v in call_stats.items() if k != 'queued_s'})
+            stats['queued_s'] = stats.get('queued_s', 0.0) + call_stats.get('queued_s', 0.0)
+            stats.update(hedged=bool(hedged), winner=role)
+            if hedged:
+                _stderr(f"[Hedge] {role} won\n")
+                if on_text and buffers[role]: on_text("".join(buffers[role]))
+            return text
+        errors[role] = error
+        if role == 'primary' and error is not None and not hedged and not (on_text and streamed):
+            # Not raced yet: the fallback takes over (and streams directly, the primary is gone)
+            _stderr(f"[Hedge] {provider}/{model} failed ({error}), failing over to {fallback['provider']}/{fallback['model']}\n")
+            start('fallback')
+            running += 1
+        if running == 0: raise errors.get('primary') or errors.get('fallback') or RuntimeError("Hedged call failed")
+        outcome = None
+
+def _call_with_retries(provider: str, model: str, full_prompt: str, stats: dict, on_text=None, cancel=None, tools: bool = True) -> str:
+    """
+    Calls the provider inside a limiter slot. Throttled and transient failures
+    are retried (options.provider_retries, default 4) after a jittered
+    exponential backoff, unless part of the response was already streamed.
+    """
+    try: retries = int(load_config().get('options', {}).get('provider_retries', 4))
+    except: retries = 4
+    limiter = get_limiter(provider)
+    attempt = 0
+    while True:
+        streamed = []
+        def tracked(text):
+            streamed.append(True)
+            on_text(text)
+        stats['ttfb_s'] = None
+        stats['attempts'] = attempt + 1
+        try:
+            with limiter.slot() as call:
+                stats['queued_s'] = stats.get('queued_s', 0.0) + call['waited_s']
+                try: return _call_provider(provider, model, full_prompt, stats, tracked if on_text else None, cancel, tools)
+                except lib_hedge.CallCancelled:
+                    call['outcome'] = 'cancelled'
+                    raise
+        except lib_ratelimit.ProviderError as e:
+            if e.throttled: stats['throttled'] = stats.get('throttled', 0) + 1
+            if not e.transient or attempt >= retries or streamed: raise
+            delay = lib_ratelimit.backoff_delay(attempt)
+            kind = "throttled" if e.throttled else "failed"
+            _stderr(f"[RateLimit] {provider} {kind} ({e}), retry {attempt + 1}/{retries} in {delay:.1f}s\n")
+            if cancel: cancel.sleep(delay)
+            else: time.sleep(delay)
+            attempt += 1
+
+def _call_provider(provider: str, model: str, full_prompt: str, stats: dict = None, on_text=None, cancel=None, tools: bool = True) -> str:
     if provider.lower() == 'openai':
         # Pass input via stdin to avoid Argument list too long
         cmd = ['sgpt', '--no-cache', '--no-interaction', '--model', model]
-        return _run_streaming_process(cmd, input_text=full_prompt)
+        return _run_streaming_process(cmd, input_text=full_prompt, stats=stats, on_text=on_text, cancel=cancel)
     elif provider.lower() == 'gemini':
-        cmd = ['gemini', 'prompt', '--model', model, '--approval-mode', 'yolo']
-        return _run_streaming_process(cmd, input_text=full_prompt)
+        cmd = ['gemini', 'prompt', '--model', model] + (['--approval-mode', 'yolo'] if tools else [])
+        return _run_streaming_process(cmd, input_text=full_prompt, stats=stats, on_text=on_text, cancel=cancel)
+    elif provider.lower() == 'openai-http':
+        return _run_http_completion(model, full_prompt, stats=stats, on_text=on_text, cancel=cancel)
     else:
         raise ValueError(f"Unknown AI Provider: {provider}")
 
-def _build_prompt(base_prompt, context_files):
-    full = base_prompt
+def build_prompt(base_prompt, context_files) -> lib_prompt.Prompt:
+    """The prompt followed by its context files, by reference: files are read (mmap) only while it streams."""
+    full = base_prompt if isinstance(base_prompt, lib_prompt.Prompt) else lib_prompt.Prompt(base_prompt)
     if context_files:
-        full += "\n\n--- EXISTING CODEBASE CONTEXT ---\n"
+        full = lib_prompt.Prompt().add(full).text("\n\n--- EXISTING CODEBASE CONTEXT ---\n")
         for fpath in context_files:
-            if os.path.exists(fpath) and not os.path.isdir(fpath):
-                try:
-                    with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                        full += f"\nFile: {fpath}\n```\n{f.read()}\n```\n"
-                except: pass
+            full.file(fpath, header=f"\nFile: {fpath}\n```\n", footer="\n```\n", errors='ignore')
     return full
 
-def _run_streaming_process(cmd, input_text=None) -> str:
+class StderrMirror:
+    """
+    Mirrors streamed text to stderr per complete line. A partial line is
+    flushed by a timer after MIRROR_INTERVAL, so a stream that stalls
+    mid-line (the reader blocks until the next chunk) still shows it.
+    """
+    def __init__(self):
+        self.pending = ""
+        self.tag = briq_tag()
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def _emit(self, text: str):
+        sys.stderr.write(_tag_lines(text, self.tag))
+        sys.stderr.flush()
+
+    def _flush_partial(self):
+        with self.lock:
+            self.timer = None
+            if self.pending: self._emit(self.pending)
+            self.pending = ""
+
+    def write(self, text: str):
+        with self.lock:
+            self.pending += text
+            cut = self.pending.rfind('\n') + 1
+            if cut:
+                self._emit(self.pending[:cut])
+                self.pending = self.pending[cut:]
+            if self.pending and self.timer is None:
+                self.timer = threading.Timer(MIRROR_INTERVAL, self._flush_partial)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def close(self):
+        with self.lock:
+            if self.timer: self.timer.cancel()
+            self.timer = None
+            if self.pending: self._emit(self.pending)
+            self.pending = ""
+
+def get_http_client() -> lib_http.OpenAIHttpClient:
+    """Process-wide openai-http client; its connection pool is shared by all briqs."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None: _http_client = lib_http.OpenAIHttpClient()
+    return _http_client
+
+def _run_http_completion(model: str, full_prompt: str, stats: dict = None, on_text=None, cancel=None) -> str:
+    mirror = StderrMirror()
+    def on_delta(text: str):
+        # A cancelled stream stops at its next delta (a call still waiting for headers runs out in the background)
+        if cancel and cancel.cancelled: raise lib_hedge.CallCancelled()
+        mirror.write(text)
+        if on_text: on_text(text)
+    try:
+        text, timing = get_http_client().complete(model, full_prompt, on_text=on_delta)
+    except lib_hedge.CallCancelled:
+        raise
+    except Exception as e:
+        raise lib_ratelimit.ProviderError(f"HTTP provider request failed: {e}")
+    finally:
+        mirror.close()
+    _stderr(
+        f"\n[openai-http] connection={timing['connection']} connect={timing['connect_s']*1000:.0f}ms "
+        f"ttfb={timing['ttfb_s']*1000:.0f}ms generation={timing['generation_s']*1000:.0f}ms\n")
+    if stats is not None: stats['ttfb_s'] = round(timing['connect_s'] + timing['ttfb_s'], 4)
+    return text.strip()
+
+def _spawn_process(cmd, with_stdin: bool = True):
+    return subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if with_stdin else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+def use_session_pool():
+    """
+    Opts this worQer into the warm provider pool (options.provider_pool_size).
+    Only for agents expecting several calls: each warm process serves one call,
+    and the ones left over are killed unused when the worQer exits.
+    """
+    global _session_pool_wanted
+    _session_pool_wanted = True
+
+def get_session_pool():
+    """Returns the warm provider process pool, or None unless use_session_pool() was called and options.provider_pool_size > 0."""
+    global _session_pool
+    if not _session_pool_wanted: return None
+    try: size = int(load_config().get('options', {}).get('provider_pool_size', 0) or 0)
+    except: size = 0
+    if size <= 0: return None
+    with _session_pool_lock:
+        if _session_pool is None: _session_pool = lib_session.ProviderSessionPool(_spawn_process, size=size)
+    return _session_pool
+
+def _run_streaming_process(cmd, input_text=None, stats: dict = None, on_text=None, cancel=None) -> str:
     """
     Robust execution: Streams stdout to stderr (visual), collects it for return.
     Avoids communicate() to prevent 'I/O operation on closed file' race conditions.
+    Output is read in raw chunks and decoded incrementally before being mirrored.
+    The time to the first stdout chunk is stored in stats['ttfb_s'].
     """
+    started = time.monotonic()
     try:
-        proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE if input_text else None,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
+        # Warm sessions already sit on stdin, so only prompt-carrying calls can use them
+        pool = get_session_pool() if input_text else None
+        proc = pool.take(cmd) if pool else _spawn_process(cmd, with_stdin=bool(input_text))
+        if cancel: cancel.on_cancel(proc.kill)
 
         # 1. Handle Stdin in a thread to prevent deadlocks
         def writer():
             try:
                 if input_text:
-                    proc.stdin.write(input_text)
+                    for chunk in lib_prompt.chunks(input_text): proc.stdin.write(chunk)
                     proc.stdin.flush()
             except (BrokenPipeError, OSError, ValueError):
                 # Process closed pipe early. This is expected behavior for some errors.
@@ -67,35 +420,50 @@ def _run_streaming_process(cmd, input_text=None) -> str:
             t = threading.Thread(target=writer)
             t.start()
 
-        captured_stdout = []
+        # Drain stderr concurrently so a chatty provider can't fill the pipe and stall stdout
+        stderr_chunks = []
+        def stderr_reader():
+            try: stderr_chunks.append(proc.stderr.read())
+            except (OSError, ValueError): pass
+        err_t = threading.Thread(target=stderr_reader, daemon=True)
+        err_t.start()
 
-        # 2. Manual Streaming Loop (Reads Stdout)
+        # 2. Chunked Streaming Loop (Reads Stdout)
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(errors='replace'), translate=True)
+        captured_stdout = []
+        mirror = StderrMirror()
+        fd = proc.stdout.fileno()
         while True:
-            char = proc.stdout.read(1)
-            if not char and proc.poll() is not None:
-                break
-            if char:
-                captured_stdout.append(char)
+            chunk = os.read(fd, STREAM_CHUNK_SIZE)
+            if chunk and stats is not None and stats.get('ttfb_s') is None:
+                stats['ttfb_s'] = round(time.monotonic() - started, 4)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                captured_stdout.append(text)
                 # Mirror to stderr so Qrane logs show progress
-                sys.stderr.write(char)
-                sys.stderr.flush()
+                mirror.write(text)
+                if on_text: on_text(text)
+            if not chunk: break
+        mirror.close()
 
         # 3. Cleanup - Do NOT use communicate()
-        # Read any remaining stderr (usually errors)
-        stderr_output = proc.stderr.read()
-
         proc.wait() # Wait for exit code
+        err_t.join(timeout=2)
+        stderr_output = b"".join(stderr_chunks).decode('utf-8', errors='replace')
 
         if input_text:
             t.join(timeout=2) # Ensure writer thread finishes
 
+        if cancel and cancel.cancelled: raise lib_hedge.CallCancelled()
         if proc.returncode != 0:
             if stderr_output:
-                sys.stderr.write(f"\n[AI ERROR]: {stderr_output}\n")
-            raise RuntimeError(f"AI Provider failed with code {proc.returncode}")
+                _stderr(f"\n[AI ERROR]: {stderr_output}\n")
+            raise lib_ratelimit.ProviderError(f"AI Provider failed with code {proc.returncode}", stderr_output)
 
         return "".join(captured_stdout).strip()
 
+    except (lib_ratelimit.ProviderError, lib_hedge.CallCancelled):
+        raise
     except FileNotFoundError:
         raise RuntimeError(f"Missing binary for command: {cmd[0]}")
     except Exception as e:
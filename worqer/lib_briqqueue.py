@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# worqer/lib_briqqueue.py - Briq queue shared by local slots and remote briq worQers
+"""
+While it builds a cyQle the construQtor hosts a briq queue on a TCP or Unix
+socket. briqworqer.py processes, on this host or any host that can reach the
+socket, connect to it, pull jobs and send results back. Messages are JSON
+lines:
+
+  worQer -> queue  {"op": "hello", "worker": W, "slots": N, "token": T}
+  queue -> worQer  {"op": "welcome", "config": {...}, "lease_s": L}
+  worQer -> queue  {"op": "pull"}                              one per free slot
+  queue -> worQer  {"op": "job", "job": J, "briq": B, "cycle": N, "provider": P,
+                    "model": M, "fallback": F, "cache": C, "tools": T, "prompt": "..."}
+  worQer -> queue  {"op": "text", "job": J, "text": "..."}     streamed response
+  worQer -> queue  {"op": "beat", "jobs": [J, ...]}            every L/3 seconds
+  worQer -> queue  {"op": "result", "job": J, "ok": true, "text": "...", "metrics": [...]}
+  worQer -> queue  {"op": "result", "job": J, "ok": false, "error": "..."}
+  queue -> worQer  {"op": "bye"}                               the cyQle is built
+
+A job is leased to one worQer at a time; text and beats renew the lease. A
+lease that runs out (the worQer is cut off) or a dropped connection puts the
+job back at the head of the queue, up to max_attempts times. J names the
+lease, so a late result of a re-queued job is ignored. Local slots take jobs
+from the same queue, so the construQtor keeps building with no worQer
+connected.
+
+Only jobs with provider tools off (materialized briqs) go to worQers: a
+tool-using provider acts on the project itself, which only the local slots
+have. Tool jobs stay on the local slots.
+
+A worQer's responses are materialized into the qodeyard, so a TCP queue
+only starts with a token (checked on hello, sent in plaintext) and binds to
+loopback when no host is given. A Unix socket is protected by its file permissions.
+"""
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+import lib_ai
+import lib_metrics
+
+DEFAULT_LEASE = 30.0
+DEFAULT_ATTEMPTS = 3
+REAP_INTERVAL = 1.0
+
+def parse_address(address: str) -> tuple:
+    """('unix', path) or ('tcp', (host, port)) from 'unix:PATH', 'tcp:HOST:PORT' or 'HOST:PORT' (no host = loopback)."""
+    if address.startswith('unix:'): return 'unix', address[5:]
+    if address.startswith('tcp:'): address = address[4:]
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit(): raise ValueError(f"bad briq queue address: {address}")
+    return 'tcp', (host.strip('[]') or '127.0.0.1', int(port))
+
+def connect(address: str, timeout: float = 10.0) -> socket.socket:
+    kind, target = parse_address(address)
+    sock = socket.socket(socket.AF_UNIX if kind == 'unix' else socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try: sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    if kind == 'tcp': sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+def listen(address: str) -> socket.socket:
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        try: os.unlink(target) # Stale socket of an earlier cyQle
+        except FileNotFoundError: pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(target)
+    sock.listen(64)
+    return sock
+
+class Channel:
+    """JSON-line framing over a connected socket. send() may be called from any thread."""
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, msg: dict) -> bool:
+        data = (json.dumps(msg, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+        with self.lock:
+            if self.closed: return False
+            try:
+                self.sock.sendall(data)
+                return True
+            except OSError: pass
+        self.close()
+        return False
+
+    def recv(self):
+        """Next message, or None once the peer is gone (or sent garbage)."""
+        try: line = self.reader.readline()
+        except (OSError, ValueError): return None
+        if not line: return None
+        try: return json.loads(line)
+        except ValueError: return None
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        # shutdown() also wakes a thread blocked in recv()
+        try: self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        try: self.sock.close()
+        except OSError: pass
+
+class _Job:
+    def __init__(self, payload: dict, on_text=None):
+        self.payload = payload
+        self.on_text = on_text
+        self.attempts = 0
+        self.lease = None
+        self.deadline = None
+        self.worker = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class _Worker:
+    def __init__(self, name: str, channel: Channel):
+        self.name = name
+        self.channel = channel
+        self.credits = 0
+        self.leases = set()
+
+class BriqQueue:
+    def __init__(self, address: str, config: dict, local_slots: int = 1,
+                 lease_s: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_ATTEMPTS, token: str = None, log=None):
+        self.address = address
+        self.config = config
+        self.local_slots = local_slots
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.token = token or None
+        self.log = log or (lambda msg: None)
+        self.cond = threading.Condition()
+        self.pending = deque()
+        self.leases = {}
+        self.workers = []
+        self.closed = False
+        self.server = None
+        self._seq = 0
+
+    def start(self):
+        # Responses are materialized into the qodeyard: anyone who can connect can inject code, so TCP needs a secret
+        if parse_address(self.address)[0] == 'tcp' and not self.token:
+            raise ValueError("a TCP briq queue needs briq_queue.token (or QONQ_QUEUE_TOKEN)")
+        self.server = listen(self.address)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+        for _ in range(self.local_slots): threading.Thread(target=self._local_slot, daemon=True).start()
+
+    def complete(self, provider: str, model: str, prompt: str, context_files: list[str] = None, cache: bool = True, fallback: dict = None, tools: bool = True) -> str:
+        """
+        Drop-in for lib_ai.run_ai_completion: runs on whichever local slot or
+        worQer takes the job first (local slots only, with tools on).
+        """
+        if tools and not self.local_slots: raise RuntimeError("a briq with provider tools needs a local slot")
+        payload = {'briq': lib_ai.current_briq(), 'cycle': int(os.environ.get('CYCLE_NUM', '1')),
+                   'provider': provider, 'model': model, 'fallback': fallback, 'cache': cache, 'tools': tools,
+                   'prompt': str(lib_ai.build_prompt(prompt, context_files or []))} # Remote worQers can't read local files: inlined
+        # Remote text is mirrored to this agent's stderr, tagged with the briq like a local call's
+        mirror = lib_ai.StderrMirror()
+        job = _Job(payload, mirror.write)
+        with self.cond:
+            if self.closed: raise RuntimeError("briq queue closed")
+            self.pending.append(job)
+            self.cond.notify()
+        self._dispatch()
+        job.done.wait()
+        mirror.close()
+        if job.error: raise RuntimeError(job.error)
+        if job.worker == 'local': return job.result['text']
+
+        for rec in job.result.get('metrics') or []:
+            lib_metrics.record(rec.pop('event', 'provider_call'), worker=job.worker, **rec)
+        return job.result.get('text', '')
+
+    def close(self):
+        """Ends the cyQle: fails what is still queued, says bye to every worQer and stops listening."""
+        with self.cond:
+            self.closed = True
+            for job in self.pending:
+                job.error = "briq queue closed"
+                job.done.set()
+            self.pending.clear()
+            workers = list(self.workers)
+            self.cond.notify_all()
+        for worker in workers:
+            worker.channel.send({'op': 'bye'})
+            worker.channel.close()
+        if self.server:
+            try: self.server.close()
+            except OSError: pass
+            kind, target = parse_address(self.address)
+            if kind == 'unix':
+                try: os.unlink(target)
+                except OSError: pass
+
+    def _accept_loop(self):
+        while True:
+            try: sock, _ = self.server.accept()
+            except OSError: return # Closed
+            threading.Thread(target=self._serve, args=(Channel(sock),), daemon=True).start()
+
+    def _serve(self, channel: Channel):
+        hello = channel.recv()
+        if not hello or hello.get('op') != 'hello' or (self.token and not hmac.compare_digest(str(hello.get('token') or ''), self.token)):
+            channel.send({'op': 'error', 'error': 'bad hello or token'})
+            channel.close()
+            return
+        worker = _Worker(str(hello.get('worker') or 'worqer'), channel)
+        with self.cond:
+            if self.closed:
+                channel.send({'op': 'bye'})
+                channel.close()
+                return
+            self.workers.append(worker)
+        channel.send({'op': 'welcome', 'config': self.config, 'lease_s': self.lease_s})
+        self.log(f"     [BriqQueue] {worker.name} connected ({hello.get('slots', 1)} slots)")
+        try:
+            while True:
+                msg = channel.recv()
+                if msg is None: break
+                op = msg.get('op')
+                if op == 'pull':
+                    with self.cond: worker.credits += 1
+                    self._dispatch()
+                elif op == 'text':
+                    job = self._renew(worker, [msg.get('job')])
+                    if job and job.on_text and msg.get('text'): job.on_text(msg['text'])
+                elif op == 'beat':
+                    self._renew(worker, msg.get('jobs') or [])
+                elif op == 'result':
+                    self._finish(worker, msg)
+        finally:
+            channel.close()
+            self._drop(worker)
+
+    def _dispatch(self):
+        """Leases queued tool-free jobs to worQers with free slots (sent outside the lock: prompts can be large)."""
+        sends = []
+        with self.cond:
+            for worker in self.workers:
+                while worker.credits and not worker.channel.closed:
+                    job = next((j for j in self.pending if not j.payload['tools']), None)
+                    if job is None: break
+                    self.pending.remove(job)
+                    job.attempts += 1
+                    self._seq += 1
+                    job.lease = f"{self._seq}"
+                    job.worker = worker.name
+                    job.deadline = time.monotonic() + self.lease_s
+                    worker.credits -= 1
+                    worker.leases.add(job.lease)
+                    self.leases[job.lease] = job
+                    sends.append((worker, dict(job.payload, op='job', job=job.lease)))
+        for worker, msg in sends:
+            worker.channel.send(msg) # A failed send closes the channel; _serve then re-queues the job
+
+    def _renew(self, worker: _Worker, leases: list):
+        job = None
+        with self.cond:
+            for lease in leases:
+                if lease in worker.leases:
+                    job = self.leases[lease]
+                    job.deadline = time.monotonic() + self.lease_s
+        return job
+
+    def _finish(self, worker: _Worker, msg: dict):
+        with self.cond:
+            lease = msg.get('job')
+            if lease not in worker.leases: return # Re-queued in the meantime
+            worker.leases.discard(lease)
+            job = self.leases.pop(lease)
+        if msg.get('ok'): job.result = msg
+        else: job.error = f"{worker.name}: {msg.get('error') or 'failed'}"
+        job.done.set()
+
+    def _drop(self, worker: _Worker):
+        with self.cond:
+            if worker in self.workers: self.workers.remove(worker)
+            lost = [self.leases.pop(lease) for lease in worker.leases if lease in self.leases]
+            worker.leases.clear()
+            for job in lost: self._requeue(job, f"{worker.name} lost")
+        if not self.closed:
+            self.log(f"     [BriqQueue] {worker.name} disconnected" + (f", re-queued {len(lost)} briqs" if lost else ""))
+        self._dispatch()
+
+    def _requeue(self, job: _Job, reason: str):
+        # Called with the lock held
+        if job.attempts >= self.max_attempts or self.closed:
+            job.error = f"{reason} after {job.attempts} attempts"
+            job.done.set()
+            return
+        self.pending.appendleft(job)
+        self.cond.notify()
+
+    def _reap_loop(self):
+        while not self.closed:
+            time.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            with self.cond:
+                expired = [w for w in self.workers if any(self.leases[lease].deadline < now for lease in w.leases)]
+            for worker in expired:
+                # A worQer that stopped renewing is cut off; _serve re-queues its jobs
+                self.log(f"     [BriqQueue] {worker.name} lease expired")
+                worker.channel.close()
+
+    def _local_slot(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed: self.cond.wait()
+                if self.closed: return
+                job = self.pending.popleft()
+                job.attempts += 1
+                job.worker = 'local'
+            p = job.payload
+            try:
+                with lib_ai.briq_scope(p['briq']):
+                    text = lib_ai.run_ai_completion(p['provider'], p['model'], p['prompt'], cache=p['cache'], fallback=p['fallback'], tools=p['tools'])
+                job.result = {'text': text}
+            except Exception as e:
+                job.error = str(e)
+            job.done.set()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# worqer/lib_cache.py - Content-addressed LLM response cache (qache.d)
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+try: import fcntl
+except ImportError: fcntl = None
+
+class ResponseCache:
+    """
+    Disk-backed response cache keyed on a hash of provider, model and the
+    fully built prompt. One file per entry; the file mtime doubles as the
+    LRU clock, so the least recently used entries are evicted first once
+    the cache grows past max_bytes.
+    """
+    def __init__(self, root, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(provider: str, model: str, prompt, on_piece=None) -> str:
+        """
+        prompt is a string or a lib_prompt.Prompt, hashed piece by piece as it
+        streams (same key either way). on_piece(piece) sees every prompt piece
+        too, so the caller can measure the prompt in the same pass.
+        """
+        h = hashlib.sha256()
+        h.update(provider.lower().encode('utf-8', errors='surrogatepass') + b'\0')
+        h.update(model.encode('utf-8', errors='surrogatepass') + b'\0')
+        for piece in ([prompt] if isinstance(prompt, str) else prompt.pieces()):
+            h.update(piece.encode('utf-8', errors='surrogatepass'))
+            if on_piece: on_piece(piece)
+        h.update(b'\0')
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.txt"
+
+    def get(self, key: str):
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f: value = f.read()
+            os.utime(path) # Touch: most recently used
+        except OSError:
+            value = None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def put(self, key: str, value: str):
+        if not value: return
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f: f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            try: os.unlink(tmp)
+            except OSError: pass
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir(): continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp_'): continue
+                try: st = entry.stat()
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes: return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try: os.unlink(path); total -= size
+            except OSError: pass
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            # Persist across worqer processes so runs can be inspected afterwards
+            with open(self.root / '.lock', 'a') as lock:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    stats = self.stats()
+                    stats[field] = stats.get(field, 0) + 1
+                    with open(self.root / 'stats.json', 'w', encoding='utf-8') as f: json.dump(stats, f)
+                finally:
+                    if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        """Lifetime hit/miss counters for this cache directory."""
+        try:
+            with open(self.root / 'stats.json', 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0}
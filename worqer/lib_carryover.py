@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# worqer/lib_carryover.py - Cross-cycle briq fingerprints (struqture/briq_carryover.json)
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import lib_manifest
+
+try: import fcntl
+except ImportError: fcntl = None
+
+CARRYOVER_NAME = "briq_carryover.json"
+TITLE_INDEX_RE = re.compile(r'^(#\s*)\d+[_\s-]*', re.MULTILINE)
+
+def fingerprint(briq_text: str) -> str:
+    """Hash of the briq with its plan index, case and whitespace normalized away."""
+    text = TITLE_INDEX_RE.sub(r'\1', briq_text.replace('\r\n', '\n'))
+    return hashlib.sha256(" ".join(text.lower().split()).encode('utf-8')).hexdigest()
+
+class CarryOver:
+    """
+    Remembers, per cycle, each briq's fingerprint and the qodeyard files it
+    produced (as reported by the materializer). The qodeyard is scanned once,
+    when the cycle starts. A briq whose fingerprint matches one of the previous cycle's
+    briqs, and whose files are all unchanged since that cycle's manifest
+    snapshot, is carried over instead of being sent to the provider again.
+    """
+    def __init__(self, worqspace_root, cycle: int):
+        self.path = Path(worqspace_root) / "struqture" / CARRYOVER_NAME
+        self.cycle = int(cycle)
+        self.manifest = lib_manifest.QodeyardManifest(worqspace_root)
+        self.entries = {}
+        self._lock = threading.Lock()
+
+        data = self._load()
+        earlier = [int(c) for c in data if int(c) < self.cycle]
+        self.previous_cycle = max(earlier) if earlier else None
+        self.previous = {}
+        self.before, self.current = {}, {}
+        if self.previous_cycle is not None:
+            for name, entry in data[str(self.previous_cycle)].items():
+                if entry.get('files'): self.previous.setdefault(entry['fingerprint'], (name, entry))
+            # "Intact" = unchanged between the end of the previous cycle and the start of this one
+            self.before = self.manifest.snapshot(self.previous_cycle) or {}
+            self.current = self.manifest.scan()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def match(self, briq_text: str):
+        """(previous briq name, its files) if the briq can be carried over, else None."""
+        found = self.previous.get(fingerprint(briq_text))
+        if not found: return None
+        name, entry = found
+        for rel in entry['files']:
+            old, now = self.before.get(rel), self.current.get(rel)
+            if not old or not now or old[2] != now[2]: return None
+        return name, entry['files']
+
+    def record(self, briq_name: str, briq_text: str, files: list[str], carried_from: str = None):
+        with self._lock:
+            self.entries[briq_name] = {'fingerprint': fingerprint(briq_text), 'files': sorted(files), 'carried_from': carried_from}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                data = self._load()
+                data[str(self.cycle)] = {**data.get(str(self.cycle), {}), **self.entries}
+                fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix='.tmp_carryover_')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(data, f, separators=(',', ':'))
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# worqer/lib_context.py - Relevance-ranked, token-budgeted qodeyard context packing
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import lib_manifest
+
+IDENT_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+PIECE_RE = re.compile(r'\w+|[^\w\s]')
+PATH_RE = re.compile(r'[\w./-]+\.[A-Za-z0-9]{1,8}')
+SYMBOL_RE = re.compile(r'^\s*(?:async\s+)?(?:def|class|function|func|fn|interface|struct|enum|type|const|let|var)\s+([A-Za-z_][A-Za-z0-9_]*)', re.MULTILINE)
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'import', 'return', 'self', 'none', 'true', 'false',
+    'def', 'class', 'create', 'file', 'files', 'should', 'must', 'use', 'using', 'into', 'all', 'each', 'are',
+    'not', 'add', 'code', 'briq', 'plan', 'instruction', 'architect', 'implement', 'python', 'will', 'be',
+}
+MAX_INDEXED_BYTES = 512 * 1024
+BM25_K1 = 1.2
+BM25_B = 0.75
+PATH_BONUS = 8.0
+SYMBOL_BONUS = 2.0
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (no tokenizer download): ~4 chars per word piece, 1 per symbol."""
+    return sum((len(p) + 3) // 4 for p in PIECE_RE.findall(text))
+
+def terms(text: str) -> list[str]:
+    """Lower-cased identifier terms, with snake_case and camelCase parts split out."""
+    out = []
+    for ident in IDENT_RE.findall(text):
+        parts = [p for p in re.split(r'_|(?<=[a-z0-9])(?=[A-Z])', ident) if p]
+        for t in {ident.lower(), *(p.lower() for p in parts)}:
+            if len(t) > 2 and t not in STOPWORDS: out.append(t)
+    return out
+
+class _IndexedFile:
+    __slots__ = ('rel', 'sha', 'tokens', 'tf', 'length', 'symbols', 'names')
+
+    def __init__(self, rel: str, sha: str, text: str):
+        self.rel = rel
+        self.sha = sha
+        self.tokens = estimate_tokens(text) + estimate_tokens(rel) + 8 # + the prompt's file framing
+        words = terms(text)
+        self.tf = Counter(words)
+        self.length = max(1, len(words))
+        self.symbols = {s.lower() for s in SYMBOL_RE.findall(text)}
+        stem = Path(rel).stem.lower()
+        self.names = {rel.lower(), Path(rel).name.lower(), stem}
+
+class ContextPacker:
+    """
+    Ranks qodeyard files against a briq by lexical overlap (BM25 over
+    identifier terms) plus symbol references (the briq names the file, or
+    symbols the file defines), then packs the best files whole into a token
+    budget. The index is keyed on the manifest's content hashes, so between
+    briqs only files that actually changed are re-read. Each scan is diffed
+    against the packer's own last scan, so a file is only re-hashed when its
+    size or mtime moved since the previous briq.
+    """
+    def __init__(self, worqspace_root, token_budget: int = 24000):
+        self.manifest = lib_manifest.QodeyardManifest(worqspace_root)
+        self.token_budget = token_budget
+        self._index = {}
+        self._entries = None # Last scan: rel -> [size, mtime_ns, sha256]
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> list:
+        entries = self.manifest.scan(self._entries)
+        with self._lock:
+            self._entries = entries
+            for rel in list(self._index):
+                if rel not in entries: del self._index[rel]
+            for rel, (size, _, sha) in entries.items():
+                cached = self._index.get(rel)
+                if cached and cached.sha == sha: continue
+                if size > MAX_INDEXED_BYTES:
+                    self._index.pop(rel, None); continue
+                try:
+                    with open(self.manifest.qodeyard / rel, 'r', encoding='utf-8') as f: text = f.read()
+                except (OSError, UnicodeDecodeError):
+                    self._index.pop(rel, None); continue
+                self._index[rel] = _IndexedFile(rel, sha, text)
+            return list(self._index.values())
+
+    def rank(self, briq_text: str) -> list[tuple[float, object]]:
+        files = self._refresh()
+        if not files: return []
+        query = Counter(terms(briq_text))
+        mentioned = {m.lower().strip('./') for m in PATH_RE.findall(briq_text)}
+        mentioned |= {m.rsplit('/', 1)[-1] for m in mentioned}
+        avg_len = sum(f.length for f in files) / len(files)
+        df = Counter()
+        for f in files:
+            for t in query:
+                if t in f.tf: df[t] += 1
+
+        scored = []
+        for f in files:
+            score = 0.0
+            for t, qtf in query.items():
+                tf = f.tf.get(t)
+                if not tf: continue
+                idf = math.log(1 + (len(files) - df[t] + 0.5) / (df[t] + 0.5))
+                score += qtf * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * f.length / avg_len))
+            if f.names & mentioned: score += PATH_BONUS
+            score += SYMBOL_BONUS * len(f.symbols & query.keys())
+            if score > 0: scored.append((score, f))
+        scored.sort(key=lambda x: (-x[0], x[1].rel))
+        return scored
+
+    def select(self, briq_text: str) -> tuple[list[str], int]:
+        """Absolute paths of the files to include for this briq, and their estimated tokens."""
+        chosen, used = [], 0
+        for _, f in self.rank(briq_text):
+            if used + f.tokens > self.token_budget: continue # Whole files only, try smaller ones
+            chosen.append(str(self.manifest.qodeyard / f.rel))
+            used += f.tokens
+        return chosen, used
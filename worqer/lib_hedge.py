@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# worqer/lib_hedge.py - Latency history and cancellation for hedged provider calls
+import json
+import os
+import threading
+from collections import deque
+
+HISTORY_SIZE = 200
+LEDGER_TAIL_BYTES = 512 * 1024
+
+class CallCancelled(Exception):
+    """Raised by a provider call whose CancelToken fired (the losing side of a hedge)."""
+
+class CancelToken:
+    """Lets a hedge cancel the losing call: kills its process or stops its HTTP stream."""
+    def __init__(self):
+        self.cancelled = False
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def sleep(self, seconds: float):
+        """Sleeps, returning early (raising CallCancelled) once the token fires."""
+        if self._event.wait(seconds): raise CallCancelled()
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled: return
+            self.cancelled = True
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try: callback()
+            except Exception: pass
+
+class LatencyHistory:
+    """
+    Recent wall times of live (uncached) calls per provider/model. Seeded once
+    per process from the tail of the qage's metrics ledger, so the first briq
+    of a cyQle already hedges against what earlier agents and cyQles saw.
+    """
+    def __init__(self, ledger_path: str = None):
+        self.samples = {}
+        self._lock = threading.Lock()
+        if ledger_path: self._seed(ledger_path)
+
+    def _seed(self, path: str):
+        try:
+            with open(path, 'rb') as f:
+                start = max(0, f.seek(0, os.SEEK_END) - LEDGER_TAIL_BYTES)
+                f.seek(start)
+                lines = f.read().splitlines()
+                if start: lines = lines[1:] # Read from mid-file: the first line may be cut
+        except OSError: return
+        for line in lines:
+            try: rec = json.loads(line)
+            except ValueError: continue
+            if (rec.get('event') == 'provider_call' and not rec.get('cache_hit') and not rec.get('hedged')
+                    and rec.get('winner', 'primary') == 'primary' and rec.get('wall_s') is not None):
+                self.add(rec.get('provider'), rec.get('model'), rec['wall_s'] - (rec.get('queued_s') or 0.0))
+
+    def add(self, provider: str, model: str, wall_s):
+        if not provider or wall_s is None: return
+        with self._lock:
+            self.samples.setdefault((provider, model), deque(maxlen=HISTORY_SIZE)).append(float(wall_s))
+
+    def threshold(self, provider: str, model: str, pct: float, min_samples: int):
+        """Nearest-rank pct-th percentile of recent wall times, or None with too few samples."""
+        with self._lock: values = sorted(self.samples.get((provider, model), ()))
+        if len(values) < max(1, min_samples): return None
+        rank = max(1, -(-len(values) * pct // 100))
+        return values[int(rank) - 1]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# worqer/lib_http.py - In-process OpenAI-compatible provider (openai-http)
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+BODY_WRITE_BYTES = 64 * 1024
+
+# A reused keep-alive socket may have been closed by the server in the meantime
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError)
+
+class HttpConnectionPool:
+    """
+    Keep-alive HTTP(S) connections shared by every call in the process,
+    keyed on (scheme, host, port). Connections go back to the pool after a
+    fully read response, so consecutive briqs skip TCP and TLS setup.
+    """
+    def __init__(self, max_idle: int = 8, timeout: float = 600):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, host: str, port: int):
+        """Returns (connection, reused, connect_seconds)."""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle: return idle.pop(), True, 0.0
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = cls(host, port, timeout=self.timeout)
+        t0 = time.perf_counter()
+        conn.connect()
+        # Headers and body go out as separate writes; don't let Nagle hold the body back
+        try: conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (OSError, AttributeError): pass
+        return conn, False, time.perf_counter() - t0
+
+    def release(self, scheme: str, host: str, port: int, conn, reusable: bool):
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault((scheme, host, port), [])
+                if len(idle) < self.max_idle:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns: conn.close()
+            self._idle.clear()
+
+def _escaped(prompt):
+    """The prompt's pieces as JSON string contents (ASCII: character counts are byte counts)."""
+    for piece in ([prompt] if isinstance(prompt, str) else prompt.pieces()):
+        if piece: yield json.dumps(piece)[1:-1].encode('ascii')
+
+def _body(head: bytes, prompt, tail: bytes, length: int, write_bytes: int = BODY_WRITE_BYTES):
+    """
+    Request body in writes of ~write_bytes (small file headers are batched
+    rather than sent one packet each). Raises instead of sending a body that
+    no longer matches the declared Content-Length (a prompt file changed
+    between the two passes; lib_ai sends frozen lib_prompt.Snapshot prompts).
+    """
+    buf = bytearray(head)
+    sent = 0
+    for part in _escaped(prompt):
+        buf += part
+        if len(buf) >= write_bytes:
+            sent += len(buf)
+            if sent + len(tail) > length: raise ValueError("prompt changed while it was sent (longer than its Content-Length)")
+            yield bytes(buf)
+            buf.clear()
+    buf += tail
+    if sent + len(buf) != length: raise ValueError(f"prompt changed while it was sent ({sent + len(buf)} bytes, Content-Length {length})")
+    yield bytes(buf)
+
+class OpenAIHttpClient:
+    """Streaming chat-completions client for OpenAI-compatible endpoints."""
+    def __init__(self, base_url: str = None, api_key: str = None, pool: HttpConnectionPool = None):
+        self.base_url = (base_url or os.environ.get('OPENAI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.api_key = api_key if api_key is not None else os.environ.get('OPENAI_API_KEY', '')
+        self.pool = pool or HttpConnectionPool()
+        parts = urlsplit(self.base_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.path = (parts.path or '') + '/chat/completions'
+
+    def complete(self, model: str, prompt, on_text=None):
+        """
+        Sends one streamed completion. on_text receives each text delta as it
+        arrives. Returns (text, timing) where timing separates connection setup
+        from time-to-first-token and generation time. prompt is a string or a
+        lib_prompt.Prompt; the JSON body is escaped and sent piece by piece.
+        """
+        head = ('{"model": %s, "stream": true, "messages": [{"role": "user", "content": "' % json.dumps(model)).encode('ascii')
+        tail = b'"}]}'
+        length = len(head) + len(tail) + sum(len(part) for part in _escaped(prompt))
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+            'Connection': 'keep-alive',
+            'Content-Length': str(length),
+        }
+        if self.api_key: headers['Authorization'] = f"Bearer {self.api_key}"
+
+        for attempt in (1, 2):
+            conn, reused, connect_s = self.pool.acquire(self.scheme, self.host, self.port)
+            try:
+                t_sent = time.perf_counter()
+                conn.request('POST', self.path, body=_body(head, prompt, tail, length), headers=headers)
+                resp = conn.getresponse()
+                break
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused and attempt == 1: continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+        reusable = False
+        try:
+            if resp.status != 200:
+                detail = resp.read().decode('utf-8', errors='replace')
+                reusable = not resp.will_close
+                raise RuntimeError(f"HTTP {resp.status} from {self.base_url}: {detail[:500]}")
+
+            parts = []
+            t_first = None
+            for delta in self._iter_deltas(resp):
+                if t_first is None: t_first = time.perf_counter()
+                parts.append(delta)
+                if on_text: on_text(delta)
+            resp.read() # Drain so the connection can be reused
+            reusable = not resp.will_close
+        finally:
+            self.pool.release(self.scheme, self.host, self.port, conn, reusable)
+
+        t_done = time.perf_counter()
+        if t_first is None: t_first = t_done
+        timing = {
+            'connection': 'reused' if reused else 'new',
+            'connect_s': connect_s,
+            'ttfb_s': t_first - t_sent,
+            'generation_s': t_done - t_first,
+        }
+        return "".join(parts), timing
+
+    @staticmethod
+    def _iter_deltas(resp):
+        content_type = resp.getheader('Content-Type', '')
+        if 'text/event-stream' not in content_type:
+            # Server ignored stream=true: plain JSON completion
+            payload = json.loads(resp.read().decode('utf-8') or '{}')
+            for choice in payload.get('choices', []):
+                text = (choice.get('message') or {}).get('content')
+                if text: yield text
+            return
+        for raw in resp:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line.startswith('data:'): continue
+            data = line[5:].strip()
+            if data == '[DONE]': break
+            try: event = json.loads(data)
+            except ValueError: continue
+            for choice in event.get('choices', []):
+                text = (choice.get('delta') or {}).get('content')
+                if text: yield text
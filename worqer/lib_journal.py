@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# worqer/lib_journal.py - Per-briq completion records in struqture/journal.jsonl
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_NAME = "journal.jsonl"
+
+def content_sha(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()
+
+class BriqJournal:
+    """
+    The construQtor's side of the run journal (format: qrane/journal.py).
+    Briqs finished since the last fresh-run marker are loaded, and each newly
+    finished briq is appended and fsync'd as soon as it succeeds.
+    """
+    def __init__(self, worqspace_root):
+        self.path = Path(worqspace_root) / "struqture" / JOURNAL_NAME
+        self.done = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: rec = json.loads(line)
+                    except ValueError: continue
+                    if rec.get('kind') == 'run' and not rec.get('resume'): self.done = {}
+                    elif rec.get('kind') == 'briq': self.done[(rec['cycle'], rec['name'])] = rec.get('input')
+        except OSError: pass
+
+    def is_done(self, cycle: int, briq: str, digest: str) -> bool:
+        return self.done.get((cycle, briq)) == digest
+
+    def mark_done(self, cycle: int, briq: str, digest: str):
+        rec = {'ts': round(time.time(), 3), 'kind': 'briq', 'cycle': cycle, 'name': briq, 'input': digest}
+        with self._lock:
+            self.done[(cycle, briq)] = digest
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, (json.dumps(rec, separators=(',', ':')) + "\n").encode('utf-8'))
+                    os.fsync(fd)
+                finally: os.close(fd)
+            except OSError: pass
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# worqer/lib_manifest.py - Incremental qodeyard file index (struqture/qodeyard_manifest.json)
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try: import fcntl
+except ImportError: fcntl = None
+
+MANIFEST_NAME = "qodeyard_manifest.json"
+SKIP_DIRS = {".git", "__pycache__"}
+HASH_BLOCK = 1024 * 1024
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""): h.update(block)
+    return h.hexdigest()
+
+class QodeyardManifest:
+    """
+    Persistent per-cycle index of the qodeyard: relative path -> [size,
+    mtime_ns, sha256]. A refresh is one stat pass; a file is only re-read
+    and re-hashed when its size or mtime differs from the last snapshot.
+    Only the latest snapshot and the one before it are kept (plus the
+    refreshed cycle and its predecessor when an earlier cycle is re-run),
+    so the file stays the size of two qodeyard listings.
+    """
+    def __init__(self, worqspace_root):
+        root = Path(worqspace_root)
+        self.qodeyard = root / "qodeyard"
+        self.path = root / "struqture" / MANIFEST_NAME
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+            if data.get('version') == 1: return data
+        except (OSError, ValueError): pass
+        return {'version': 1, 'latest': None, 'cycles': {}}
+
+    def scan(self, previous: dict = None) -> dict:
+        """
+        Stat pass over the qodeyard, hashing only files that are new or
+        modified since `previous` (default: the latest snapshot).
+        """
+        if previous is None: previous = self.snapshot() or {}
+        entries = {}
+        stack = [self.qodeyard]
+        while stack:
+            try: it = os.scandir(stack.pop())
+            except OSError: continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS: stack.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False) or entry.name.startswith('.tmp_'): continue
+                    try: st = entry.stat()
+                    except OSError: continue
+                    rel = os.path.relpath(entry.path, self.qodeyard)
+                    old = previous.get(rel)
+                    if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+                        entries[rel] = old
+                        continue
+                    try: entries[rel] = [st.st_size, st.st_mtime_ns, file_sha256(entry.path)]
+                    except OSError: pass
+        return entries
+
+    def refresh(self, cycle) -> dict:
+        """Scans the qodeyard, records it as the snapshot for `cycle` and saves."""
+        entries = self.scan()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.data = self._load() # Merge with snapshots other agents may have written
+                self.data['cycles'][str(cycle)] = entries
+                if self.data['latest'] is None or int(cycle) >= int(self.data['latest']):
+                    self.data['latest'] = str(cycle)
+                self._prune(int(cycle))
+                fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix='.tmp_manifest_')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(self.data, f, separators=(',', ':'))
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+        return entries
+
+    def _prune(self, cycle: int):
+        """Drops every snapshot but the latest, `cycle` and the one before each."""
+        numbers = [int(c) for c in self.data['cycles']]
+        keep = set()
+        for c in (int(self.data['latest']), cycle):
+            keep.add(c)
+            earlier = [n for n in numbers if n < c]
+            if earlier: keep.add(max(earlier))
+        self.data['cycles'] = {k: v for k, v in self.data['cycles'].items() if int(k) in keep}
+
+    def snapshot(self, cycle=None):
+        """Entries recorded for `cycle` (default: the latest one), or None."""
+        key = str(cycle) if cycle is not None else self.data.get('latest')
+        return self.data['cycles'].get(key) if key is not None else None
+
+    def cycles(self) -> list[int]:
+        return sorted(int(c) for c in self.data['cycles'])
+
+    def changes_since(self, cycle, current=None) -> dict:
+        """
+        Returns {'added', 'changed', 'removed'} path sets between the snapshot
+        of `cycle` and `current` (default: the latest snapshot).
+        """
+        before = self.snapshot(cycle) or {}
+        after = current if current is not None else (self.snapshot() or {})
+        return {
+            'added': {p for p in after if p not in before},
+            'changed': {p for p in after if p in before and after[p][2] != before[p][2]},
+            'removed': {p for p in before if p not in after},
+        }
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# worqer/lib_materialize.py - Writes fenced code blocks and unified diffs from a response into qodeyard
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path, PurePosixPath
+
+FENCE_RE = re.compile(r'^(?P<indent>[ \t]*)(?P<fence>`{3,}|~{3,})(?P<info>[^`\n]*?)[ \t]*$')
+# Annotations on the line(s) right above a fence: "File: x.py", "### File: `x.py`", "**x.py**", "`x.py`:"
+LABEL_RE = re.compile(r'^\s*(?:#+\s*)?(?:\*\*)?(?:(?:File|Filename|Path)\s*:\s*)?(?:\*\*)?`?(?P<path>[\w./@+-]+\.[\w+-]+|[\w./@+-]*/?(?:Makefile|Dockerfile|LICENSE|README))`?(?:\*\*)?:?\s*$', re.IGNORECASE)
+INFO_KEY_RE = re.compile(r'^(?:file(?:name)?|path|title)=', re.IGNORECASE)
+PATHLIKE_RE = re.compile(r'^[\w./@+-]+\.[\w+-]+$')
+# First line inside the block: "# file: x.py", "// x.py", "<!-- x.html -->"
+INLINE_RE = re.compile(r'^\s*(?:#|//|--|/\*|<!--|;)\s*(?:file(?:name)?\s*:\s*)?(?P<path>[\w./@+-]+\.[\w+-]+)\s*(?:\*/|-->)?\s*$', re.IGNORECASE)
+HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+DIFF_INFOS = {'diff', 'patch', 'udiff'}
+
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+class PatchError(Exception): pass
+
+def _path_lock(path: Path) -> threading.Lock:
+    with _path_locks_lock: return _path_locks.setdefault(str(path), threading.Lock())
+
+def safe_relpath(raw: str):
+    """Normalized qodeyard-relative POSIX path, or None if it is absolute or escapes the qodeyard."""
+    raw = raw.strip().strip('`"\'').replace('\\', '/')
+    for prefix in ('a/', 'b/', './', 'qodeyard/'):
+        if raw.startswith(prefix) and len(raw) > len(prefix): raw = raw[len(prefix):]
+    p = PurePosixPath(raw)
+    if not raw or p.is_absolute() or '..' in p.parts or raw.endswith('/'): return None
+    return str(p)
+
+def iter_fences(text: str):
+    """
+    (start offset, info string, body) of each top-level fenced block. A fence
+    is closed by a bare fence of the same character, at least as long and
+    equally indented. A fence of that kind with an info string (```bash inside
+    a README block) opens a nested block, which the next bare fence closes, so
+    nested examples stay part of the outer body. Unclosed blocks are skipped.
+    """
+    lines = text.splitlines(keepends=True)
+    offsets, pos = [], 0
+    for line in lines:
+        offsets.append(pos)
+        pos += len(line)
+    i = 0
+    while i < len(lines):
+        m = FENCE_RE.match(lines[i].rstrip('\r\n'))
+        if not m:
+            i += 1
+            continue
+        indent, fence = m.group('indent'), m.group('fence')
+        depth, close = 0, None
+        for j in range(i + 1, len(lines)):
+            inner = FENCE_RE.match(lines[j].rstrip('\r\n'))
+            if not inner or inner.group('fence')[0] != fence[0] or len(inner.group('fence')) < len(fence): continue
+            if inner.group('info').strip(): depth += 1
+            elif depth: depth -= 1
+            elif inner.group('indent') == indent:
+                close = j
+                break
+        if close is None:
+            i += 1
+            continue
+        yield offsets[i], m.group('info'), "".join(lines[i + 1:close])
+        i = close + 1
+
+def parse_blocks(text: str) -> list[dict]:
+    """
+    Fenced blocks of a response as [{'kind': 'file'|'diff', 'path', 'body'}].
+    Files are named by a label line above the fence, the fence's info string
+    (```python:src/app.py, ```py title="app.py") or a comment on the first
+    line of the block; unnamed blocks are skipped. Diff blocks carry their own
+    ---/+++ headers and may touch several files.
+    """
+    blocks = []
+    for start, info, body in iter_fences(text):
+        info = info.strip()
+        lang = info.split(':', 1)[0].split()[0].lower() if info else ''
+        if lang in DIFF_INFOS or (body.startswith('--- ') and '\n+++ ' in body and '\n@@ ' in body):
+            blocks.append({'kind': 'diff', 'path': None, 'body': body})
+            continue
+        path = None
+        above = [line for line in text[:start].rstrip('\n').split('\n')[-2:] if line.strip()]
+        if above:
+            label = LABEL_RE.match(above[-1])
+            if label: path = label.group('path')
+        if not path and info:
+            for token in re.split(r'[\s:]+', info)[1:] if lang else []:
+                token = INFO_KEY_RE.sub('', token).strip('"\'')
+                if PATHLIKE_RE.match(token): path = token; break
+        if not path:
+            first, _, rest = body.partition('\n')
+            inline = INLINE_RE.match(first)
+            if inline: path, body = inline.group('path'), rest
+        if path: blocks.append({'kind': 'file', 'path': path, 'body': body})
+    return blocks
+
+def split_diff(body: str) -> list[tuple]:
+    """[(old_path, new_path, hunks)] of a unified diff; hunks are (old_start, lines)."""
+    files, current, hunk = [], None, None
+    lines = body.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('--- ') and i + 1 < len(lines) and lines[i + 1].startswith('+++ '):
+            current = [line[4:].split('\t')[0].strip(), lines[i + 1][4:].split('\t')[0].strip(), []]
+            files.append(current)
+            hunk = None
+            i += 2
+            continue
+        m = HUNK_RE.match(line)
+        if m and current is not None:
+            hunk = (int(m.group(1)), [])
+            current[2].append(hunk)
+        elif hunk is not None and line[:1] in (' ', '+', '-'):
+            hunk[1].append(line)
+        elif hunk is not None and line == '':
+            hunk[1].append(' ') # Editors and models drop the space of blank context lines
+        i += 1
+    return [tuple(f) for f in files]
+
+def apply_hunks(original: list[str], hunks: list[tuple]) -> list[str]:
+    """
+    Applies hunks to a file's lines. Each hunk is located by its context and
+    removed lines, nearest to its stated position first, so a shifted line
+    number still applies; a hunk that matches nowhere raises PatchError.
+    """
+    result = list(original)
+    offset = 0
+    for start, lines in hunks:
+        while lines and lines[-1] == ' ': lines = lines[:-1] # Trailing padding from blank-line repair
+        old = [l[1:] for l in lines if l[:1] in (' ', '-')]
+        new = [l[1:] for l in lines if l[:1] in (' ', '+')]
+        guess = max(0, start - 1 + offset)
+        if not old:
+            at = min(guess, len(result))
+        else:
+            candidates = sorted(range(len(result) - len(old) + 1), key=lambda pos: abs(pos - guess))
+            at = next((pos for pos in candidates if result[pos:pos + len(old)] == old), None)
+            if at is None: raise PatchError(f"hunk @@ -{start} @@ does not match")
+        result[at:at + len(old)] = new
+        offset += len(new) - len(old)
+    return result
+
+def atomic_write(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f: f.write(content)
+        if path.exists(): os.chmod(tmp, path.stat().st_mode & 0o777)
+        else: os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+def materialize(text: str, qodeyard: Path) -> dict:
+    """
+    Writes every named block of `text` into the qodeyard (atomically, one
+    os.replace per file) and applies its diff blocks. Returns
+    {'written': [...], 'patched': [...], 'deleted': [...], 'errors': [...]}.
+    """
+    qodeyard = Path(qodeyard)
+    out = {'written': [], 'patched': [], 'deleted': [], 'errors': []}
+    for block in parse_blocks(text):
+        if block['kind'] == 'file':
+            rel = safe_relpath(block['path'])
+            if not rel:
+                out['errors'].append(f"{block['path']}: path outside the qodeyard")
+                continue
+            body = block['body'] if block['body'].endswith('\n') or not block['body'] else block['body'] + '\n'
+            try:
+                with _path_lock(qodeyard / rel): atomic_write(qodeyard / rel, body)
+                out['written'].append(rel)
+            except OSError as e:
+                out['errors'].append(f"{rel}: {e}")
+            continue
+        for old_path, new_path, hunks in split_diff(block['body']):
+            deleting = new_path == '/dev/null'
+            rel = safe_relpath(old_path if deleting else new_path)
+            if not rel:
+                out['errors'].append(f"{new_path}: path outside the qodeyard")
+                continue
+            target = qodeyard / rel
+            with _path_lock(target):
+                try:
+                    if deleting:
+                        target.unlink()
+                        out['deleted'].append(rel)
+                        continue
+                    creating = old_path == '/dev/null' or not target.exists()
+                    original = [] if creating else target.read_text(encoding='utf-8').split('\n')
+                    trailing = not creating and original[-1:] == ['']
+                    if trailing: original = original[:-1]
+                    patched = apply_hunks(original, hunks)
+                    atomic_write(target, "\n".join(patched) + ("\n" if trailing or creating else ""))
+                    out['written' if creating else 'patched'].append(rel)
+                except (OSError, UnicodeDecodeError, PatchError) as e:
+                    out['errors'].append(f"{rel}: {e}")
+    return out
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# worqer/lib_metrics.py - Structured metrics records (struqture/metrics.jsonl)
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+
+METRICS_NAME = "metrics.jsonl"
+
+# Records made inside capture() go to its list instead of the ledger (remote briq worQers ship them back)
+_captured = contextvars.ContextVar('captured', default=None)
+
+def ledger_path() -> str:
+    """The run's ledger: QONQ_METRICS_FILE (set by Qrane, empty = off) or struqture/ in the worqspace."""
+    path = os.environ.get('QONQ_METRICS_FILE')
+    if path is None: path = os.path.join(os.getcwd(), "struqture", METRICS_NAME)
+    return path
+
+def enabled() -> bool:
+    """Whether record() goes anywhere (callers can skip measuring what nobody reads)."""
+    return _captured.get() is not None or bool(ledger_path())
+
+def record(event: str, **fields):
+    """
+    Appends one JSON line to the ledger. Each record is written with a single
+    O_APPEND write, so records from parallel briqs and agents never interleave.
+    Metrics are best-effort: a failed write never fails the agent.
+    """
+    captured = _captured.get()
+    if captured is not None:
+        captured.append(dict(fields, event=event))
+        return
+    path = ledger_path()
+    if not path: return
+    rec = {
+        'ts': round(time.time(), 3),
+        'run': os.environ.get('QONQ_RUN_ID'),
+        'cycle': int(os.environ.get('CYCLE_NUM', 0) or 0),
+        'agent': os.path.splitext(os.path.basename(sys.argv[0]))[0],
+        'event': event,
+    }
+    rec.update(fields)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try: os.write(fd, (json.dumps(rec, separators=(',', ':')) + "\n").encode('utf-8'))
+        finally: os.close(fd)
+    except OSError: pass
+
+@contextlib.contextmanager
+def capture():
+    """Collects the records made in this context (and threads started from it) instead of writing them."""
+    records = []
+    token = _captured.set(records)
+    try: yield records
+    finally: _captured.reset(token)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# worqer/lib_prompt.py - Prompts as segments, streamed to the provider in chunks
+import codecs
+import mmap
+import os
+import shutil
+import tempfile
+
+from lib_context import estimate_tokens
+
+CHUNK_BYTES = 64 * 1024 # mmap slice decoded per piece
+CHUNK_CHARS = 64 * 1024 # Longest piece yielded for a literal segment
+
+class FileRef:
+    """
+    A file included by reference: header, the file's text, footer. The file
+    is only opened when the prompt is streamed, mapped with mmap and decoded
+    one CHUNK_BYTES slice at a time. A file that can't be opened is left out
+    entirely (header and footer included). errors is the UTF-8 decoding
+    policy; 'skip' leaves out files that aren't valid UTF-8, checked with an
+    extra decoding pass right before the file is emitted.
+    """
+    def __init__(self, path, header: str = "", footer: str = "", errors: str = 'replace'):
+        self.path = path
+        self.header = header
+        self.footer = footer
+        self.errors = errors
+
+    def pieces(self):
+        try: f = open(self.path, 'rb')
+        except OSError: return
+        with f:
+            try: size = os.fstat(f.fileno()).st_size
+            except OSError: return
+            if self.errors == 'skip':
+                try:
+                    for _ in _decode(f, size, 'strict'): pass
+                except (UnicodeDecodeError, OSError): return
+            if self.header: yield self.header
+            yield from _decode(f, size, 'strict' if self.errors == 'skip' else self.errors)
+            if self.footer: yield self.footer
+
+    def copy_to(self, directory) -> 'FileRef':
+        """The same reference to a private copy of the file in `directory` (None if it can't be read)."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'wb') as dst, open(self.path, 'rb') as src: shutil.copyfileobj(src, dst, CHUNK_BYTES)
+        except OSError: return None
+        return FileRef(tmp, self.header, self.footer, self.errors)
+
+def _decode(f, size: int, errors: str):
+    """Decoded text of an open binary file, CHUNK_BYTES at a time (through mmap where the file allows it)."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors=errors)
+    mapped = None
+    if size:
+        try: mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError): pass # Pipes, special files: fall back to reads
+    try:
+        if mapped is not None:
+            for off in range(0, len(mapped), CHUNK_BYTES):
+                text = decoder.decode(mapped[off:off + CHUNK_BYTES])
+                if text: yield text
+        else:
+            f.seek(0)
+            while chunk := f.read(CHUNK_BYTES):
+                text = decoder.decode(chunk)
+                if text: yield text
+        text = decoder.decode(b'', final=True)
+        if text: yield text
+    finally:
+        if mapped is not None: mapped.close()
+
+class Meter:
+    """Running (UTF-8 bytes, estimated tokens) of the pieces fed to add(), for measuring during another pass."""
+    def __init__(self):
+        self.size = 0
+        self.tokens = 0
+
+    def add(self, piece: str):
+        self.size += len(piece.encode('utf-8', errors='replace'))
+        self.tokens += estimate_tokens(piece)
+
+    @property
+    def total(self) -> tuple:
+        return self.size, self.tokens
+
+class Prompt:
+    """
+    A prompt built from segments (literal text, FileRefs, nested Prompts)
+    instead of one concatenated string. pieces() yields it as bounded
+    strings, so providers get it written to stdin or an HTTP body as it is
+    read, and any number of times (retries, hedged calls). max_chars caps
+    the prompt while streaming: once it is reached nothing further is read.
+    """
+    def __init__(self, text: str = "", max_chars: int = None):
+        self.segments = []
+        self.max_chars = max_chars
+        self._measured = None
+        self.text(text)
+
+    def text(self, text: str):
+        if text:
+            self.segments.append(text)
+            self._measured = None
+        return self
+
+    def file(self, path, header: str = "", footer: str = "", errors: str = 'replace'):
+        self.segments.append(FileRef(path, header, footer, errors))
+        self._measured = None
+        return self
+
+    def add(self, prompt: 'Prompt'):
+        self.segments.append(prompt)
+        self._measured = None
+        return self
+
+    def __bool__(self) -> bool:
+        return bool(self.segments)
+
+    def __str__(self) -> str:
+        return "".join(self.pieces())
+
+    def pieces(self):
+        remaining = self.max_chars
+        for segment in self.segments:
+            if isinstance(segment, str):
+                source = (segment[i:i + CHUNK_CHARS] for i in range(0, len(segment), CHUNK_CHARS))
+            else:
+                source = segment.pieces()
+            for piece in source:
+                if remaining is not None:
+                    if len(piece) >= remaining:
+                        if remaining: yield piece[:remaining]
+                        return
+                    remaining -= len(piece)
+                yield piece
+
+    def measure(self) -> tuple:
+        """(UTF-8 bytes, estimated tokens), counted in one streamed pass and kept until the prompt changes."""
+        if self._measured is None:
+            meter = Meter()
+            for piece in self.pieces(): meter.add(piece)
+            self._measured = meter.total
+        return self._measured
+
+class Snapshot:
+    """
+    Context manager freezing a prompt for one provider call: every file is
+    copied once into a private temporary directory, and the returned Prompt
+    streams those copies. The cache key, the request's Content-Length, the
+    body, retries and hedged calls then all see the same bytes, even while
+    parallel briqs rewrite the originals. The copies go when the block ends.
+    """
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.directory = None
+
+    def __enter__(self):
+        return self.prompt if isinstance(self.prompt, str) else self._freeze(self.prompt)
+
+    def __exit__(self, *exc):
+        if self.directory: shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _freeze(self, prompt: Prompt) -> Prompt:
+        out = Prompt(max_chars=prompt.max_chars)
+        for segment in prompt.segments:
+            if isinstance(segment, str): out.text(segment)
+            elif isinstance(segment, Prompt): out.add(self._freeze(segment))
+            else:
+                if self.directory is None: self.directory = tempfile.mkdtemp(prefix='qonq_prompt_')
+                copy = segment.copy_to(self.directory)
+                if copy: out.segments.append(copy)
+        return out
+
+def chunks(prompt, errors: str = 'replace'):
+    """UTF-8 chunks of a Prompt (or plain string) for a pipe or request body."""
+    for piece in ([prompt] if isinstance(prompt, str) else prompt.pieces()):
+        if piece: yield piece.encode('utf-8', errors=errors)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# worqer/lib_ratelimit.py - Per-provider rate limiting shared by every worQer of a qage
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try: import fcntl
+except ImportError: fcntl = None
+
+STATE_NAME = "ratelimit.json"
+POLL_INTERVAL = 0.1     # Longest sleep between two attempts to take a slot
+DECREASE_COOLDOWN = 2.0 # One multiplicative decrease per burst of failures
+THROTTLE_RE = re.compile(r'\b429\b|rate.?limit|too many requests|quota|resource.?exhausted|overloaded', re.IGNORECASE)
+TRANSIENT_RE = re.compile(r'\b50[0234]\b|timed? ?out|connection (reset|refused|aborted)|temporarily|unavailable', re.IGNORECASE)
+
+class ProviderError(RuntimeError):
+    """A failed provider call, classified from its error text so callers know whether to retry."""
+    def __init__(self, message: str, detail: str = ""):
+        super().__init__(message)
+        text = f"{message}\n{detail}"
+        self.throttled = bool(THROTTLE_RE.search(text))
+        self.transient = self.throttled or bool(TRANSIENT_RE.search(text))
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class ProviderLimiter:
+    """
+    Token bucket (requests_per_min) plus an adaptive in-flight limit for one
+    provider. The state lives in struqture/ratelimit.json under an flock, so
+    every worQer process of the qage (and every briq thread in them) draws
+    from the same budget. The in-flight limit follows AIMD: each success adds
+    1/limit (about +1 per round of calls), a throttled call halves it and any
+    other failure cuts it by a quarter, never below 1 or above max_in_flight.
+    """
+    def __init__(self, state_path, provider: str, requests_per_min: float = 0, max_in_flight: int = 16):
+        self.path = Path(state_path)
+        self.provider = provider
+        self.rate = float(requests_per_min or 0) / 60.0
+        self.max_in_flight = max(1, int(max_in_flight or 1))
+        self._ids = iter(range(1, 1 << 62))
+        self._ids_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+                except (OSError, ValueError): data = {}
+                state = data.setdefault(self.provider, {})
+                yield state
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f, separators=(',', ':'))
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self, state: dict, now: float):
+        state.setdefault('limit', float(self.max_in_flight))
+        state['limit'] = min(state['limit'], float(self.max_in_flight))
+        # Slots of processes that died without releasing them are reclaimed
+        holders = state.setdefault('holders', {})
+        for slot, pid in list(holders.items()):
+            if not _alive(pid): del holders[slot]
+        if self.rate:
+            last = state.get('refilled', now)
+            burst = max(1.0, self.rate * 60.0 / 10) # Up to 6s worth of requests at once
+            state['tokens'] = min(burst, state.get('tokens', burst) + (now - last) * self.rate)
+            state['refilled'] = now
+
+    def acquire(self) -> tuple[str, float]:
+        """Blocks until a slot is free; returns (slot id, seconds waited)."""
+        with self._ids_lock: slot = f"{os.getpid()}:{threading.get_ident()}:{next(self._ids)}"
+        started = time.monotonic()
+        while True:
+            with self._locked() as state:
+                now = time.time()
+                self._refresh(state, now)
+                has_slot = len(state['holders']) < max(1, int(state['limit']))
+                has_token = not self.rate or state['tokens'] >= 1
+                if has_slot and has_token:
+                    state['holders'][slot] = os.getpid()
+                    if self.rate: state['tokens'] -= 1
+                    return slot, time.monotonic() - started
+                wait = (1 - state['tokens']) / self.rate if not has_token else POLL_INTERVAL
+            time.sleep(min(POLL_INTERVAL, max(0.01, wait)) * random.uniform(0.5, 1.0))
+
+    def release(self, slot: str, outcome: str):
+        """outcome: 'ok', 'throttled', 'error' or 'cancelled' (frees the slot, no AIMD step)."""
+        with self._locked() as state:
+            now = time.time()
+            self._refresh(state, now)
+            state['holders'].pop(slot, None)
+            if outcome == 'cancelled': return
+            if outcome == 'ok':
+                state['limit'] = min(float(self.max_in_flight), state['limit'] + 1.0 / max(1.0, state['limit']))
+            elif now - state.get('decreased', 0) >= DECREASE_COOLDOWN:
+                state['limit'] = max(1.0, state['limit'] * (0.5 if outcome == 'throttled' else 0.75))
+                state['decreased'] = now
+
+    @contextmanager
+    def slot(self):
+        """with limiter.slot() as call: ...; the body may set call['outcome'] before raising."""
+        slot, waited = self.acquire()
+        call = {'outcome': 'ok', 'waited_s': waited}
+        try:
+            yield call
+        except ProviderError as e:
+            call['outcome'] = 'throttled' if e.throttled else 'error'
+            raise
+        except Exception:
+            if call['outcome'] == 'ok': call['outcome'] = 'error'
+            raise
+        finally:
+            self.release(slot, call['outcome'])
+
+def _alive(pid) -> bool:
+    try: os.kill(int(pid), 0)
+    except ProcessLookupError: return False
+    except (PermissionError, ValueError, TypeError): return True
+    return True
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# worqer/lib_session.py - Warm provider CLI process pool
+import atexit
+import sys
+import threading
+import time
+
+class ProviderSessionPool:
+    """
+    Keeps `size` provider CLI processes (sgpt, gemini) started ahead of time
+    for every command line in use. The CLIs take one prompt per process (no
+    multi-prompt stdin protocol), so these are pre-spawned one-shot
+    processes, not persistent sessions: a warm process has already paid for
+    its interpreter/Node startup and sits blocked on stdin; the prompt is
+    written to stdin and closing the pipe (EOF) ends it.
+
+    Taking a session spawns its replacement, so the next briq's startup
+    overlaps with the current briq's generation. The pool lives as long as
+    its worQer process (one agent run), so only agents that make many calls
+    should use it. Sessions that died while idle (crash, OOM, CLI timeout)
+    or sat idle longer than max_idle_s are discarded and replaced.
+    """
+    def __init__(self, spawn, size: int = 2, max_idle_s: float = 600):
+        self.spawn = spawn
+        self.size = max(1, size)
+        self.max_idle_s = max_idle_s
+        self.recycled = 0
+        self.closed = False
+        self._idle = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def take(self, cmd: list[str]):
+        """Returns a ready process for cmd (warm if available) and tops the pool back up."""
+        key = tuple(cmd)
+        now = time.monotonic()
+        proc = None
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            while idle:
+                candidate, started = idle.pop(0)
+                if candidate.poll() is None and now - started < self.max_idle_s:
+                    proc = candidate
+                    break
+                self._discard(candidate)
+        if proc is None: proc = self.spawn(cmd)
+        # Replacements start in the background; the caller only waits for its own process
+        threading.Thread(target=self._fill, args=(key,), daemon=True).start()
+        return proc
+
+    def _fill(self, key):
+        # Spawned outside the lock: process startup must not hold up other threads' take()
+        with self._lock: missing = self.size - len(self._idle.setdefault(key, []))
+        spawned = [(self.spawn(list(key)), time.monotonic()) for _ in range(max(0, missing))]
+        extra = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            for entry in spawned:
+                if not self.closed and len(idle) < self.size: idle.append(entry)
+                else: extra.append(entry[0]) # Topped up by another thread meanwhile, or closed
+        for proc in extra: _terminate(proc)
+
+    def _discard(self, proc):
+        self.recycled += 1
+        if proc.poll() is not None:
+            sys.stderr.write(f"[Session] Recycling dead provider session (exit {proc.returncode})\n")
+        _terminate(proc)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            for idle in self._idle.values():
+                for proc, _ in idle: _terminate(proc)
+            self._idle.clear()
+
+def _terminate(proc):
+    try:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait(timeout=2)
+    except Exception: pass
+    for stream in (proc.stdin, proc.stdout, proc.stderr):
+        try:
+            if stream: stream.close()
+        except Exception: pass